@@ -5,6 +5,11 @@ from flask import Flask
 from flask_cors import CORS
 import os
 
+from backend.cocomaps import default_workers, RECYCLE_AFTER
+from backend.data_cache import warm_data_cache
+from backend.system_store import PARSE_WORKERS
+from backend.jobs import start_workers
+
 def create_app():
     """Create and configure Flask application"""
     app = Flask(__name__)
@@ -14,6 +19,26 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500 MB max
     app.config['DATA_FOLDER'] = app.config['UPLOAD_FOLDER']  # Root folder containing system folders
+    app.config['MATERIALIZE_FRAMES'] = False  # Write frame_N.pdb only while CoCoMaps needs it
+    app.config['COCOMAPS_WORKERS'] = default_workers()  # Frames analyzed concurrently
+    app.config['COCOMAPS_WARM_CONTAINERS'] = False  # Reuse long-lived containers via docker exec
+    app.config['COCOMAPS_RECYCLE_AFTER'] = RECYCLE_AFTER  # Frames per warm container before replacing it
+    app.config['COCOMAPS_EXEC_TIMEOUT'] = None  # Seconds a warm container gets per frame; None waits
+    app.config['DOCKER_COMMAND'] = 'docker'  # Docker CLI, or a stand-in such as 'python -m backend.docker_standin'
+    app.config['CROP_INTERFACE'] = False  # Send CoCoMaps only residues near the partner chains
+    app.config['CROP_MARGIN'] = 5.0  # Å kept beyond CUT_OFF when cropping
+    app.config['CROP_VALIDATE'] = False  # Analyze full frames and compare a cropped run (crop_check.json)
+    app.config['QUICKLOOK'] = True  # Write preliminary in-process contacts before CoCoMaps finishes
+    app.config['PARSE_WORKERS'] = PARSE_WORKERS  # Frame folders parsed concurrently when compiling; 1 is sequential
+    app.config['COOCCURRENCE_MAX_DENSE'] = 4000  # Interactions in a dense co-occurrence matrix; topK has no limit
+    app.config['DATA_CACHE_MAX_BYTES'] = 256 * 1024 * 1024  # In-memory aggregated data; 0 disables
+    app.config['DATA_CACHE_WARM'] = False  # Aggregate every system at startup
+    app.config['DATA_CACHE_CONTROL'] = 'no-cache'  # Browsers keep data responses but revalidate by ETag
+    app.config['SEARCH_REFRESH_SECONDS'] = 10  # Search rechecks system fingerprints at most this often; 0 on every query
+    app.config['JOB_DB'] = os.path.join(app.config['DATA_FOLDER'], '.jobs.sqlite3')  # Durable job queue
+    app.config['JOB_WORKERS'] = 2  # Uploads analyzed at once; 0 to run python -m backend.jobs separately
+    app.config['RESULT_CACHE_DIR'] = os.path.join(app.config['DATA_FOLDER'], '.cocomaps_cache')  # None disables
+    app.config['RESULT_CACHE_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # LRU cap on cached outputs
     
     # Register blueprints
     from backend.routes import data, upload, systems
@@ -21,6 +46,14 @@ def create_app():
     app.register_blueprint(data.bp, url_prefix='/api')
     app.register_blueprint(upload.bp, url_prefix='/api')
     
+    # Start the job worker pool in the process that serves requests
+    @app.before_request
+    def ensure_job_workers():
+        start_workers(app)
+    
+    if app.config['DATA_CACHE_WARM']:
+        warm_data_cache(app)
+    
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark sequential vs pooled frame CSV parsing for a system
+
+    python backend/bench_parse.py <system_dir> [--workers 1 4 8 16] [--repeat 3]
+
+Parses every frame folder with parse_frames at each pool size, on threads
+and on processes, and checks every run returns the same records as the
+sequential one. Timings include the OS page cache, so the first run of a
+cold system is the closest to production on network or spinning storage.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.system_store import frame_folders, parse_frames
+
+def timed(system_dir, folders, workers, processes, repeat):
+    best = None
+    records = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = parse_frames(system_dir, folders, workers, processes)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, records
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('system_dir')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    folders = frame_folders(args.system_dir)
+    if not folders:
+        sys.exit(f"No frame folders in {args.system_dir}")
+    print(f"{len(folders)} frames in {args.system_dir}")
+
+    baseline, expected = timed(args.system_dir, folders, 1, False, args.repeat)
+    print(f"{'sequential':>12} {1:>3} workers  {baseline:8.3f}s")
+    for processes in (False, True):
+        for workers in args.workers:
+            if workers <= 1:
+                continue
+            elapsed, records = timed(args.system_dir, folders, workers, processes, args.repeat)
+            status = "ok" if records == expected else "MISMATCH"
+            print(f"{'processes' if processes else 'threads':>12} {workers:>3} workers  "
+                  f"{elapsed:8.3f}s  x{baseline / elapsed:5.2f}  {status}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+"""
+CoCoMaps execution for split frames
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+import json
+import os
+import queue
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+
+from backend.interface_crop import compare_final_files, crop_frame, crop_params
+from backend.manifest import Manifest, load_params, output_name
+from backend.result_cache import detach_outputs, frame_cache_key
+from backend.pdb_frames import (FrameSource, frame_path, load_frame_index,
+                                materialize_frame, release_frame)
+
+DOCKER_IMAGE = "andrpet/cocomaps-backend:0.0.19"
+CONTAINER_EXECUTION = "python /app/coco2/begin.py"
+INPUT_FILE_NAME = "example_input.json"
+RECYCLE_AFTER = 25  # frames a warm container analyzes before it is replaced
+CROP_CHECK_FILE = "crop_check.json"
+
+def default_workers():
+    """Default concurrency: one container per core"""
+    return os.cpu_count() or 1
+
+def get_frame_numbers(root_dir):
+    """Sorted frame numbers of the frame_* folders in a system folder"""
+    frame_numbers = []
+    root_path = Path(root_dir)
+
+    if not root_path.exists():
+        return frame_numbers
+
+    for item in root_path.iterdir():
+        if item.is_dir():
+            match = re.match(r'frame_(\d+)$', item.name)
+            if match:
+                frame_numbers.append(int(match.group(1)))
+
+    return sorted(frame_numbers)
+
+def docker_command(host_root_dir, frame_num, docker_image=DOCKER_IMAGE, docker='docker'):
+    """docker run command analyzing one frame folder"""
+    return _mount_command(f"{host_root_dir}/frame_{frame_num}", docker_image, docker)
+
+def _mount_command(data_dir, docker_image=DOCKER_IMAGE, docker='docker'):
+    """docker run command analyzing the input in data_dir"""
+    container_input_path = f"/app/data/{INPUT_FILE_NAME}"
+    return (
+        f"{docker} run --rm "
+        f'-v "{data_dir}":/app/data '
+        f"{docker_image} "
+        f"{CONTAINER_EXECUTION} "
+        f"{container_input_path}"
+    )
+
+def _full_frame_path(host_root_dir, frame_num):
+    return frame_path(host_root_dir, frame_num)[:-len('.pdb')] + '.full.pdb'
+
+def _crop_marker_path(host_root_dir, frame_num):
+    return frame_path(host_root_dir, frame_num)[:-len('.pdb')] + '.cropped'
+
+def restore_full_frame(host_root_dir, frame_num):
+    """
+    Undo a cropped frame left behind by an interrupted run: put
+    frame_N.full.pdb back, or drop a crop written from the frame index.
+    Returns True when there was anything to undo.
+    """
+    frame_file = frame_path(host_root_dir, frame_num)
+    full_file = _full_frame_path(host_root_dir, frame_num)
+    marker_file = _crop_marker_path(host_root_dir, frame_num)
+    if os.path.exists(full_file):
+        os.replace(full_file, frame_file)
+    elif os.path.exists(marker_file):
+        if os.path.exists(frame_file):
+            os.remove(frame_file)
+    else:
+        return False
+    if os.path.exists(marker_file):
+        os.remove(marker_file)
+    return True
+
+def read_cropped_frame(host_root_dir, frame_num, crop_margin, frame_file=None):
+    """Frame records cropped to the interface set by the frame's example_input.json"""
+    crop = crop_params(load_params(_frame_dir(host_root_dir, frame_num)), crop_margin)
+    if frame_file is None:
+        with FrameSource(host_root_dir) as source:
+            with source.frame(frame_num) as frame_view:
+                return crop_frame(frame_view, **crop)
+    with open(frame_file, 'rb') as f:
+        return crop_frame(f.read(), **crop)
+
+def prepare_frame(host_root_dir, frame_num, crop_margin=None):
+    """
+    Write frame_N.pdb for the container, cropped to the interface when
+    crop_margin is set. An existing full frame file is set aside as
+    frame_N.full.pdb while the cropped one is in place; a crop written from
+    the frame index is flagged by frame_N.cropped instead. Either way a crash
+    leaves enough behind for restore_full_frame to undo it.
+    Returns the state finish_frame needs to undo this.
+    """
+    restore_full_frame(host_root_dir, frame_num)
+    if crop_margin is None:
+        # Frames are only written to disk while the container needs them
+        return 'written' if materialize_frame(host_root_dir, frame_num) else None
+
+    frame_file = frame_path(host_root_dir, frame_num)
+    if os.path.exists(frame_file):
+        full_file = _full_frame_path(host_root_dir, frame_num)
+        os.replace(frame_file, full_file)
+        cropped, state = read_cropped_frame(host_root_dir, frame_num, crop_margin, full_file), 'set_aside'
+    else:
+        cropped, state = read_cropped_frame(host_root_dir, frame_num, crop_margin), 'written'
+        open(_crop_marker_path(host_root_dir, frame_num), 'w').close()
+    with open(frame_file, 'wb') as f:
+        f.write(cropped)
+    return state
+
+def finish_frame(host_root_dir, frame_num, state):
+    """Undo prepare_frame once the container is done with the frame"""
+    if state == 'set_aside':
+        restore_full_frame(host_root_dir, frame_num)
+    elif state == 'written':
+        release_frame(host_root_dir, frame_num)
+        marker_file = _crop_marker_path(host_root_dir, frame_num)
+        if os.path.exists(marker_file):
+            os.remove(marker_file)
+
+def run_frame(host_root_dir, frame_num, docker_image=DOCKER_IMAGE, docker='docker', crop_margin=None):
+    """Run CoCoMaps on a single frame in a fresh container, returning its output"""
+    state = prepare_frame(host_root_dir, frame_num, crop_margin)
+    try:
+        result = subprocess.run(
+            docker_command(host_root_dir, frame_num, docker_image, docker), shell=True, check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+    finally:
+        finish_frame(host_root_dir, frame_num, state)
+    return result.stdout
+
+def check_crop(host_root_dir, frame_num, crop_margin, docker_image=DOCKER_IMAGE, docker='docker'):
+    """
+    Validate cropping on an analyzed frame
+    Runs CoCoMaps on the cropped frame in a scratch folder and compares its
+    interactions with the frame's full-size final_file. The report is
+    saved as frame_N/crop_check.json and returned.
+    """
+    frame_dir = _frame_dir(host_root_dir, frame_num)
+    scratch_dir = os.path.join(frame_dir, 'crop_check')
+    os.makedirs(scratch_dir, exist_ok=True)
+    try:
+        shutil.copy2(os.path.join(frame_dir, INPUT_FILE_NAME), scratch_dir)
+        frame_file = frame_path(host_root_dir, frame_num)
+        cropped = read_cropped_frame(host_root_dir, frame_num, crop_margin,
+                                     frame_file if os.path.exists(frame_file) else None)
+        with open(os.path.join(scratch_dir, os.path.basename(frame_file)), 'wb') as f:
+            f.write(cropped)
+
+        subprocess.run(
+            _mount_command(os.path.abspath(scratch_dir), docker_image, docker), shell=True, check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        final_file = output_name(frame_num, '_A_B_final_file.csv')
+        report = compare_final_files(os.path.join(frame_dir, final_file),
+                                     os.path.join(scratch_dir, final_file))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    report['cropMargin'] = crop_margin
+    with open(os.path.join(frame_dir, CROP_CHECK_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+class WarmContainerPool:
+    """
+    Long-lived analysis containers fed frames through docker exec
+    Each container mounts the whole system folder at /app/systems. Before a
+    frame runs, /app/data is pointed at that frame's folder, so the
+    example_input.json written by the splitter works unchanged. A container
+    is replaced after recycle_after frames, after a failed run or when a
+    frame runs longer than timeout seconds.
+    docker is a command line for any CLI that understands run -d / exec /
+    rm -f, such as python -m backend.docker_standin in place of Docker.
+    """
+
+    def __init__(self, host_root_dir, size, recycle_after=RECYCLE_AFTER,
+                 docker_image=DOCKER_IMAGE, docker='docker', crop_margin=None, timeout=None):
+        self.host_root_dir = host_root_dir
+        self.crop_margin = crop_margin
+        self.recycle_after = recycle_after
+        self.docker_image = docker_image
+        self.docker = shlex.split(docker) if isinstance(docker, str) else list(docker)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._containers = set()
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put({'container': None, 'runs': 0})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start_container(self):
+        result = subprocess.run(
+            [*self.docker, 'run', '-d', '--rm',
+             '-v', f"{self.host_root_dir}:/app/systems",
+             '--entrypoint', 'sleep', self.docker_image, 'infinity'],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        container = result.stdout.strip().splitlines()[-1]
+        with self._lock:
+            self._containers.add(container)
+        return container
+
+    def _stop_container(self, container):
+        with self._lock:
+            self._containers.discard(container)
+        subprocess.run([*self.docker, 'rm', '-f', container],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def run_frame(self, host_root_dir, frame_num):
+        """Run CoCoMaps on a single frame in the next idle container"""
+        if os.path.abspath(host_root_dir) != os.path.abspath(self.host_root_dir):
+            raise ValueError(f"Pool serves {self.host_root_dir}, not {host_root_dir}")
+
+        slot = self._idle.get()
+        try:
+            if slot['container'] and slot['runs'] >= self.recycle_after:
+                self._stop_container(slot['container'])
+                slot['container'] = None
+            if slot['container'] is None:
+                slot['container'] = self._start_container()
+                slot['runs'] = 0
+
+            script = (
+                f"rm -rf /app/data && ln -s /app/systems/frame_{frame_num} /app/data && "
+                f"cd /app/data && {CONTAINER_EXECUTION} /app/data/{INPUT_FILE_NAME}"
+            )
+            state = prepare_frame(host_root_dir, frame_num, self.crop_margin)
+            try:
+                result = subprocess.run(
+                    [*self.docker, 'exec', slot['container'], 'sh', '-c', script], check=True,
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=self.timeout
+                )
+            except subprocess.TimeoutExpired:
+                # Removing the container kills the analysis still running in it
+                self._stop_container(slot['container'])
+                slot['container'] = None
+                raise RuntimeError(f"frame_{frame_num} timed out after {self.timeout} s")
+            except Exception:
+                # Don't reuse a container that may be left in a bad state
+                self._stop_container(slot['container'])
+                slot['container'] = None
+                raise
+            finally:
+                finish_frame(host_root_dir, frame_num, state)
+
+            slot['runs'] += 1
+            return result.stdout
+        finally:
+            self._idle.put(slot)
+
+    def close(self):
+        """Stop every container the pool started"""
+        with self._lock:
+            containers = list(self._containers)
+        for container in containers:
+            self._stop_container(container)
+
+def run_frames(host_root_dir, frame_numbers, workers=None, on_frame=None, warm=False,
+               recycle_after=RECYCLE_AFTER, docker_image=DOCKER_IMAGE, docker='docker',
+               crop_margin=None, crop_validate=False, timeout=None, run=None):
+    """
+    Run CoCoMaps over frames with a bounded worker pool
+    With warm=True, frames are fed to a WarmContainerPool of the same size
+    instead of starting one container per frame, each allowed timeout
+    seconds. With crop_margin set,
+    containers get frames cropped to the interface; crop_validate instead
+    analyzes the full frame and then checks a cropped run against it.
+    A failing frame is recorded and does not stop the others.
+    on_frame(result, done_count, total) is called as each frame finishes.
+    Returns one result dict per frame, in frame_numbers order, with
+    'frame', 'status' ('done' or 'failed') and 'error' keys.
+    """
+    frame_numbers = list(frame_numbers)
+    if not frame_numbers:
+        return []
+
+    workers = max(1, min(workers or default_workers(), len(frame_numbers)))
+    container_crop = None if crop_validate else crop_margin
+    if run is None and warm:
+        with WarmContainerPool(host_root_dir, workers, recycle_after=recycle_after,
+                               docker_image=docker_image, docker=docker,
+                               crop_margin=container_crop, timeout=timeout) as containers:
+            return _run_pool(host_root_dir, frame_numbers, workers, on_frame,
+                             _with_crop_check(containers.run_frame, crop_margin, crop_validate,
+                                              docker_image, docker))
+    if run is None:
+        run = partial(run_frame, docker_image=docker_image, docker=docker, crop_margin=container_crop)
+    run = _with_crop_check(run, crop_margin, crop_validate, docker_image, docker)
+    return _run_pool(host_root_dir, frame_numbers, workers, on_frame, run)
+
+def _with_crop_check(run, crop_margin, crop_validate, docker_image, docker):
+    """Wrap a frame runner so each analyzed frame is followed by check_crop"""
+    if not crop_validate or crop_margin is None:
+        return run
+
+    def run_and_check(host_root_dir, frame_num):
+        state = prepare_frame(host_root_dir, frame_num)
+        try:
+            output = run(host_root_dir, frame_num)
+            check_crop(host_root_dir, frame_num, crop_margin, docker_image, docker)
+        finally:
+            finish_frame(host_root_dir, frame_num, state)
+        return output
+    return run_and_check
+
+def run_pending_frames(host_root_dir, frame_numbers, on_frame=None, cache=None, **run_options):
+    """
+    Run CoCoMaps only on frames the system manifest reports as missing,
+    stale or failed, recording each outcome as it finishes
+    With a ResultCache, frames whose coordinates and parameters were
+    analyzed before get their outputs linked in instead of running a
+    container; those results carry 'cached': True.
+    Takes the same options as run_frames.
+    Returns (results, skipped) where skipped lists frames already complete.
+    """
+    # A crashed cropped run must not leave the crop to be hashed as the frame
+    for frame_num in frame_numbers:
+        restore_full_frame(host_root_dir, frame_num)
+
+    # Cropped container inputs can change the outputs, so they count as parameters
+    extra_params = None
+    if run_options.get('crop_margin') is not None and not run_options.get('crop_validate'):
+        extra_params = {'crop_margin': run_options['crop_margin']}
+    manifest = Manifest(host_root_dir, extra_params)
+    pending, skipped = manifest.pending(frame_numbers)
+    keys = {}
+    done = {'count': 0}
+
+    def record(result, done_count, total):
+        result['status'] = manifest.record(result['frame'], result['status'], result['error'])
+        if result['status'] == 'failed' and not result['error']:
+            result['error'] = manifest.frames[result['frame']]['error']
+        if cache is not None and result['status'] == 'done' and keys.get(result['frame']):
+            cache.store(keys[result['frame']], _frame_dir(host_root_dir, result['frame']),
+                        result['frame'])
+        done['count'] += 1
+        if on_frame:
+            on_frame(result, done['count'], len(pending))
+
+    results = {}
+    to_run = pending
+    if cache is not None:
+        to_run = []
+        for frame_num in pending:
+            key = keys[frame_num] = frame_cache_key(host_root_dir, frame_num, extra_params)
+            if key and cache.restore(key, _frame_dir(host_root_dir, frame_num), frame_num):
+                result = results[frame_num] = {'frame': frame_num, 'status': 'done',
+                                               'error': None, 'cached': True}
+                record(result, None, None)
+            else:
+                to_run.append(frame_num)
+
+    for frame_num in to_run:
+        detach_outputs(_frame_dir(host_root_dir, frame_num), frame_num)
+    for result in run_frames(host_root_dir, to_run, on_frame=record, **run_options):
+        results[result['frame']] = result
+    return [results[frame_num] for frame_num in pending], skipped
+
+def _frame_dir(host_root_dir, frame_num):
+    return os.path.join(host_root_dir, f"frame_{frame_num}")
+
+def _run_pool(host_root_dir, frame_numbers, workers, on_frame, run):
+    """Fan frames out over a thread pool and collect their results"""
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, host_root_dir, frame_num): frame_num
+                   for frame_num in frame_numbers}
+
+        for done_count, future in enumerate(as_completed(futures), 1):
+            frame_num = futures[future]
+            result = {'frame': frame_num, 'status': 'done', 'error': None}
+            try:
+                future.result()
+            except subprocess.CalledProcessError as e:
+                result['status'] = 'failed'
+                result['error'] = f"exit status {e.returncode}: {(e.output or '').strip()[-500:]}"
+            except Exception as e:
+                result['status'] = 'failed'
+                result['error'] = str(e)
+
+            results[frame_num] = result
+            if on_frame:
+                on_frame(result, done_count, len(frame_numbers))
+
+    return [results[frame_num] for frame_num in frame_numbers]
@@ -0,0 +1,95 @@
+"""
+Interaction and trend differences between two systems
+"""
+from backend.system_store import HAS_SUMMARY, TREND_TYPES
+
+MIN_DELTA = 0.1  # smallest consistency change reported as changed
+
+def pair_key(entry):
+    """
+    Join key of an interaction: both residues by chain and number, so a
+    point mutant still matches its wild type
+    """
+    return (entry['chain1'], entry['resNum1'], entry['chain2'], entry['resNum2'])
+
+def trend_means(store):
+    """Mean count per frame of each TREND_TYPES type, over frames with a summary table"""
+    counts = store.trends[store.flags & HAS_SUMMARY > 0]
+    return {
+        'frames': len(counts),
+        'means': {name: float(counts[:, i].mean()) if len(counts) else None
+                  for i, name in enumerate(TREND_TYPES)}
+    }
+
+def _side(entry):
+    if entry is None:
+        return None
+    return {
+        'id1': entry['id1'],
+        'id2': entry['id2'],
+        'frameCount': entry['frameCount'],
+        'consistency': entry['consistency'],
+        'typesArray': entry['typesArray'],
+    }
+
+def _row(entry_a, entry_b):
+    entry = entry_b if entry_b is not None else entry_a
+    row = {
+        'chain1': entry['chain1'], 'resNum1': entry['resNum1'],
+        'chain2': entry['chain2'], 'resNum2': entry['resNum2'],
+        'a': _side(entry_a),
+        'b': _side(entry_b),
+        'delta': (entry_b['consistency'] if entry_b else 0.0) - (entry_a['consistency'] if entry_a else 0.0),
+    }
+    if entry_a is not None and entry_b is not None:
+        types_a, types_b = set(entry_a['typesArray']), set(entry_b['typesArray'])
+        row['mutated'] = (entry_a['id1'], entry_a['id2']) != (entry_b['id1'], entry_b['id2'])
+        row['typesGained'] = sorted(types_b - types_a)
+        row['typesLost'] = sorted(types_a - types_b)
+    return row
+
+def compare_interactions(index_a, positions_a, index_b, positions_b, min_delta=MIN_DELTA):
+    """
+    Hash join of two InteractionIndexes on pair_key
+    positions_a/positions_b select the pairs to compare (the filtered
+    positions of each side); a pair selected on either side is looked up
+    among all interactions of the other. Pairs only in b are gained, only
+    in a lost, and in both changed when consistency moves by min_delta or
+    more. gained and lost keep response order, changed is sorted by the
+    size of the change.
+    Returns (gained, lost, changed, number unchanged).
+    """
+    joined = []
+    seen_a = set()
+    for j in positions_b.tolist():
+        i = index_a.residue_pairs.get(pair_key(index_b.entries[j]))
+        if i is not None:
+            seen_a.add(i)
+        joined.append((i, j))
+    for i in positions_a.tolist():
+        if i not in seen_a:
+            joined.append((i, index_b.residue_pairs.get(pair_key(index_a.entries[i]))))
+
+    gained, lost, changed = [], [], []
+    unchanged = 0
+    for i, j in joined:
+        entry_a = index_a.entries[i] if i is not None else None
+        entry_b = index_b.entries[j] if j is not None else None
+        if entry_a is None:
+            gained.append(_row(None, entry_b))
+        elif entry_b is None:
+            lost.append(_row(entry_a, None))
+        elif abs(entry_b['consistency'] - entry_a['consistency']) >= min_delta:
+            changed.append(_row(entry_a, entry_b))
+        else:
+            unchanged += 1
+    changed.sort(key=lambda row: -abs(row['delta']))
+    return gained, lost, changed, unchanged
+
+def compare_trends(trends_a, trends_b):
+    """Per-type mean counts of two trend_means results and their difference"""
+    types = {}
+    for name in TREND_TYPES:
+        a, b = trends_a['means'][name], trends_b['means'][name]
+        types[name] = {'a': a, 'b': b, 'delta': b - a if a is not None and b is not None else None}
+    return {'frames': {'a': trends_a['frames'], 'b': trends_b['frames']}, 'types': types}
@@ -0,0 +1,63 @@
+"""
+Shared fixtures: copies of the sample systems in the repository root
+"""
+from collections import Counter, defaultdict
+import csv
+import os
+import shutil
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_SYSTEMS = ('md_mohit_protein', '1ULL')
+
+collect_ignore = ['test_api.py']  # needs a running server: python backend/test_api.py
+
+def _ignored(folder, names):
+    # CoCoMaps' intermediate structures are large and nothing here reads them
+    return [name for name in names
+            if name in ('.compiled', '.cocomaps_cache') or name.startswith('.jobs.sqlite3')
+            or ('.pd_h.pdb' in name and name.endswith('.pdb'))]
+
+def copy_system(name, data_folder):
+    """Copy a sample system into data_folder, without its compiled store"""
+    target = os.path.join(data_folder, name)
+    shutil.copytree(os.path.join(REPO_ROOT, name), target, ignore=_ignored)
+    return target
+
+def csv_interactions(system_dir):
+    """
+    Frames and types of each interaction key, read straight from the
+    final_file CSVs: ({key: frame numbers}, {key: types})
+    """
+    frames, types = defaultdict(set), defaultdict(set)
+    for folder in os.listdir(system_dir):
+        csv_file = os.path.join(system_dir, folder, f"{folder}.pd_h.pdb_A_B_final_file.csv")
+        if not folder.startswith('frame_') or not os.path.exists(csv_file):
+            continue
+        with open(csv_file, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                key = f"{row['Res. Name 1']}{row['Res. Number 1']}_{row['Res. Name 2']}{row['Res. Number 2']}"
+                frames[key].add(int(folder.split('_')[1]))
+                types[key].update(t.strip() for t in row['Type of Interactions'].split(';') if t.strip())
+    return dict(frames), dict(types)
+
+def interaction_key(entry):
+    """csv_interactions key of an interactions endpoint entry"""
+    return f"{entry['resName1']}{entry['resNum1']}_{entry['resName2']}{entry['resNum2']}"
+
+@pytest.fixture
+def data_folder(tmp_path):
+    """A data folder holding copies of the sample systems"""
+    for name in SAMPLE_SYSTEMS:
+        copy_system(name, str(tmp_path))
+    return str(tmp_path)
+
+@pytest.fixture
+def client(data_folder):
+    from backend.app import create_app
+    app = create_app()
+    app.config.update(TESTING=True, DATA_FOLDER=data_folder, UPLOAD_FOLDER=data_folder, JOB_WORKERS=0,
+                      JOB_DB=os.path.join(data_folder, '.jobs.sqlite3'),
+                      RESULT_CACHE_DIR=os.path.join(data_folder, '.cocomaps_cache'))
+    return app.test_client()
@@ -0,0 +1,83 @@
+"""
+Co-occurrence and correlation of interactions across frames
+"""
+import numpy as np
+
+METRICS = ('count', 'jaccard', 'pearson')
+BLOCK_ROWS = 1024  # interactions per matrix-multiply block in top-K mode
+
+def _metric(counts, n_rows, n_cols, total_frames, metric):
+    """
+    Turn co-occurrence counts of a block (rows x cols) into the metric
+    n_rows and n_cols are the frame counts of the block's interactions.
+    Undefined values (empty unions, constant presence) are 0.
+    """
+    if metric == 'count':
+        return counts
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'jaccard':
+            union = n_rows[:, None] + n_cols[None, :] - counts
+            values = counts / union
+        else:
+            # Pearson correlation of 0/1 presence vectors
+            covariance = total_frames * counts - np.outer(n_rows, n_cols)
+            variance_rows = n_rows * (total_frames - n_rows)
+            variance_cols = n_cols * (total_frames - n_cols)
+            values = covariance / np.sqrt(np.outer(variance_rows, variance_cols))
+    values[~np.isfinite(values)] = 0
+    return values
+
+def cooccurrence_matrix(presence, metric='count'):
+    """
+    Dense interactions x interactions metric from one matrix multiply of the
+    interactions x frames presence matrix
+    """
+    x = presence.astype(np.float32)
+    counts = x @ x.T
+    n = counts.diagonal().copy()
+    return _metric(counts, n, n, presence.shape[1], metric).astype(np.float32)
+
+def _select(values, k):
+    """Sorted indices of the k largest values, ties going to the earliest"""
+    if len(values) <= k:
+        return np.arange(len(values))
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[:k - len(above)]
+    return np.sort(np.concatenate([above, ties]))
+
+def top_pairs(presence, k, metric='count', block_rows=BLOCK_ROWS):
+    """
+    The k interaction pairs (i < j) with the highest metric
+    The product is computed a block of rows at a time and only the best
+    candidates are kept, so memory stays at block_rows x interactions.
+    Returns (i, j, value, count) arrays sorted by value, descending.
+    """
+    x = presence.astype(np.float32)
+    n = x.sum(axis=1)
+    size = len(x)
+    best_i = np.zeros(0, dtype=np.int64)
+    best_j = np.zeros(0, dtype=np.int64)
+    best_value = np.zeros(0, dtype=np.float32)
+    best_count = np.zeros(0, dtype=np.float32)
+
+    for lo in range(0, size, block_rows):
+        hi = min(lo + block_rows, size)
+        counts = x[lo:hi] @ x.T
+        values = _metric(counts, n[lo:hi], n, presence.shape[1], metric).astype(np.float32)
+        # Keep the upper triangle only: column index above the row index
+        upper = np.arange(size)[None, :] > np.arange(lo, hi)[:, None]
+        flat = np.flatnonzero(upper)
+        flat = flat[_select(values.ravel()[flat], k)]
+        r, c = np.divmod(flat, size)
+        # Candidates stay in (i, j) order so ties resolve the same way in every block
+        best_i = np.concatenate([best_i, r + lo])
+        best_j = np.concatenate([best_j, c])
+        best_value = np.concatenate([best_value, values.ravel()[flat]])
+        best_count = np.concatenate([best_count, counts.ravel()[flat]])
+        keep = _select(best_value, k)
+        best_i, best_j, best_value, best_count = best_i[keep], best_j[keep], best_value[keep], best_count[keep]
+
+    # Highest first; ties in (i, j) order
+    order = np.lexsort((best_j, best_i, -best_value))
+    return best_i[order], best_j[order], best_value[order], best_count[order].astype(np.int64)
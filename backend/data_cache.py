@@ -0,0 +1,172 @@
+"""
+In-process LRU cache of aggregated system data
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+from backend.system_store import frame_folders, system_fingerprints, load_system_store
+
+def _interactions(store, bitmaps=False):
+    preliminary_frames = store.preliminary_frames()
+    data = {
+        'totalFrames': store.total_frames,
+        'preliminary': preliminary_frames > 0,
+        'preliminaryFrames': preliminary_frames,
+        'interactions': store.interactions(bitmaps)
+    }
+    if bitmaps:
+        data['bitmapFrames'] = store.frames.tolist()  # frame number of each bitmap bit
+    return data
+
+def interactions_with_bitmaps(store):
+    """The interactions section with a base64 frameBitmap per interaction"""
+    return _interactions(store, bitmaps=True)
+
+# Response fields of each data endpoint, built from a SystemStore
+SECTIONS = {
+    'interactions': _interactions,
+    'area': lambda store: {'frames': store.area()},
+    'trends': lambda store: {'trends': store.trend_series()},
+}
+
+def fingerprint_digest(fingerprints):
+    """Short digest of system_fingerprints output"""
+    canonical = json.dumps(fingerprints, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+class DataCache:
+    """
+    Bounded LRU of aggregated sections keyed by (system folder, section)
+    Each entry remembers the fingerprint digest it was built from and is
+    only served while the frame folders still match it. Sizes are the
+    length of the entry's JSON encoding unless the caller supplies one.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, digest):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != digest:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, digest, value, size=None):
+        if size is None:
+            size = len(json.dumps(value, ensure_ascii=False))
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (digest, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'maxBytes': self.max_bytes
+            }
+
+def system_state(system_dir):
+    """(folders, fingerprints, digest) of a system, or None without frame folders"""
+    folders = frame_folders(os.fspath(system_dir))
+    if not folders:
+        return None
+    fingerprints = system_fingerprints(os.fspath(system_dir), folders)
+    return folders, fingerprints, fingerprint_digest(fingerprints)
+
+def system_values(cache, system_dir, builders, workers=None, state=None):
+    """
+    build(store) for each name in builders, cached while the system's frame
+    folders are unchanged
+    Names are cache keys within the system, such as a section name or a
+    tuple of a view and its parameters. Values with an nbytes attribute are
+    sized by it. Anything not cached is built from one load of the system's
+    store, parsing changed frames on up to workers threads. state is a
+    system_state result the caller already has.
+    Returns {name: value}, or None when the system has no frame folders.
+    """
+    system_dir = os.fspath(system_dir)
+    state = state or system_state(system_dir)
+    if state is None:
+        return None
+    folders, fingerprints, digest = state
+
+    values = {}
+    store = None
+    for name, build in builders.items():
+        value = cache.get((system_dir, name), digest) if cache is not None else None
+        if value is None:
+            if store is None:
+                store = load_system_store(system_dir, folders, fingerprints, workers)
+            value = build(store)
+            if cache is not None:
+                cache.put((system_dir, name), digest, value, getattr(value, 'nbytes', None))
+        values[name] = value
+    return values
+
+def system_data(cache, system_dir, sections, workers=None, state=None):
+    """
+    Response fields of the requested sections for a system
+    Returns None when the system has no frame folders.
+    """
+    values = system_values(cache, system_dir, {s: SECTIONS[s] for s in sections}, workers, state)
+    if values is None:
+        return None
+    data = {}
+    for section in sections:
+        data.update(values[section])
+    return data
+
+def get_data_cache(app):
+    """The app's DataCache, or None when DATA_CACHE_MAX_BYTES is 0"""
+    if not app.config.get('DATA_CACHE_MAX_BYTES'):
+        return None
+    cache = app.extensions.get('data_cache')
+    if cache is None:
+        cache = app.extensions['data_cache'] = DataCache(app.config['DATA_CACHE_MAX_BYTES'])
+    return cache
+
+def warm_data_cache(app):
+    """Build every system's sections in a background thread"""
+    cache = get_data_cache(app)
+    data_folder = app.config['DATA_FOLDER']
+    workers = app.config['PARSE_WORKERS']
+
+    def warm():
+        for name in sorted(os.listdir(data_folder)):
+            system_dir = os.path.join(data_folder, name)
+            if name.startswith('.') or name.startswith('__') or not os.path.isdir(system_dir):
+                continue
+            try:
+                system_data(cache, system_dir, SECTIONS, workers)
+            except Exception:
+                continue  # reported when the system is requested
+
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+    return thread
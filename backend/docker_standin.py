@@ -0,0 +1,151 @@
+"""
+Local stand-in for the docker CLI, for running the analysis pipeline
+without a Docker daemon
+
+    DOCKER_COMMAND = 'python -m backend.docker_standin'
+
+Understands the docker calls cocomaps.py makes: run --rm (one frame),
+run -d (a warm container), exec ... sh -c and rm -f. A container is a
+scratch folder whose app/ stands in for /app: -v volumes become symlinks
+and /app paths in commands are rewritten into it. In place of CoCoMaps'
+begin.py, analyze() copies a frame's outputs from DOCKER_STANDIN_OUTPUTS
+(a system folder analyzed earlier), or writes the required outputs empty.
+DOCKER_STANDIN_FAIL (comma-separated frame numbers) makes frames fail and
+DOCKER_STANDIN_SLEEP delays every frame by that many seconds.
+Every call is appended to calls.log in DOCKER_STANDIN_DIR.
+"""
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from backend.manifest import REQUIRED_OUTPUTS, output_name
+
+ANALYZER = "python /app/coco2/begin.py"  # cocomaps.CONTAINER_EXECUTION
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def state_dir():
+    path = os.environ.get('DOCKER_STANDIN_DIR') or os.path.join(tempfile.gettempdir(), 'docker_standin')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def analyze(input_file):
+    """Stand-in for begin.py: outputs of the frame named by an example_input.json"""
+    data_dir = os.path.dirname(input_file)
+    with open(input_file, 'r') as f:
+        pdb_file = os.path.basename(json.load(f)['pdb_file'])
+    frame_name = pdb_file[:-len('.pdb')]
+    frame_num = int(frame_name.split('_')[1])
+    if not os.path.exists(os.path.join(data_dir, pdb_file)):
+        print(f"missing input {pdb_file}")
+        return 1
+
+    time.sleep(float(os.environ.get('DOCKER_STANDIN_SLEEP') or 0))
+    failing = {v.strip() for v in os.environ.get('DOCKER_STANDIN_FAIL', '').split(',')}
+    if str(frame_num) in failing:
+        print(f"analysis of {frame_name} failed")
+        return 1
+
+    source = os.environ.get('DOCKER_STANDIN_OUTPUTS')
+    if source:
+        source_dir = os.path.join(source, frame_name)
+        for name in os.listdir(source_dir):
+            if name.startswith(f"{frame_name}.pd_h.pdb") and name.endswith('.csv'):
+                shutil.copyfile(os.path.join(source_dir, name), os.path.join(data_dir, name))
+    else:
+        for suffix in REQUIRED_OUTPUTS:
+            open(os.path.join(data_dir, output_name(frame_num, suffix)), 'w').close()
+    print(f"analyzed {frame_name}")
+    return 0
+
+def _create(volumes):
+    """New container folder with each (host, container path) volume linked in"""
+    container = uuid.uuid4().hex[:12]
+    root = os.path.join(state_dir(), container)
+    for host, path in volumes:
+        target = os.path.join(root, path.lstrip('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.symlink(os.path.abspath(host), target)
+    return container, root
+
+def _execute(root, command):
+    """
+    Run a shell command with /app paths and the analyzer mapped into the
+    container folder, in its own process group so rm -f can kill it
+    """
+    command = command.replace(ANALYZER, f'"{sys.executable}" -m backend.docker_standin analyze')
+    command = command.replace('/app/', f"{root}/app/")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    process = subprocess.Popen(['sh', '-c', command], env=env, start_new_session=True)
+    with open(os.path.join(root, 'pids'), 'a') as f:
+        f.write(f"{process.pid}\n")
+    return process.wait()
+
+def _remove(container):
+    """rm -f: kill what still runs in the container, then delete it"""
+    root = os.path.join(state_dir(), container)
+    try:
+        with open(os.path.join(root, 'pids'), 'r') as f:
+            pids = [int(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        pids = []
+    for pid in pids:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    shutil.rmtree(root, ignore_errors=True)
+
+def _run(args):
+    detach = remove = False
+    volumes = []
+    while args and args[0].startswith('-'):
+        option = args.pop(0)
+        if option == '-d':
+            detach = True
+        elif option == '--rm':
+            remove = True
+        elif option == '-v':
+            host, _, path = args.pop(0).rpartition(':')
+            volumes.append((host, path))
+        elif option == '--entrypoint':
+            args.pop(0)
+    command = args[1:]  # after the image
+
+    container, root = _create(volumes)
+    if detach:
+        print(container)
+        return 0
+    try:
+        return _execute(root, ' '.join(command))
+    finally:
+        if remove:
+            _remove(container)
+
+def main(argv):
+    with open(os.path.join(state_dir(), 'calls.log'), 'a') as log:
+        log.write(json.dumps(argv) + '\n')
+    action, args = argv[0], list(argv[1:])
+    if action == 'analyze':
+        return analyze(args[0])
+    if action == 'run':
+        return _run(args)
+    if action == 'exec':
+        root = os.path.join(state_dir(), args[0])
+        if not os.path.isdir(root):
+            print(f"No such container: {args[0]}")
+            return 1
+        return _execute(root, args[-1])  # sh -c <script>
+    if action == 'rm':
+        _remove(args[-1])
+        return 0
+    print(f"unsupported command: {action}")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,51 @@
+"""
+Exclusive advisory file locks with fcntl on POSIX and msvcrt on Windows
+"""
+import time
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+try:
+    import msvcrt
+    HAS_MSVCRT = True
+except ImportError:
+    HAS_MSVCRT = False
+
+LOCK_POLL = 0.05  # seconds between attempts of a blocking msvcrt lock
+
+def lock(f, blocking=True):
+    """
+    Lock an open file exclusively; returns False when blocking is off and
+    another holder has it
+    Without fcntl or msvcrt the lock is granted unconditionally.
+    """
+    if HAS_FCNTL:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+    if HAS_MSVCRT:
+        # msvcrt locks a byte range from the current position: byte 0 here
+        while True:
+            f.seek(0)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(LOCK_POLL)
+    return True
+
+def unlock(f):
+    """Release a lock taken with lock()"""
+    if HAS_FCNTL:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    elif HAS_MSVCRT:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,150 @@
+"""
+Distance and angle statistics of interactions from the compiled geometry rows
+"""
+import numpy as np
+
+from backend.system_store import GEOMETRY_TYPES
+
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 20
+
+def group_stats(groups, values, n_groups):
+    """
+    count, mean, std, min, max and PERCENTILES of values per group id,
+    ignoring NaN values
+    Everything is computed for all groups at once: sums by bincount and
+    percentiles by linear interpolation (as np.percentile) into one sort
+    by (group, value). Groups without values get NaN statistics.
+    """
+    ok = np.isfinite(values)
+    groups = groups[ok]
+    values = values[ok].astype(np.float64)
+    count = np.bincount(groups, minlength=n_groups)
+    has = count > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(groups, values, minlength=n_groups) / count
+        deviation = values - mean[groups]
+        std = np.sqrt(np.bincount(groups, deviation * deviation, minlength=n_groups) / count)
+
+    ordered = values[np.lexsort((values, groups))]
+    start = np.concatenate([[0], np.cumsum(count)[:-1]])
+    last = np.where(has, start + count - 1, 0)
+    stats = {'count': count, 'mean': mean, 'std': std}
+    if len(ordered):
+        stats['min'] = np.where(has, ordered[np.where(has, start, 0)], np.nan)
+        stats['max'] = np.where(has, ordered[last], np.nan)
+        for q in PERCENTILES:
+            position = start + q / 100 * np.maximum(count - 1, 0)
+            lo = np.minimum(np.floor(position).astype(np.int64), last)
+            hi = np.minimum(lo + 1, last)
+            value = ordered[lo] + (ordered[hi] - ordered[lo]) * (position - lo)
+            stats[f'p{q}'] = np.where(has, value, np.nan)
+    else:
+        for name in ('min', 'max') + tuple(f'p{q}' for q in PERCENTILES):
+            stats[name] = np.full(n_groups, np.nan)
+    return stats
+
+def _summary(stats, i):
+    """JSON statistics of group i, or None when it has no values"""
+    if not stats['count'][i]:
+        return None
+    return {
+        'count': int(stats['count'][i]),
+        'mean': float(stats['mean'][i]),
+        'std': float(stats['std'][i]),
+        'min': float(stats['min'][i]),
+        'max': float(stats['max'][i]),
+        'percentiles': {str(q): float(stats[f'p{q}'][i]) for q in PERCENTILES},
+    }
+
+def _histogram(values, bins):
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+def pair_geometry(store, pair, bins=HISTOGRAM_BINS):
+    """
+    Geometry of one residue pair across frames, by interaction type and by
+    atom pair within each type
+    Each atom pair carries its per-frame series; each type adds distance and
+    angle histograms over all its rows.
+    """
+    rows = store.pair_geometry_rows(pair)
+    s = store.strings
+    frame_numbers = store.frames[store.geo_frame[rows]]
+    types = store.geo_type[rows].astype(np.int64)
+    atoms = store.geo_atoms[rows]
+    distance = store.geo_values[rows, 0]
+    angle = store.geo_values[rows, 1]
+
+    # One group per (type, atom 1, atom 2)
+    keys, group = np.unique(np.column_stack([types, atoms]).reshape(-1, 3), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    distance_stats = group_stats(group, distance, len(keys))
+    angle_stats = group_stats(group, angle, len(keys))
+    type_ids, type_group = np.unique(types, return_inverse=True)
+    type_group = type_group.reshape(-1)
+    type_distance = group_stats(type_group, distance, len(type_ids))
+    type_angle = group_stats(type_group, angle, len(type_ids))
+
+    result = []
+    for t, type_index in enumerate(type_ids.tolist()):
+        in_type = types == type_index
+        atom_pairs = []
+        for g in np.flatnonzero(keys[:, 0] == type_index).tolist():
+            in_group = group == g
+            atom_pairs.append({
+                'atom1': s[keys[g, 1]],
+                'atom2': s[keys[g, 2]],
+                'frames': int(len(np.unique(frame_numbers[in_group]))),
+                'distance': _summary(distance_stats, g),
+                'angle': _summary(angle_stats, g),
+                'series': {
+                    'frames': frame_numbers[in_group].tolist(),
+                    'distance': distance[in_group].tolist(),
+                    'angle': [None if np.isnan(a) else a for a in angle[in_group].tolist()],
+                },
+            })
+        result.append({
+            'type': GEOMETRY_TYPES[type_index][0],
+            'frames': int(len(np.unique(frame_numbers[in_type]))),
+            'distance': _summary(type_distance, t),
+            'angle': _summary(type_angle, t),
+            'histograms': {
+                'distance': _histogram(distance[in_type], bins),
+                'angle': _histogram(angle[in_type], bins),
+            },
+            'atomPairs': atom_pairs,
+        })
+    return result
+
+def geometry_summary(store, pairs):
+    """
+    Rows, frames, mean and minimum distance of every pair in pairs per
+    interaction type, from one pass over all geometry rows
+    Returns a list of per-type summaries per pair, in the order of pairs;
+    each names its 'type' as the entries of pair_geometry do.
+    """
+    n_types = len(GEOMETRY_TYPES)
+    group = store.geo_pair.astype(np.int64) * n_types + store.geo_type
+    n_groups = len(store.pair_variant) * n_types
+    stats = group_stats(group, store.geo_values[:, 0], n_groups)
+    total = max(store.total_frames, 1)
+    frames = np.bincount(np.unique(group * total + store.geo_frame) // total, minlength=n_groups)
+
+    summaries = []
+    for pair in pairs.tolist():
+        summary = []
+        for type_index in np.flatnonzero(stats['count'][pair * n_types:(pair + 1) * n_types]).tolist():
+            g = pair * n_types + type_index
+            summary.append({
+                'type': GEOMETRY_TYPES[type_index][0],
+                'rows': int(stats['count'][g]),
+                'frames': int(frames[g]),
+                'meanDistance': float(stats['mean'][g]),
+                'minDistance': float(stats['min'][g]),
+            })
+        summaries.append(summary)
+    return summaries
@@ -0,0 +1,98 @@
+"""
+Residue-by-residue consistency matrices for the heatmap charts
+"""
+import base64
+
+import numpy as np
+
+from backend.interaction_index import INTERACTION_TYPES, matches_type
+
+def encode_float32(matrix):
+    """Base64 of a matrix as little-endian float32, row-major"""
+    return base64.b64encode(np.ascontiguousarray(matrix, dtype='<f4').tobytes()).decode('ascii')
+
+def _axis(labels, numbers):
+    """Distinct labels in first-seen order, stably sorted by residue number"""
+    first = {}
+    for label, number in zip(labels, numbers):
+        first.setdefault(label, number)
+    ordered = sorted(first, key=first.get)
+    return ordered, {label: i for i, label in enumerate(ordered)}
+
+def type_frame_counts(store, type_id):
+    """
+    Frames in which each pair was reported with a type matching an
+    INTERACTION_TYPES id
+    """
+    bits = 0
+    for bit, name in enumerate(store.types):
+        if matches_type(name, type_id):
+            bits |= 1 << bit
+    hits = (store.hit_types & np.uint64(bits)) != 0
+    frames = max(store.total_frames, 1)
+    unique = np.unique(store.hit_pair[hits].astype(np.int64) * frames + store.hit_frame[hits])
+    return np.bincount(unique // frames, minlength=len(store.pair_variant))
+
+def type_id_masks(store, pairs):
+    """
+    Bit i set when a pair was reported with INTERACTION_TYPES type i in
+    any frame, as uint16
+    """
+    store_masks = store.pair_type_masks()[pairs]
+    masks = np.zeros(len(pairs), dtype=np.uint16)
+    for i, type_id in enumerate(INTERACTION_TYPES):
+        bits = 0
+        for bit, name in enumerate(store.types):
+            if matches_type(name, type_id):
+                bits |= 1 << bit
+        masks[(store_masks & np.uint64(bits)) != 0] |= np.uint16(1 << i)
+    return masks
+
+def build_heatmap(store, index, positions, layers=()):
+    """
+    Chain-1 residues (rows) by chain-2 residues (columns) matrix of the
+    consistency of the interactions at index positions
+    Cells without an interaction are NaN. typeMask holds each cell's types
+    as bits in typeIds order (little-endian uint16, 0 for empty cells).
+    Each layer is the same matrix restricted to the frames where the pair
+    had that INTERACTION_TYPES type.
+    """
+    entries = [index.entries[i] for i in positions.tolist()]
+    rows, row_ids = _axis([e['id1'] for e in entries], [e['resNum1'] for e in entries])
+    cols, col_ids = _axis([e['id2'] for e in entries], [e['resNum2'] for e in entries])
+    r = np.array([row_ids[e['id1']] for e in entries], dtype=np.int64)
+    c = np.array([col_ids[e['id2']] for e in entries], dtype=np.int64)
+
+    matrix = np.full((len(rows), len(cols)), np.nan, dtype=np.float32)
+    matrix[r, c] = [e['consistency'] for e in entries]
+
+    pairs = index.pairs[positions]
+    type_mask = np.zeros(matrix.shape, dtype='<u2')
+    type_mask[r, c] = type_id_masks(store, pairs)
+
+    layer_matrices = {}
+    for type_id in layers:
+        consistency = type_frame_counts(store, type_id)[pairs] / store.total_frames
+        layer = np.full_like(matrix, np.nan)
+        present = consistency > 0
+        layer[r[present], c[present]] = consistency[present]
+        layer_matrices[type_id] = encode_float32(layer)
+
+    return {
+        'totalFrames': store.total_frames,
+        'rows': rows,
+        'cols': cols,
+        'shape': [len(rows), len(cols)],
+        'matrix': encode_float32(matrix),
+        'typeIds': list(INTERACTION_TYPES),
+        'typeMask': base64.b64encode(type_mask.tobytes()).decode('ascii'),
+        'layers': layer_matrices,
+    }
+
+def layer_ids(value):
+    """Validated INTERACTION_TYPES ids of a comma-separated layers argument"""
+    ids = [v.strip() for v in value.split(',') if v.strip()]
+    unknown = [v for v in ids if v not in INTERACTION_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown interaction type: {', '.join(unknown)}")
+    return ids
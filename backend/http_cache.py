@@ -0,0 +1,65 @@
+"""
+ETags and compressed bodies for the data endpoints
+"""
+import gzip
+import hashlib
+import zlib
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+COMPRESS_MIN_BYTES = 1024  # smaller bodies are sent uncompressed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+
+def response_etag(digest, name):
+    """
+    Strong ETag of the response called name, built from the system's
+    fingerprint digest
+    """
+    return hashlib.sha1(f"{digest}:{name!r}".encode('utf-8')).hexdigest()
+
+def choose_encoding(accept_encodings):
+    """
+    'br', 'gzip' or None for a parsed Accept-Encoding header
+    The highest quality wins; brotli is preferred on a tie and only
+    offered when the brotli package is installed.
+    """
+    offered = (('br',) if HAS_BROTLI else ()) + ('gzip',)
+    best = max(offered, key=lambda encoding: accept_encodings.quality(encoding))
+    return best if accept_encodings.quality(best) > 0 else None
+
+def encode_body(body, encoding):
+    """
+    (body, encoding actually applied) for a JSON body in bytes
+    Bodies under COMPRESS_MIN_BYTES are left as they are.
+    """
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+
+def encode_stream(chunks, encoding):
+    """
+    Compress a stream of byte chunks for encoding ('br', 'gzip' or None),
+    flushing after every chunk so the client can decode as data arrives
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        compress, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        compress, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+    for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
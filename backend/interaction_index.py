@@ -0,0 +1,140 @@
+"""
+Consistency-sorted index of a system's interactions for filtered queries
+"""
+import base64
+
+import numpy as np
+
+# Mirrors INTERACTION_TYPES in frontend/src/utils/constants.js: a pair has a
+# type when any keyword occurs in its lowercased, '; '-joined types
+INTERACTION_TYPES = {
+    'h-bond': ('h-bond',),
+    'salt-bridge': ('salt-bridge', 'salt bridge'),
+    'pi-pi': ('pi-pi', 'π-π'),
+    'cation-pi': ('cation-π', 'cation-pi'),
+    'anion-pi': ('anion-π', 'anion-pi'),
+    'ch-on': ('ch-o', 'c-h'),
+    'ch-pi': ('ch-π', 'ch-pi'),
+    'halogen': ('halogen',),
+    'polar-vdw': ('polar vdw', 'polar_vdw'),
+    'apolar-vdw': ('apolar vdw', 'apolar_vdw'),
+    'proximal': ('proximal',),
+    'clash': ('clash',),
+    'water': ('water',),
+    'metal': ('metal',),
+    'ss-bond': ('s-s', 'ss'),
+}
+
+def matches_type(types_string, type_id):
+    """True when a '; '-joined types string matches an INTERACTION_TYPES id"""
+    lowered = types_string.lower()
+    return any(keyword in lowered for keyword in INTERACTION_TYPES[type_id])
+
+class InteractionIndex:
+    """
+    A system's interactions in response order (consistency, descending)
+    with column arrays for filtering and a posting list per type id
+    Positions refer to that order; entries[i] is the response dict of
+    position i. Filtering touches the posting lists and the matching
+    positions only.
+    """
+
+    def __init__(self, store):
+        self.entries = store.interactions()
+        self.pairs = store.interaction_order()  # store pair index of each position
+        self.positions = {(e['id1'], e['id2']): pos for pos, e in enumerate(self.entries)}
+        # By chain and number only (compare.pair_key), first position kept
+        self.residue_pairs = {}
+        for pos, e in enumerate(self.entries):
+            self.residue_pairs.setdefault((e['chain1'], e['resNum1'], e['chain2'], e['resNum2']), pos)
+        self.occupancy = np.asarray(store.occupancy)[self.pairs]
+        self.frames = store.frames.tolist()
+        self.token = store.meta['generation']  # changes whenever the store is recompiled
+        self.total_frames = store.total_frames
+        self.preliminary_frames = store.preliminary_frames()
+        n = len(self.entries)
+        self.consistency = np.fromiter((e['consistency'] for e in self.entries), dtype=np.float64, count=n)
+        self.res_num = np.array([[e['resNum1'], e['resNum2']] for e in self.entries], dtype=np.int64).reshape(-1, 2)
+        chains = sorted({e['chain1'] for e in self.entries} | {e['chain2'] for e in self.entries})
+        self.chain_ids = {chain: i for i, chain in enumerate(chains)}
+        self.chain = np.array([[self.chain_ids[e['chain1']], self.chain_ids[e['chain2']]] for e in self.entries],
+                              dtype=np.int32).reshape(-1, 2)
+
+        # Entries share a handful of distinct type lists; match each list once
+        matched = {}
+        postings = {type_id: [] for type_id in INTERACTION_TYPES}
+        for pos, entry in enumerate(self.entries):
+            types = tuple(entry['typesArray'])
+            if types not in matched:
+                joined = '; '.join(types)
+                matched[types] = [t for t in INTERACTION_TYPES if matches_type(joined, t)]
+            for type_id in matched[types]:
+                postings[type_id].append(pos)
+        self.postings = {t: np.array(p, dtype=np.int64) for t, p in postings.items()}
+
+        self.nbytes = (self.consistency.nbytes + self.res_num.nbytes + self.chain.nbytes
+                       + self.occupancy.nbytes + self.pairs.nbytes
+                       + sum(p.nbytes for p in self.postings.values())
+                       + 200 * n)  # rough size of the entry dicts
+
+    def query(self, min_consistency=None, types=None, chains=None, res_min=None, res_max=None):
+        """
+        Positions matching every given filter, in response order
+        types: any of these INTERACTION_TYPES ids; chains: either residue on
+        one of these chains; res_min/res_max: a residue numbered in range,
+        on one of chains when those are given too.
+        """
+        if types is not None:
+            lists = [self.postings[t] for t in types]
+            positions = np.unique(np.concatenate(lists)) if lists else np.zeros(0, dtype=np.int64)
+        else:
+            positions = np.arange(len(self.entries), dtype=np.int64)
+
+        if min_consistency is not None:
+            # Positions are sorted by consistency, so the filter is a prefix
+            cut = np.searchsorted(-self.consistency, -min_consistency, side='right')
+            positions = positions[:np.searchsorted(positions, cut)]
+
+        if chains is not None or res_min is not None or res_max is not None:
+            side_ok = np.ones((len(positions), 2), dtype=bool)
+            if chains is not None:
+                wanted = [self.chain_ids[c] for c in chains if c in self.chain_ids]
+                side_ok &= np.isin(self.chain[positions], wanted)
+            res = self.res_num[positions]
+            if res_min is not None:
+                side_ok &= res >= res_min
+            if res_max is not None:
+                side_ok &= res <= res_max
+            positions = positions[side_ok.any(axis=1)]
+
+        return positions
+
+    def presence(self, positions):
+        """Dense bool frame presence of positions (rows) over frames (columns)"""
+        return np.unpackbits(self.occupancy[positions], axis=1, count=self.total_frames).astype(bool)
+
+    def page(self, positions, after=None, limit=None, bitmaps=False):
+        """
+        Entries of positions past the cursor position after, up to limit,
+        with their base64 frameBitmap when bitmaps is set
+        Returns (entries, next cursor position or None).
+        """
+        positions, next_after = self.page_positions(positions, after, limit)
+        return list(self.iter_entries(positions, bitmaps)), next_after
+
+    def page_positions(self, positions, after=None, limit=None):
+        """(positions past after, up to limit; next cursor position or None)"""
+        if after is not None:
+            positions = positions[np.searchsorted(positions, after, side='right'):]
+        if limit is not None and len(positions) > limit:
+            positions = positions[:limit]
+            return positions, int(positions[-1])
+        return positions, None
+
+    def iter_entries(self, positions, bitmaps=False):
+        """Entries of positions one at a time, with frameBitmap when bitmaps is set"""
+        for i in positions.tolist():
+            if bitmaps:
+                yield dict(self.entries[i], frameBitmap=base64.b64encode(self.occupancy[i].tobytes()).decode('ascii'))
+            else:
+                yield self.entries[i]
@@ -0,0 +1,98 @@
+"""
+Interface pre-cropping of frames before they are sent to CoCoMaps
+"""
+import csv
+import os
+
+import numpy as np
+
+from backend.structure import parse_atoms, neighbor_pairs
+
+def interface_residue_mask(atoms, chains_1, chains_2, radius):
+    """
+    Atoms belonging to residues near the partner chain set
+    Residues of chains_1 (chains_2) are kept when any of their atoms lies
+    within radius of a chains_2 (chains_1) atom. Residues of other chains,
+    such as waters and ions, are kept when they lie within radius of a
+    kept interface atom so bridged contacts survive.
+    """
+    side_1 = np.isin(atoms['chain'], list(chains_1))
+    side_2 = np.isin(atoms['chain'], list(chains_2))
+    coords = atoms['coords']
+    residue = atoms['residue']
+    keep_residue = np.zeros(residue.max() + 1 if len(residue) else 0, dtype=bool)
+
+    idx_1 = np.flatnonzero(side_1)
+    idx_2 = np.flatnonzero(side_2)
+    near_1, near_2, _ = neighbor_pairs(coords[idx_1], coords[idx_2], radius)
+    keep_residue[residue[idx_1[near_1]]] = True
+    keep_residue[residue[idx_2[near_2]]] = True
+
+    interface = np.flatnonzero(keep_residue[residue] & (side_1 | side_2))
+    other = np.flatnonzero(~(side_1 | side_2))
+    _, near_other, _ = neighbor_pairs(coords[interface], coords[other], radius)
+    keep_residue[residue[other[near_other]]] = True
+
+    return keep_residue[residue]
+
+def crop_frame(data, chains_1, chains_2, cutoff, margin):
+    """
+    Crop a frame's PDB records to the chains_1/chains_2 interface
+    Whole residues within cutoff + margin of the partner set are kept.
+    Returns the cropped PDB as bytes.
+    """
+    atoms = parse_atoms(data)
+    if not atoms['lines']:
+        return bytes(data)
+    keep = interface_residue_mask(atoms, chains_1, chains_2, cutoff + margin)
+
+    out = []
+    previous_chain = None
+    for i in np.flatnonzero(keep):
+        chain = atoms['chain'][i]
+        if previous_chain is not None and chain != previous_chain:
+            out.append(b"TER\n")
+        out.append(atoms['lines'][i] + b"\n")
+        previous_chain = chain
+    out.append(b"TER\nEND\n")
+    return b"".join(out)
+
+def crop_params(params, margin):
+    """crop_frame keyword arguments for a frame's CoCoMaps parameters"""
+    return {
+        'chains_1': params['chains_set_1'],
+        'chains_2': params['chains_set_2'],
+        'cutoff': float(params['CUT_OFF']),
+        'margin': margin,
+    }
+
+def final_file_contacts(csv_file):
+    """Set of (residue 1, residue 2, interaction types) rows of a final_file CSV"""
+    contacts = set()
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            types = tuple(sorted(t.strip() for t in (row.get('Type of Interactions') or '').split(';')
+                                 if t.strip()))
+            contacts.add((
+                f"{row['Chain 1']}-{row['Res. Name 1']}{row['Res. Number 1']}",
+                f"{row['Chain 2']}-{row['Res. Name 2']}{row['Res. Number 2']}",
+                types,
+            ))
+    return contacts
+
+def compare_final_files(full_csv, cropped_csv):
+    """
+    Compare the interactions CoCoMaps found with and without cropping
+    Returns a report with the contacts only the full run or only the
+    cropped run found.
+    """
+    full = final_file_contacts(full_csv) if os.path.exists(full_csv) else set()
+    cropped = final_file_contacts(cropped_csv) if os.path.exists(cropped_csv) else set()
+    missing = sorted(full - cropped)
+    extra = sorted(cropped - full)
+    return {
+        'match': not missing and not extra,
+        'contacts': len(full),
+        'missing': [list(c[:2]) + ['; '.join(c[2])] for c in missing],
+        'extra': [list(c[:2]) + ['; '.join(c[2])] for c in extra],
+    }
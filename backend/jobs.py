@@ -0,0 +1,319 @@
+"""
+Durable SQLite job queue and worker processes for upload processing
+"""
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from backend.file_lock import lock
+
+ACTIVE_STATUSES = ('queued', 'splitting', 'analyzing')
+RUNNING_STATUSES = ('splitting', 'analyzing')
+POLL_INTERVAL = 1.0  # seconds an idle worker waits before checking the queue again
+RETRY_INTERVAL = 30.0  # seconds between attempts to take over the worker pool
+HEARTBEAT_INTERVAL = 10.0  # seconds between heartbeats of a running job, and between orphan checks
+ORPHAN_TIMEOUT = 60.0  # seconds without a heartbeat before a running job is queued again
+
+# Config keys handed to worker processes
+WORKER_CONFIG_KEYS = (
+    'UPLOAD_FOLDER', 'DATA_FOLDER', 'JOB_DB', 'MATERIALIZE_FRAMES',
+    'COCOMAPS_WORKERS', 'COCOMAPS_WARM_CONTAINERS', 'COCOMAPS_RECYCLE_AFTER', 'COCOMAPS_EXEC_TIMEOUT',
+    'DOCKER_COMMAND',
+    'RESULT_CACHE_DIR', 'RESULT_CACHE_MAX_BYTES', 'CROP_INTERFACE', 'CROP_MARGIN', 'CROP_VALIDATE',
+    'QUICKLOOK', 'PARSE_WORKERS',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    system TEXT NOT NULL,
+    source TEXT,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    progress INTEGER NOT NULL DEFAULT 0,
+    frames INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    cache_hits INTEGER NOT NULL DEFAULT 0,
+    cache_misses INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    warning TEXT,
+    worker_pid INTEGER,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_system ON jobs (system, id);
+CREATE TABLE IF NOT EXISTS frames (
+    job_id INTEGER NOT NULL,
+    frame INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (job_id, frame)
+);
+"""
+
+# Columns added after the first schema, applied to existing databases
+MIGRATIONS = (
+    ('cache_hits', "ALTER TABLE jobs ADD COLUMN cache_hits INTEGER NOT NULL DEFAULT 0"),
+    ('cache_misses', "ALTER TABLE jobs ADD COLUMN cache_misses INTEGER NOT NULL DEFAULT 0"),
+    ('heartbeat', "ALTER TABLE jobs ADD COLUMN heartbeat REAL"),
+    ('warning', "ALTER TABLE jobs ADD COLUMN warning TEXT"),
+)
+
+class JobStore:
+    """
+    Jobs and per-frame states shared by every process serving the app
+    Jobs move queued -> splitting -> analyzing -> completed/failed. Workers
+    claim the highest-priority, oldest queued job and keep its heartbeat
+    fresh while they run it.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _Connection(conn)
+
+    def enqueue(self, system, source=None, priority=0):
+        """Queue a job for a system; source is the upload to split, or None to resume"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (system, source, status, priority, created, updated) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (system, source, priority, now, now))
+            return cursor.lastrowid
+
+    def claim(self, worker_pid):
+        """Atomically take the next queued job, or return None"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, id LIMIT 1").fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = 'splitting', worker_pid = ?, heartbeat = ?, updated = ? "
+                        "WHERE id = ?",
+                        (worker_pid, now, now, row['id']))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row is not None else None
+
+    def update(self, job_id, **fields):
+        """Set job columns such as status, progress, frames, skipped, cache counts, error or warning"""
+        fields['updated'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def set_frame(self, job_id, frame, status, error=None):
+        """Record the state of one frame of a job"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO frames (job_id, frame, status, error) VALUES (?, ?, ?, ?)",
+                (job_id, frame, status, error))
+
+    def is_active(self, system):
+        """True when the system has a queued or running job"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM jobs WHERE system = ? AND status IN ({_placeholders(ACTIVE_STATUSES)})",
+                (system, *ACTIVE_STATUSES)).fetchone()
+        return row is not None
+
+    def latest(self, system):
+        """Status of the most recent job for a system, or None"""
+        with self._connect() as conn:
+            job = conn.execute(
+                "SELECT * FROM jobs WHERE system = ? ORDER BY id DESC LIMIT 1", (system,)).fetchone()
+            if job is None:
+                return None
+            failed = conn.execute(
+                "SELECT frame, error FROM frames WHERE job_id = ? AND status = 'failed' ORDER BY frame",
+                (job['id'],)).fetchall()
+
+        status = {
+            'jobId': job['id'],
+            'status': job['status'],
+            'progress': job['progress'],
+            'frames': job['frames'],
+            'skippedFrames': job['skipped'],
+            'cacheHits': job['cache_hits'],
+            'cacheMisses': job['cache_misses'],
+            'priority': job['priority'],
+            'failedFrames': [{'frame': row['frame'], 'error': row['error']} for row in failed]
+        }
+        if job['error']:
+            status['error'] = job['error']
+        if job['warning']:
+            status['warning'] = job['warning']
+        return status
+
+    def finished_since(self, after=None):
+        """
+        Systems whose jobs completed or failed after the time after, and the
+        latest such time to pass next; all finished systems when after is None
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT system, MAX(updated) AS updated FROM jobs "
+                "WHERE status IN ('completed', 'failed') AND updated > ? GROUP BY system",
+                (after if after is not None else float('-inf'),)).fetchall()
+        latest = max((row['updated'] for row in rows), default=after)
+        return sorted(row['system'] for row in rows), latest
+
+    def heartbeat(self, job_id):
+        """Mark a running job's worker as alive"""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+    def requeue_orphans(self, timeout=ORPHAN_TIMEOUT):
+        """
+        Put running jobs without a heartbeat for timeout seconds back in the
+        queue, as their worker has died; returns how many were requeued
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker_pid = NULL, heartbeat = NULL, updated = ? "
+                f"WHERE status IN ({_placeholders(RUNNING_STATUSES)}) AND COALESCE(heartbeat, updated) < ?",
+                (now, *RUNNING_STATUSES, now - timeout))
+            return cursor.rowcount
+
+class Heartbeat:
+    """Background thread beating a job's heartbeat every interval seconds while in a with block"""
+
+    def __init__(self, store, job_id, interval=HEARTBEAT_INTERVAL):
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.heartbeat(self.job_id)
+            except sqlite3.Error:
+                continue  # the next beat tries again
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+class _Connection:
+    """sqlite3 connection that closes when the with block ends"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+def _placeholders(values):
+    return ', '.join('?' for _ in values)
+
+def get_job_store(app):
+    """The app's JobStore, created on first use"""
+    store = app.extensions.get('job_store')
+    if store is None:
+        store = app.extensions['job_store'] = JobStore(app.config['JOB_DB'])
+    return store
+
+def worker_main(config):
+    """
+    Worker process loop: claim jobs from the store and process them,
+    requeueing orphaned jobs every HEARTBEAT_INTERVAL
+    """
+    from backend.app import create_app
+    from backend.routes.upload import process_job
+
+    app = create_app()
+    app.config.update(config)
+    store = get_job_store(app)
+    pid = os.getpid()
+
+    next_check = 0.0
+    with app.app_context():
+        while True:
+            if time.time() >= next_check:
+                store.requeue_orphans()
+                next_check = time.time() + HEARTBEAT_INTERVAL
+            job = store.claim(pid)
+            if job is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            with Heartbeat(store, job['id']):
+                process_job(store, job)
+
+_pool = None
+_pool_lock_file = None
+_next_attempt = 0.0
+
+def start_workers(app):
+    """
+    Start the app's fixed pool of JOB_WORKERS worker processes
+    Only one process per job database owns the pool, so running several
+    WSGI processes does not multiply the number of workers. Returns True
+    when this process started the pool.
+    """
+    global _pool, _pool_lock_file, _next_attempt
+    count = app.config['JOB_WORKERS']
+    if _pool is not None or count <= 0 or time.time() < _next_attempt:
+        return False
+    _next_attempt = time.time() + RETRY_INTERVAL
+
+    lock_file = open(app.config['JOB_DB'] + '.workers.lock', 'w')
+    if not lock(lock_file, blocking=False):
+        lock_file.close()
+        return False
+    _pool_lock_file = lock_file
+
+    get_job_store(app).requeue_orphans()
+    config = {key: app.config[key] for key in WORKER_CONFIG_KEYS}
+    context = multiprocessing.get_context('spawn')
+    _pool = []
+    for _ in range(count):
+        process = context.Process(target=worker_main, args=(config,), daemon=True)
+        process.start()
+        _pool.append(process)
+    return True
+
+if __name__ == '__main__':
+    # Run the worker pool in the foreground, e.g. next to a multi-process
+    # WSGI server started with JOB_WORKERS = 0
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from backend.app import create_app
+
+    app = create_app()
+    if not start_workers(app):
+        print("Worker pool already running for this job database")
+        sys.exit(1)
+    print(f"Started {len(_pool)} job worker(s) on {app.config['JOB_DB']}")
+    for process in _pool:
+        process.join()
@@ -0,0 +1,173 @@
+"""
+Per-system frame completion manifest for resumable analysis
+"""
+import hashlib
+import json
+import os
+import threading
+
+from backend.pdb_frames import frame_path, load_frame_index
+
+MANIFEST_FILE = "analysis_manifest.jsonl"
+INPUT_FILE_NAME = "example_input.json"
+
+# CoCoMaps outputs a frame must have before it counts as analyzed
+REQUIRED_OUTPUTS = (
+    "_A_B_final_file.csv",
+    "_A_B_summary_table.csv",
+    "_A_B_complex.pdb_Rsa_stats.csv",
+)
+
+def output_name(frame_num, suffix):
+    """CoCoMaps output file name for a frame"""
+    return f"frame_{frame_num}.pd_h.pdb{suffix}"
+
+def file_sha256(path):
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_params(frame_dir):
+    """CoCoMaps parameters of a frame, without the frame-specific pdb_file path"""
+    with open(os.path.join(frame_dir, INPUT_FILE_NAME), 'r') as f:
+        params = json.load(f)
+    params.pop('pdb_file', None)
+    return params
+
+def params_hash(params):
+    """Stable hash of a CoCoMaps parameter dict"""
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def input_hash(system_dir, frame_num, index=None):
+    """Hash of a frame's coordinates, from the frame index when there is one"""
+    index = index if index is not None else load_frame_index(system_dir)
+    if index is not None:
+        for entry in index['frames']:
+            if entry['frame'] == frame_num:
+                return entry['sha256']
+    path = frame_path(system_dir, frame_num)
+    return file_sha256(path) if os.path.exists(path) else None
+
+class Manifest:
+    """
+    Completion record for every frame of a system
+    Each frame maps to its input hash, parameter hash, status and the
+    checksums of its required outputs. Updates are appended to a JSON lines
+    file so a crash mid-run loses at most the frame in progress.
+    extra_params are settings outside example_input.json that change the
+    outputs, such as interface cropping.
+    """
+
+    def __init__(self, system_dir, extra_params=None):
+        self.system_dir = system_dir
+        self.extra_params = extra_params or {}
+        self.path = os.path.join(system_dir, MANIFEST_FILE)
+        self.frames = {}
+        self._lock = threading.Lock()
+        self._index = load_frame_index(system_dir)
+        self._load()
+
+    def _load(self):
+        lines = 0
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from an interrupted run
+                    self.frames[entry['frame']] = entry
+                    lines += 1
+        except FileNotFoundError:
+            return
+        if lines > 2 * len(self.frames):
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for frame_num in sorted(self.frames):
+                f.write(json.dumps(self.frames[frame_num]) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def _append(self, entry):
+        self.frames[entry['frame']] = entry
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def _outputs(self, frame_num):
+        frame_dir = os.path.join(self.system_dir, f"frame_{frame_num}")
+        return {suffix: os.path.join(frame_dir, output_name(frame_num, suffix))
+                for suffix in REQUIRED_OUTPUTS}
+
+    def _current(self, frame_num):
+        """Input and parameter hashes the frame would be analyzed with now"""
+        frame_dir = os.path.join(self.system_dir, f"frame_{frame_num}")
+        try:
+            params = params_hash({**load_params(frame_dir), **self.extra_params})
+        except (OSError, ValueError):
+            params = None
+        return input_hash(self.system_dir, frame_num, self._index), params
+
+    def is_complete(self, frame_num):
+        """True when the frame's recorded outputs are present and up to date"""
+        entry = self.frames.get(frame_num)
+        if not entry or entry['status'] != 'done':
+            return False
+        if (entry['input'], entry['params']) != self._current(frame_num):
+            return False
+        for suffix, path in self._outputs(frame_num).items():
+            if not os.path.exists(path) or file_sha256(path) != entry['outputs'].get(suffix):
+                return False
+        return True
+
+    def pending(self, frame_numbers):
+        """
+        Split frames into those needing analysis and those already complete
+        Frames with a full set of outputs but no manifest entry (analyzed
+        before the manifest existed) are adopted as complete.
+        Returns (pending, skipped) lists of frame numbers.
+        """
+        pending, skipped = [], []
+        for frame_num in frame_numbers:
+            if frame_num not in self.frames and self._has_outputs(frame_num):
+                self.record(frame_num, 'done')
+            if self.is_complete(frame_num):
+                skipped.append(frame_num)
+            else:
+                pending.append(frame_num)
+        return pending, skipped
+
+    def _has_outputs(self, frame_num):
+        return all(os.path.exists(path) for path in self._outputs(frame_num).values())
+
+    def record(self, frame_num, status, error=None):
+        """
+        Record the outcome of analyzing a frame
+        A 'done' frame missing any required output is recorded as failed.
+        Returns the status that was recorded.
+        """
+        input_digest, params_digest = self._current(frame_num)
+        outputs = {}
+        if status == 'done':
+            for suffix, path in self._outputs(frame_num).items():
+                if not os.path.exists(path):
+                    status = 'failed'
+                    error = f"missing output {os.path.basename(path)}"
+                    break
+                outputs[suffix] = file_sha256(path)
+
+        with self._lock:
+            self._append({
+                'frame': frame_num,
+                'status': status,
+                'input': input_digest,
+                'params': params_digest,
+                'outputs': outputs,
+                'error': error
+            })
+        return status
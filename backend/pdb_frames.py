@@ -0,0 +1,252 @@
+"""
+Streaming splitter and byte-offset frame index for multi-model PDB files
+"""
+import hashlib
+import json
+import mmap
+import os
+
+try:
+    import MDAnalysis as mda
+    from MDAnalysis.coordinates import PDB
+    HAS_MDA = True
+except ImportError:
+    HAS_MDA = False
+
+FRAME_END = b"END\n"
+# Records ahead of the first MODEL that describe every model's coordinate frame
+HEADER_RECORDS = (b"CRYST1", b"ORIGX", b"SCALE", b"MTRIX")
+INDEX_FILE = "frame_index.json"
+INDEX_VERSION = 1
+
+def _next_line(buf, pos):
+    """Return the offset of the line following the one containing pos"""
+    eol = buf.find(b"\n", pos)
+    return len(buf) if eol == -1 else eol + 1
+
+def _find_record(buf, record, start, end=None):
+    """Find the next line at or after start that begins with record, or -1"""
+    if end is None:
+        end = len(buf)
+    if start == 0 and buf[:len(record)] == record:
+        return 0
+    idx = buf.find(b"\n" + record, max(start - 1, 0), end)
+    return -1 if idx == -1 else idx + 1
+
+def find_model_ranges(buf):
+    """
+    Locate MODEL/ENDMDL blocks in a PDB buffer
+    Returns (offset, length) byte ranges of each model's records, excluding
+    the MODEL and ENDMDL lines themselves
+    """
+    ranges = []
+    pos = 0
+    while True:
+        start = _find_record(buf, b"MODEL", pos)
+        if start == -1:
+            break
+        body = _next_line(buf, start)
+        end = _find_record(buf, b"ENDMDL", body)
+        if end == -1:
+            raise ValueError(f"MODEL record at byte {start} has no matching ENDMDL")
+        if _find_record(buf, b"MODEL", body, end) != -1:
+            raise ValueError(f"Nested MODEL record after byte {start}")
+        ranges.append((body, end - body))
+        pos = _next_line(buf, end)
+    return ranges
+
+def header_records(buf, end):
+    """Crystallographic HEADER_RECORDS lines found before byte end, as bytes"""
+    lines = []
+    pos = 0
+    while pos < end:
+        next_pos = min(_next_line(buf, pos), end)
+        if bytes(buf[pos:pos + 6]).startswith(HEADER_RECORDS):
+            lines.append(bytes(buf[pos:next_pos]))
+        pos = next_pos
+    return b"".join(lines)
+
+def frame_path(output_dir, frame_num):
+    """Path of frame_N/frame_N.pdb inside a system folder"""
+    return os.path.join(output_dir, f"frame_{frame_num}", f"frame_{frame_num}.pdb")
+
+def split_pdb_file(pdb_file, output_dir, on_frame=None, materialize=True):
+    """
+    Split a multi-model PDB file into output_dir/frame_N folders
+    Each model's byte range is located in a memory map and recorded in a
+    frame_index.json sidecar. With materialize=True the range is also copied
+    to frame_N/frame_N.pdb; otherwise frames are written later on demand by
+    materialize_frame. The CRYST1/ORIGXn/SCALEn/MTRIXn records ahead of the
+    first model are kept in the index and written at the top of every frame;
+    other header records (REMARK, SEQRES, ...) are dropped. Inputs without
+    MODEL/ENDMDL records fall back to MDAnalysis and are always written out.
+    on_frame(frame_num, frame_count) is called after each frame is handled.
+    Returns the number of frames.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(pdb_file, 'rb') as src:
+        stat = os.fstat(src.fileno())
+        if stat.st_size == 0:
+            raise ValueError("PDB file is empty")
+
+        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = find_model_ranges(mm)
+            if ranges:
+                header = header_records(mm, ranges[0][0])
+                frames = []
+                with memoryview(mm) as view:
+                    for i, (offset, length) in enumerate(ranges):
+                        frame_file = frame_path(output_dir, i + 1)
+                        os.makedirs(os.path.dirname(frame_file), exist_ok=True)
+                        with view[offset:offset + length] as frame_view:
+                            digest = hashlib.sha256(header)
+                            digest.update(frame_view)
+                            frames.append({
+                                'frame': i + 1,
+                                'offset': offset,
+                                'length': length,
+                                'sha256': digest.hexdigest()
+                            })
+                            if materialize:
+                                _write_frame(frame_file, frame_view, header)
+                        if on_frame:
+                            on_frame(i + 1, len(ranges))
+
+                write_frame_index(output_dir, {
+                    'version': INDEX_VERSION,
+                    'source': _source_ref(pdb_file, output_dir),
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'header': header.decode('latin-1'),
+                    'frames': frames
+                })
+                return len(ranges)
+
+    return _split_with_mdanalysis(pdb_file, output_dir, on_frame)
+
+def _source_ref(pdb_file, output_dir):
+    """Store the source relative to the system folder when it lives inside it"""
+    source = os.path.abspath(pdb_file)
+    root = os.path.abspath(output_dir)
+    if os.path.dirname(source) == root:
+        return os.path.basename(source)
+    return source
+
+def _write_frame(frame_file, frame_view, header=b""):
+    """Write the header records, one model's records and an END record"""
+    tmp_file = frame_file + '.tmp'
+    with open(tmp_file, 'wb') as dst:
+        dst.write(header)
+        dst.write(frame_view)
+        dst.write(FRAME_END)
+    os.replace(tmp_file, frame_file)
+
+def write_frame_index(system_dir, index):
+    """Atomically write the frame index sidecar for a system"""
+    index_file = os.path.join(system_dir, INDEX_FILE)
+    tmp_file = index_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_file, index_file)
+
+def load_frame_index(system_dir):
+    """
+    Load the frame index for a system
+    Returns None when there is no index or the source file has changed since
+    it was built
+    """
+    index_file = os.path.join(system_dir, INDEX_FILE)
+    try:
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if index.get('version') != INDEX_VERSION:
+        return None
+    try:
+        stat = os.stat(index_source(system_dir, index))
+    except OSError:
+        return None
+    if stat.st_size != index['size'] or stat.st_mtime_ns != index['mtime_ns']:
+        return None
+    return index
+
+def index_source(system_dir, index):
+    """Absolute path of the PDB file an index points into"""
+    return os.path.join(system_dir, index['source'])
+
+class FrameSource:
+    """
+    Read-only view of indexed frames in the original upload
+    frame(n) returns a zero-copy memoryview over model n's records; views
+    must be released before the source is closed. header holds the records
+    written ahead of every frame.
+    """
+
+    def __init__(self, system_dir, index=None):
+        self.index = index or load_frame_index(system_dir)
+        if self.index is None:
+            raise FileNotFoundError(f"No valid frame index in {system_dir}")
+        self.frames = {entry['frame']: entry for entry in self.index['frames']}
+        self.header = self.index.get('header', '').encode('latin-1')
+        self._file = open(index_source(system_dir, self.index), 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def frame(self, frame_num):
+        entry = self.frames[frame_num]
+        return self._view[entry['offset']:entry['offset'] + entry['length']]
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+def materialize_frame(system_dir, frame_num):
+    """
+    Make sure frame_N/frame_N.pdb exists, writing it from the index if needed
+    Returns True when the file was written by this call
+    """
+    frame_file = frame_path(system_dir, frame_num)
+    if os.path.exists(frame_file):
+        return False
+
+    os.makedirs(os.path.dirname(frame_file), exist_ok=True)
+    with FrameSource(system_dir) as source:
+        with source.frame(frame_num) as frame_view:
+            _write_frame(frame_file, frame_view, source.header)
+    return True
+
+def release_frame(system_dir, frame_num):
+    """Remove a materialized frame file that the index can recreate"""
+    index = load_frame_index(system_dir)
+    if index is None or not any(entry['frame'] == frame_num for entry in index['frames']):
+        return
+    try:
+        os.remove(frame_path(system_dir, frame_num))
+    except FileNotFoundError:
+        pass
+
+def _split_with_mdanalysis(pdb_file, output_dir, on_frame=None):
+    """Split frames by loading the file into an MDAnalysis Universe"""
+    if not HAS_MDA:
+        raise Exception("No MODEL records found and MDAnalysis not available")
+
+    u = mda.Universe(pdb_file)
+    frame_count = len(u.trajectory)
+    for i, ts in enumerate(u.trajectory):
+        frame_file = frame_path(output_dir, i + 1)
+        os.makedirs(os.path.dirname(frame_file), exist_ok=True)
+        with PDB.PDBWriter(frame_file) as W:
+            W.write(u.atoms)
+        if on_frame:
+            on_frame(i + 1, frame_count)
+    return frame_count
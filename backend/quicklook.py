@@ -0,0 +1,224 @@
+"""
+In-process "quick look" contact detection producing final_file-compatible CSVs
+"""
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+import os
+
+import numpy as np
+
+from backend.manifest import input_hash, load_params, params_hash
+from backend.pdb_frames import FrameSource, frame_path, load_frame_index
+from backend.structure import parse_atoms, neighbor_pairs
+
+QUICKLOOK_SUFFIX = ".quicklook_A_B_final_file.csv"
+QUICKLOOK_KEY_SUFFIX = ".quicklook.json"  # frame and parameter hashes the CSV was computed from
+FINAL_FILE_HEADER = ['', 'Res. Name 1', 'Res. Number 1', 'Chain 1',
+                     'Res. Name 2', 'Res. Number 2', 'Chain 2', 'Type of Interactions']
+
+COVALENT_H_DIST = 1.2  # Å between a donor and a hydrogen bonded to it
+
+# Charged groups for salt-bridge candidates, by residue name and atom name
+POSITIVE_ATOMS = {
+    'ARG': {'NE', 'NH1', 'NH2'},
+    'LYS': {'NZ'},
+    'HIS': {'ND1', 'NE2'}, 'HIP': {'ND1', 'NE2'}, 'HSP': {'ND1', 'NE2'},
+}
+NEGATIVE_ATOMS = {
+    'ASP': {'OD1', 'OD2'},
+    'GLU': {'OE1', 'OE2'},
+}
+PHOSPHATE_ATOMS = {'OP1', 'OP2', 'O1P', 'O2P'}  # nucleic acid backbone, any residue
+
+def quicklook_path(system_dir, frame_num):
+    """Path of a frame's quick-look final_file CSV"""
+    return os.path.join(system_dir, f"frame_{frame_num}", f"frame_{frame_num}{QUICKLOOK_SUFFIX}")
+
+def _key_path(system_dir, frame_num):
+    return os.path.join(system_dir, f"frame_{frame_num}", f"frame_{frame_num}{QUICKLOOK_KEY_SUFFIX}")
+
+def quicklook_key(system_dir, frame_num, index=None):
+    """Hashes of the coordinates and parameters a frame's quick look depends on"""
+    return {
+        'input': input_hash(system_dir, frame_num, index),
+        'params': params_hash(load_params(os.path.join(system_dir, f"frame_{frame_num}"))),
+    }
+
+def is_current(system_dir, frame_num, index=None):
+    """Whether a frame's quick-look CSV was computed from its current frame and parameters"""
+    if not os.path.exists(quicklook_path(system_dir, frame_num)):
+        return False
+    try:
+        with open(_key_path(system_dir, frame_num)) as f:
+            return json.load(f) == quicklook_key(system_dir, frame_num, index)
+    except (OSError, ValueError):
+        return False
+
+def discard_quicklook(system_dir, frame_num):
+    """Remove a frame's quick-look CSV, e.g. once its full analysis failed"""
+    for path in (quicklook_path(system_dir, frame_num), _key_path(system_dir, frame_num)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _element(atoms):
+    """Element symbols, falling back to the atom name's first letter"""
+    element = np.char.upper(atoms['element'])
+    fallback = np.char.upper(np.char.lstrip(atoms['name'], '0123456789'))
+    return np.where(element == '', np.array([name[:1] for name in fallback]), element)
+
+def _charge_mask(atoms, groups, include_phosphate=False):
+    mask = np.zeros(len(atoms['name']), dtype=bool)
+    for resname, names in groups.items():
+        mask |= (atoms['resname'] == resname) & np.isin(atoms['name'], list(names))
+    if include_phosphate:
+        mask |= np.isin(atoms['name'], list(PHOSPHATE_ATOMS))
+    return mask
+
+def _hbond_pairs(atoms, element, idx_1, idx_2, params):
+    """
+    Donor/acceptor N and O pairs across the interface within HBOND_DIST
+    When hydrogens are present, a pair also needs a hydrogen on either
+    atom with a D-H...A angle of at least HBOND_ANGLE.
+    """
+    polar = np.isin(element, ['N', 'O'])
+    pol_1 = idx_1[polar[idx_1]]
+    pol_2 = idx_2[polar[idx_2]]
+    i, j, _ = neighbor_pairs(atoms['coords'][pol_1], atoms['coords'][pol_2], params['HBOND_DIST'])
+    atom_1, atom_2 = pol_1[i], pol_2[j]
+
+    hydrogens = np.flatnonzero(element == 'H')
+    if len(hydrogens) == 0 or len(atom_1) == 0:
+        return atom_1, atom_2
+
+    coords = atoms['coords']
+    donors = np.union1d(atom_1, atom_2)
+    d, h, _ = neighbor_pairs(coords[donors], coords[hydrogens], COVALENT_H_DIST)
+    donor_of_h, h_atoms = donors[d], hydrogens[h]
+    cos_limit = np.cos(np.radians(params['HBOND_ANGLE']))
+
+    def angle_ok(donor, acceptor):
+        # Pair every candidate with each hydrogen on its donor
+        order = np.argsort(donor_of_h, kind='stable')
+        keys = donor_of_h[order]
+        lo = np.searchsorted(keys, donor, side='left')
+        counts = np.searchsorted(keys, donor, side='right') - lo
+        pair = np.repeat(np.arange(len(donor)), counts)
+        hyd = h_atoms[order[np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]]
+        to_donor = coords[donor[pair]] - coords[hyd]
+        to_acceptor = coords[acceptor[pair]] - coords[hyd]
+        cos = np.einsum('ij,ij->i', to_donor, to_acceptor) / (
+            np.linalg.norm(to_donor, axis=1) * np.linalg.norm(to_acceptor, axis=1) + 1e-12)
+        ok = np.zeros(len(donor), dtype=bool)
+        ok[pair[cos <= cos_limit]] = True
+        return ok
+
+    keep = angle_ok(atom_1, atom_2) | angle_ok(atom_2, atom_1)
+    return atom_1[keep], atom_2[keep]
+
+def quick_contacts(data, params):
+    """
+    Residue-level contacts between chains_set_1 and chains_set_2 of a frame
+    Proximal contacts use heavy atoms within CUT_OFF; H-bond and salt-bridge
+    candidates are purely geometric (HBOND_DIST/HBOND_ANGLE, SBRIDGE_DIST).
+    Returns final_file rows as (resName1, resNum1, chain1, resName2,
+    resNum2, chain2, types) tuples, ordered by residue.
+    """
+    atoms = parse_atoms(data)
+    if not atoms['lines']:
+        return []
+    element = _element(atoms)
+    coords = atoms['coords']
+    side_1 = np.isin(atoms['chain'], params['chains_set_1'])
+    side_2 = np.isin(atoms['chain'], params['chains_set_2'])
+    heavy = element != 'H'
+    idx_1 = np.flatnonzero(side_1 & heavy)
+    idx_2 = np.flatnonzero(side_2 & heavy)
+
+    residue = atoms['residue']
+    contacts = {}
+
+    def add(atom_1, atom_2, label):
+        for r1, r2 in set(zip(residue[atom_1].tolist(), residue[atom_2].tolist())):
+            contacts.setdefault((r1, r2), []).append(label)
+
+    i, j, _ = neighbor_pairs(coords[idx_1], coords[idx_2], params['CUT_OFF'])
+    add(idx_1[i], idx_2[j], 'Proximal contact')
+
+    positive = _charge_mask(atoms, POSITIVE_ATOMS)
+    negative = _charge_mask(atoms, NEGATIVE_ATOMS, include_phosphate=True)
+    for mask_1, mask_2 in ((positive, negative), (negative, positive)):
+        c1 = idx_1[mask_1[idx_1]]
+        c2 = idx_2[mask_2[idx_2]]
+        i, j, _ = neighbor_pairs(coords[c1], coords[c2], params['SBRIDGE_DIST'])
+        add(c1[i], c2[j], 'Salt-bridge')
+
+    add(*_hbond_pairs(atoms, element, idx_1, idx_2, params), 'H-bond')
+
+    # First atom of every residue, for its name, number and chain
+    first = np.zeros(residue.max() + 1, dtype=np.int64)
+    first[residue[::-1]] = np.arange(len(residue))[::-1]
+
+    rows = []
+    for (r1, r2), labels in sorted(contacts.items()):
+        specific = [label for label in dict.fromkeys(labels) if label != 'Proximal contact']
+        a1, a2 = first[r1], first[r2]
+        rows.append((
+            atoms['resname'][a1], int(atoms['resseq'][a1]), atoms['chain'][a1],
+            atoms['resname'][a2], int(atoms['resseq'][a2]), atoms['chain'][a2],
+            '; '.join(specific) if specific else 'Proximal contact',
+        ))
+    return rows
+
+def write_quicklook(system_dir, frame_num, index=None):
+    """Compute a frame's quick-look contacts and write its CSV and key"""
+    key = quicklook_key(system_dir, frame_num, index)
+    params = load_params(os.path.join(system_dir, f"frame_{frame_num}"))
+    if index is not None:
+        # Read from the source file; frame_N.pdb may be released mid-read
+        with FrameSource(system_dir, index) as source:
+            with source.frame(frame_num) as frame_view:
+                rows = quick_contacts(frame_view, params)
+    else:
+        with open(frame_path(system_dir, frame_num), 'rb') as f:
+            rows = quick_contacts(f.read(), params)
+
+    out_file = quicklook_path(system_dir, frame_num)
+    tmp_file = out_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FINAL_FILE_HEADER)
+        for i, row in enumerate(rows):
+            writer.writerow([i, *row])
+    os.replace(tmp_file, out_file)
+    # Written last: a crash in between only leaves the CSV to be recomputed
+    with open(_key_path(system_dir, frame_num) + '.tmp', 'w') as f:
+        json.dump(key, f)
+    os.replace(_key_path(system_dir, frame_num) + '.tmp', _key_path(system_dir, frame_num))
+    return len(rows)
+
+def run_quicklook(system_dir, frame_numbers, workers=None):
+    """
+    Write quick-look CSVs for frames that have no CoCoMaps final_file yet
+    Existing CSVs are kept only while their key matches the frame's
+    coordinates and parameters. Failures are skipped; the full analysis
+    still covers those frames.
+    Returns the number of frames written.
+    """
+    index = load_frame_index(system_dir)
+
+    def one(frame_num):
+        final_file = os.path.join(system_dir, f"frame_{frame_num}",
+                                  f"frame_{frame_num}.pd_h.pdb_A_B_final_file.csv")
+        if os.path.exists(final_file) or is_current(system_dir, frame_num, index):
+            return False
+        try:
+            write_quicklook(system_dir, frame_num, index)
+        except Exception:
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers or 1) as pool:
+        return sum(pool.map(one, frame_numbers))
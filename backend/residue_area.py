@@ -0,0 +1,73 @@
+"""
+Per-residue buried surface area over frames, from the compiled ASA layers
+"""
+import numpy as np
+
+from backend.heatmap import encode_float32
+from backend.system_store import ASA_LAYERS, HAS_ASA
+
+HOTSPOTS = 10
+
+def layer_names(value):
+    """Validated ASA_LAYERS names of a comma-separated layers argument"""
+    names = [v.strip() for v in value.split(',') if v.strip()]
+    unknown = [v for v in names if v not in ASA_LAYERS]
+    if unknown:
+        raise ValueError(f"Unknown layer: {', '.join(unknown)}; use {', '.join(ASA_LAYERS)}")
+    return names
+
+def residue_area(store, layers=('buried',), chains=None, top=HOTSPOTS):
+    """
+    Residue x frame ASA series for frames with ASA tables, by frame number,
+    with per-residue and per-frame means and the top residues by mean
+    buried area
+    Series are base64 little-endian float32, row-major; buried area is 0
+    where a residue is off the interface, the other layers NaN.
+    """
+    s = store.strings
+    order = store.numeric_frame_order()
+    columns = order[store.flags[order] & HAS_ASA > 0]
+    rows = np.arange(len(store.res_keys))
+    if chains is not None:
+        chain_ids = [i for i, value in enumerate(s) if value in chains]
+        rows = rows[np.isin(store.res_keys[:, 3], chain_ids)]
+    keys = store.res_keys[rows].tolist()
+    buried = store.res_asa[ASA_LAYERS.index('buried')][rows][:, columns]
+
+    if len(columns):
+        mean_buried, max_buried = buried.mean(axis=1), buried.max(axis=1)
+    else:
+        mean_buried = max_buried = np.zeros(len(rows))
+    residues = [{
+        'id': f"{s[chain]}-{s[name]}{num}",
+        'side': side,
+        'chain': s[chain],
+        'resName': s[name],
+        'resNum': num,
+        'meanBuried': float(mean),
+        'maxBuried': float(peak),
+        'buriedFrames': int(count),
+    } for (side, name, num, chain), mean, peak, count in zip(
+        keys, mean_buried.tolist(), max_buried.tolist(), np.count_nonzero(buried > 0, axis=1).tolist())]
+
+    series, frame_means = {}, {}
+    for layer in layers:
+        values = store.res_asa[ASA_LAYERS.index(layer)][rows][:, columns]
+        series[layer] = encode_float32(values)
+        # Mean over the residues with a value in each frame
+        counted = np.isfinite(values).sum(axis=0)
+        totals = np.nansum(values, axis=0, dtype=np.float64)
+        frame_means[layer] = [total / n if n else None for total, n in zip(totals.tolist(), counted.tolist())]
+
+    # Highest mean buried area first, ties in residue order
+    hotspots = np.argsort(-mean_buried, kind='stable')[:top]
+    return {
+        'totalFrames': store.total_frames,
+        'frames': store.frames[columns].tolist(),
+        'layers': list(layers),
+        'shape': [len(rows), len(columns)],
+        'residues': residues,
+        'series': series,
+        'frameMeans': frame_means,
+        'hotspots': hotspots.tolist(),
+    }
@@ -0,0 +1,200 @@
+"""
+Content-addressed cache of CoCoMaps per-frame outputs
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+
+from backend.manifest import input_hash, load_params, params_hash
+from backend.quicklook import QUICKLOOK_SUFFIX
+
+INDEX_FILE = "index.sqlite3"
+CACHED_SUFFIX = ".csv"  # only the CSV outputs the data endpoints read are cached
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_used);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def frame_cache_key(system_dir, frame_num, extra_params=None):
+    """
+    Cache key of a frame: its coordinate hash plus the full CoCoMaps
+    parameter dict from example_input.json and any extra_params that change
+    the outputs. Returns None when either is unavailable.
+    """
+    coordinates = input_hash(system_dir, frame_num)
+    if coordinates is None:
+        return None
+    try:
+        params = load_params(os.path.join(system_dir, f"frame_{frame_num}"))
+    except (OSError, ValueError):
+        return None
+    params.update(extra_params or {})
+    return hashlib.sha256(f"{coordinates}:{params_hash(params)}".encode('utf-8')).hexdigest()
+
+def _link_or_copy(src, dst):
+    try:
+        os.remove(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def detach_outputs(frame_dir, frame_num):
+    """
+    Give a frame private copies of outputs that are hard links into the
+    cache, so rewriting them in place cannot change a cached entry
+    Call before a frame is analyzed again.
+    """
+    prefix = f"frame_{frame_num}."
+    for name in os.listdir(frame_dir):
+        path = os.path.join(frame_dir, name)
+        if name.startswith(prefix) and name.endswith(CACHED_SUFFIX) and os.stat(path).st_nlink > 1:
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            shutil.copy2(path, tmp_path)
+            os.replace(tmp_path, path)
+
+class ResultCache:
+    """
+    LRU-capped store of per-frame outputs keyed by frame_cache_key
+    Outputs are copied in without their frame_N prefix so an entry can be
+    linked into any frame folder; frames rerun after a restore get private
+    copies first (detach_outputs). The SQLite index keeps last-use times
+    and hit/miss counters shared by every worker process.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(os.path.join(self.cache_dir, INDEX_FILE), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _count(self, conn, name):
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def restore(self, key, frame_dir, frame_num):
+        """Link a cached entry's outputs into a frame folder; returns True on a hit"""
+        entry_dir = self._entry_dir(key)
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+                hit = row is not None and os.path.isdir(entry_dir)
+                if hit:
+                    conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._count(conn, 'hits' if hit else 'misses')
+        finally:
+            conn.close()
+
+        if not hit:
+            return False
+        try:
+            for suffix in os.listdir(entry_dir):
+                _link_or_copy(os.path.join(entry_dir, suffix),
+                              os.path.join(frame_dir, f"frame_{frame_num}{suffix}"))
+        except OSError:
+            return False  # entry evicted while linking
+        return True
+
+    def store(self, key, frame_dir, frame_num):
+        """Add a frame's outputs to the cache and evict down to the size cap"""
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        prefix = f"frame_{frame_num}."
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        size = 0
+        for name in os.listdir(frame_dir):
+            if (name.startswith(prefix) and name.endswith(CACHED_SUFFIX)
+                    and not name.endswith(QUICKLOOK_SUFFIX)):
+                # A copy, not a link: the frame's files may be rewritten in place later
+                src = os.path.join(frame_dir, name)
+                shutil.copy2(src, os.path.join(tmp_dir, name[len(prefix) - 1:]))
+                size += os.path.getsize(src)
+
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another worker stored the same key first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, size, last_used) VALUES (?, ?, ?)",
+                    (key, size, time.time()))
+        finally:
+            conn.close()
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        conn = self._connect()
+        try:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+        finally:
+            conn.close()
+
+    def stats(self):
+        """Hit/miss counters and current size of the cache"""
+        conn = self._connect()
+        try:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        finally:
+            conn.close()
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'entries': entries,
+            'bytes': size,
+            'maxBytes': self.max_bytes
+        }
+
+def get_result_cache(app):
+    """The app's ResultCache, or None when RESULT_CACHE_DIR is unset"""
+    if not app.config.get('RESULT_CACHE_DIR'):
+        return None
+    cache = app.extensions.get('result_cache')
+    if cache is None:
+        cache = app.extensions['result_cache'] = ResultCache(
+            app.config['RESULT_CACHE_DIR'], app.config['RESULT_CACHE_MAX_BYTES'])
+    return cache
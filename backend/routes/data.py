@@ -1,102 +1,491 @@
 """
 Routes for data retrieval
 """
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 from pathlib import Path
-import csv
+import base64
 import os
 
+from backend.compare import MIN_DELTA, compare_interactions, compare_trends, trend_means
+from backend.cooccurrence import cooccurrence_matrix, top_pairs, METRICS
+from backend.geometry import HISTOGRAM_BINS, geometry_summary, pair_geometry
+from backend.heatmap import build_heatmap, layer_ids
+from backend.residue_area import HOTSPOTS, layer_names, residue_area
+from backend.data_cache import (get_data_cache, system_data, system_state, system_values,
+                                interactions_with_bitmaps, SECTIONS)
+from backend.http_cache import response_etag, choose_encoding, encode_body, encode_stream
+from backend.wire_formats import FORMATS, NDJSON_MIMETYPE, encode_binary, ndjson_chunks, offered_mimetypes
+from backend.interaction_index import InteractionIndex, INTERACTION_TYPES
+from backend.system_store import load_system_store
+from backend.result_cache import get_result_cache
+from backend.jobs import get_job_store
+from backend.search_index import get_search_index, pair_key
+
 bp = Blueprint('data', __name__)
 
+def _tagged(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config['DATA_CACHE_CONTROL']
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _cached_response(system_path, name, payload, table=None):
+    """
+    Response of payload(state), with a strong ETag of the system's frame
+    fingerprints, name and the negotiated representation
+    JSON unless the Accept header prefers MessagePack, or Arrow IPC when
+    the response has a table field (the list of records it streams). A
+    matching If-None-Match gets 304 Not Modified without building
+    anything. Bodies are cached encoded for the negotiated Content-Encoding
+    while the frames are unchanged. payload may return an (error response,
+    status) tuple instead, which is sent as it is.
+    """
+    state = system_state(system_path)
+    if state is None:
+        return jsonify({'error': 'No frames found for this system'}), 404
+    return _negotiated_response(os.fspath(system_path), state[2], name, lambda: payload(state), table)
+
+def _negotiated_response(root, digest, name, payload, table=None):
+    """
+    _cached_response for a digest computed by the caller; bodies are cached
+    under root and payload() is called without arguments
+    """
+    mimetype = request.accept_mimetypes.best_match(offered_mimetypes(table), 'application/json')
+    wire_format = FORMATS[mimetype]
+    encoding = choose_encoding(request.accept_encodings)
+    etag = response_etag(digest, (name, wire_format, encoding))
+    if request.if_none_match.contains(etag):
+        return _tagged(current_app.response_class(status=304), etag)
+    
+    cache = get_data_cache(current_app)
+    key = (root, ('body', name, wire_format, encoding))
+    encoded = cache.get(key, digest) if cache is not None else None
+    if encoded is None:
+        value = payload()
+        if isinstance(value, tuple):
+            return value
+        if wire_format == 'json':
+            body = current_app.json.dumps(value).encode('utf-8')
+        else:
+            body = encode_binary(value, wire_format, table)
+        encoded = encode_body(body, encoding)
+        if cache is not None:
+            cache.put(key, digest, encoded, len(encoded[0]))
+    
+    body, applied = encoded
+    response = current_app.response_class(body, mimetype=mimetype)
+    if applied:
+        response.headers['Content-Encoding'] = applied
+    return _tagged(response, etag)
+
+def _request_name(view):
+    """Cache name of a view and the request's query arguments"""
+    return (view, tuple(sorted(request.args.items(multi=True))))
+
+def _system_response(system_id, section, build=None, table=None):
+    """Cached response of one data endpoint, or of build(store) cached as section"""
+    system_path = Path(current_app.config['DATA_FOLDER']) / system_id
+    
+    if not system_path.exists():
+        return jsonify({'error': 'System not found'}), 404
+    
+    def payload(state):
+        values = system_values(get_data_cache(current_app), system_path,
+                               {section: build or SECTIONS[section]}, current_app.config['PARSE_WORKERS'], state)
+        return {'system': system_id, **values[section]}
+    
+    return _cached_response(system_path, section, payload, table)
+
+FILTER_ARGS = ('minConsistency', 'types', 'chain', 'resMin', 'resMax', 'limit', 'cursor')
+
+def _flag_arg(name):
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+def _list_arg(name):
+    value = request.args.get(name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value is not None else None
+
+def _number_arg(name, cast):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+def _filter_args():
+    """InteractionIndex.query arguments from the request; ValueError when invalid"""
+    types = _list_arg('types')
+    unknown = [t for t in types or [] if t not in INTERACTION_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown interaction type: {', '.join(unknown)}")
+    return {
+        'min_consistency': _number_arg('minConsistency', float),
+        'types': types,
+        'chains': _list_arg('chain'),
+        'res_min': _number_arg('resMin', int),
+        'res_max': _number_arg('resMax', int),
+    }
+
+def _interaction_index(system_path, state=None):
+    """The system's cached InteractionIndex, or None without frames"""
+    values = system_values(get_data_cache(current_app), system_path, {'index': InteractionIndex},
+                           current_app.config['PARSE_WORKERS'], state)
+    return values['index'] if values is not None else None
+
+def _page_args():
+    """(query filters, limit) from the request; ValueError when invalid"""
+    filters = _filter_args()
+    limit = _number_arg('limit', int)
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+    return filters, limit
+
+def _cursor_position(index):
+    """Position named by the cursor argument, or None; ValueError when stale"""
+    # Cursors name the last position returned, valid for one compile of the system
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return None
+    token, _, position = cursor.partition(':')
+    if token != index.token or not position.isdigit():
+        raise ValueError('Cursor is invalid or stale; start again without one')
+    return int(position)
+
+def _filtered_interactions(system_id, system_path):
+    """Interactions matching the request's filter arguments, one page at a time"""
+    try:
+        filters, limit = _page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def payload(state):
+        index = _interaction_index(system_path, state)
+        try:
+            after = _cursor_position(index)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        bitmaps = _flag_arg('bitmap')
+        positions = index.query(**filters)
+        interactions, next_after = index.page(positions, after, limit, bitmaps)
+        response = {
+            'system': system_id,
+            'totalFrames': index.total_frames,
+            'preliminary': index.preliminary_frames > 0,
+            'preliminaryFrames': index.preliminary_frames,
+            'matched': len(positions),
+            'nextCursor': f"{index.token}:{next_after}" if next_after is not None else None,
+            'interactions': interactions
+        }
+        if bitmaps:
+            response['bitmapFrames'] = index.frames
+        return response
+    
+    return _cached_response(system_path, _request_name('interactions'), payload, 'interactions')
+
+def _streamed_interactions(system_id, system_path):
+    """
+    Interactions as newline-delimited JSON: a header record with the other
+    response fields (totalFrames, ...), then one interaction per line
+    Lines are encoded as they are sent, so memory does not grow with the
+    result. Filter, paging and bitmap arguments work as for JSON.
+    """
+    filtered = any(arg in request.args for arg in FILTER_ARGS)
+    try:
+        filters, limit = _page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    state = system_state(system_path)
+    if state is None:
+        return jsonify({'error': 'No frames found for this system'}), 404
+    encoding = choose_encoding(request.accept_encodings)
+    etag = response_etag(state[2], (_request_name('interactions'), 'ndjson', encoding))
+    if request.if_none_match.contains(etag):
+        return _tagged(current_app.response_class(status=304), etag)
+    
+    bitmaps = _flag_arg('bitmap')
+    if filtered:
+        index = _interaction_index(system_path, state)
+        try:
+            after = _cursor_position(index)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        positions = index.query(**filters)
+        page, next_after = index.page_positions(positions, after, limit)
+        header = {
+            'system': system_id,
+            'totalFrames': index.total_frames,
+            'preliminary': index.preliminary_frames > 0,
+            'preliminaryFrames': index.preliminary_frames,
+            'matched': len(positions),
+            'nextCursor': f"{index.token}:{next_after}" if next_after is not None else None,
+        }
+        frames = index.frames
+        records = index.iter_entries(page, bitmaps)
+    else:
+        store = load_system_store(system_path, state[0], state[1], current_app.config['PARSE_WORKERS'])
+        preliminary_frames = store.preliminary_frames()
+        header = {
+            'system': system_id,
+            'totalFrames': store.total_frames,
+            'preliminary': preliminary_frames > 0,
+            'preliminaryFrames': preliminary_frames,
+        }
+        frames = store.frames.tolist()
+        records = store.iter_interactions(bitmaps)
+    if bitmaps:
+        header['bitmapFrames'] = frames
+    
+    response = current_app.response_class(encode_stream(ndjson_chunks(header, records), encoding),
+                                          mimetype=NDJSON_MIMETYPE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return _tagged(response, etag)
+
 @bp.route('/systems/<system_id>/interactions', methods=['GET'])
 def get_interactions(system_id):
     """
     Get all interaction data for a system across all frames
     Returns aggregated interaction data with consistency scores
+    Frames CoCoMaps has not finished fall back to quick-look contacts and
+    the response is flagged preliminary.
+    Optional filters: minConsistency, types (INTERACTION_TYPES ids), chain,
+    resMin/resMax, and limit with cursor (from nextCursor) for paging.
+    bitmap=true adds each interaction's frame presence as a base64 packed
+    bitmap (frameBitmap) whose bits follow bitmapFrames.
+    Accept: application/x-ndjson streams the result one line per interaction.
+    """
+    try:
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
+        if not system_path.exists():
+            return jsonify({'error': 'System not found'}), 404
+        offered = offered_mimetypes('interactions', stream=True)
+        if request.accept_mimetypes.best_match(offered) == NDJSON_MIMETYPE:
+            return _streamed_interactions(system_id, system_path)
+        if any(arg in request.args for arg in FILTER_ARGS):
+            return _filtered_interactions(system_id, system_path)
+        if _flag_arg('bitmap'):
+            return _system_response(system_id, 'interactions+bitmaps', interactions_with_bitmaps, 'interactions')
+        return _system_response(system_id, 'interactions', table='interactions')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _windows_view(size, step):
+    """Builder of the sliding-window consistency response for one window setting"""
+    def build(store):
+        frames = store.frames[store.numeric_frame_order()].tolist()
+        starts, counts = store.window_counts(size, step)
+        window_consistency = counts / size
+        interactions = []
+        for pair in store.interaction_order().tolist():
+            info = store.pair_info(pair)
+            interactions.append({
+                'id1': f"{info['chain1']}-{info['resName1']}{info['resNum1']}",
+                'id2': f"{info['chain2']}-{info['resName2']}{info['resNum2']}",
+                'consistency': window_consistency[pair].tolist()
+            })
+        return {
+            'totalFrames': store.total_frames,
+            'size': size,
+            'step': step,
+            'windows': [{'startFrame': frames[start], 'endFrame': frames[start + size - 1]}
+                        for start in starts.tolist()],
+            'interactions': interactions
+        }
+    return build
+
+@bp.route('/systems/<system_id>/interactions/windows', methods=['GET'])
+def get_interaction_windows(system_id):
+    """
+    Get consistency of every interaction in sliding windows of frames
+    size=W frames per window, step=S frames between window starts (default
+    W); frames are taken in frame number order. Interactions follow the
+    interactions endpoint order.
     """
     try:
-        data_folder = current_app.config['DATA_FOLDER']
-        system_path = Path(data_folder) / system_id
+        try:
+            size = _number_arg('size', int)
+            step = _number_arg('step', int)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if size is None or size < 1:
+            return jsonify({'error': 'size must be a positive number of frames'}), 400
+        step = size if step is None else step
+        if step < 1:
+            return jsonify({'error': 'step must be positive'}), 400
         
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
         if not system_path.exists():
             return jsonify({'error': 'System not found'}), 404
         
-        # Find all frame folders
-        frame_folders = sorted([f for f in system_path.iterdir() 
-                               if f.is_dir() and f.name.startswith('frame_')])
+        def payload(state):
+            total_frames = len(state[0])
+            if size > total_frames:
+                return jsonify({'error': f"size exceeds the {total_frames} frames of this system"}), 400
+            name = ('windows', size, step)
+            values = system_values(get_data_cache(current_app), system_path, {name: _windows_view(size, step)},
+                                   current_app.config['PARSE_WORKERS'], state)
+            return {'system': system_id, **values[name]}
         
-        if not frame_folders:
-            return jsonify({'error': 'No frames found for this system'}), 404
+        return _cached_response(system_path, ('windows', size, step), payload, 'interactions')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/systems/<system_id>/interactions/cooccurrence', methods=['GET'])
+def get_interaction_cooccurrence(system_id):
+    """
+    Get how often interactions are present in the same frames
+    metric=count (frames shared), jaccard or pearson. The interactions
+    filters (minConsistency, types, chain, resMin/resMax) select the
+    interactions compared. With topK=K, returns the K most related pairs;
+    otherwise the dense matrix as base64 little-endian float32, row-major.
+    """
+    try:
+        try:
+            filters = _filter_args()
+            top_k = _number_arg('topK', int)
+            metric = request.args.get('metric', 'count')
+            if metric not in METRICS:
+                raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+            if top_k is not None and top_k < 1:
+                raise ValueError("topK must be positive")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        total_frames = len(frame_folders)
-        interaction_map = {}
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
+        if not system_path.exists():
+            return jsonify({'error': 'System not found'}), 404
         
-        # Process each frame
-        for frame_folder in frame_folders:
-            frame_num = int(frame_folder.name.split('_')[1])
-            csv_file = frame_folder / f"{frame_folder.name}.pd_h.pdb_A_B_final_file.csv"
+        def payload(state):
+            index = _interaction_index(system_path, state)
+            positions = index.query(**filters)
+            max_dense = current_app.config['COOCCURRENCE_MAX_DENSE']
+            if top_k is None and len(positions) > max_dense:
+                return jsonify({'error': f"{len(positions)} interactions exceed the dense limit of {max_dense}; "
+                                         "pass topK or narrow the filters"}), 400
             
-            if not csv_file.exists():
-                continue
+            presence = index.presence(positions)
+            response = {
+                'system': system_id,
+                'totalFrames': index.total_frames,
+                'metric': metric,
+                'interactions': [{'id1': index.entries[i]['id1'], 'id2': index.entries[i]['id2']}
+                                 for i in positions.tolist()]
+            }
+            if top_k is not None:
+                i, j, value, count = top_pairs(presence, top_k, metric)
+                response['pairs'] = [{'a': a, 'b': b, 'value': v, 'count': n}
+                                     for a, b, v, n in zip(i.tolist(), j.tolist(), value.tolist(), count.tolist())]
+            else:
+                matrix = cooccurrence_matrix(presence, metric)
+                response['shape'] = list(matrix.shape)
+                response['matrix'] = base64.b64encode(matrix.astype('<f4').tobytes()).decode('ascii')
+            return response
+        
+        return _cached_response(system_path, _request_name('cooccurrence'), payload,
+                                'pairs' if top_k is not None else None)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/systems/<system_id>/interactions/geometry', methods=['GET'])
+def get_interaction_geometry(system_id):
+    """
+    Get atom-level distance and angle statistics from the per-type CSVs
+    With id1 and id2 (as in the interactions response), one residue pair:
+    mean, std and percentiles per interaction type and per atom pair, each
+    atom pair's series across frames and bins-bin histograms per type.
+    Without them, a per-type summary of every interaction matching the
+    interactions filters. Either way types is a list of per-type entries
+    named by their type field.
+    """
+    try:
+        try:
+            filters = _filter_args()
+            bins = _number_arg('bins', int)
+            bins = HISTOGRAM_BINS if bins is None else bins
+            if not 1 <= bins <= 1000:
+                raise ValueError("bins must be between 1 and 1000")
+            id1, id2 = request.args.get('id1'), request.args.get('id2')
+            if (id1 is None) != (id2 is None):
+                raise ValueError("id1 and id2 go together")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
+        if not system_path.exists():
+            return jsonify({'error': 'System not found'}), 404
+        
+        def payload(state):
+            index = _interaction_index(system_path, state)
+            if id1 is not None and (id1, id2) not in index.positions:
+                return jsonify({'error': 'Interaction not found'}), 404
+            
+            def build(store):
+                # The system may have been recompiled since the index was loaded
+                current = index if index.token == store.meta['generation'] else InteractionIndex(store)
+                if id1 is not None:
+                    pair = current.pairs[current.positions[(id1, id2)]]
+                    return {'id1': id1, 'id2': id2, 'totalFrames': store.total_frames,
+                            'types': pair_geometry(store, pair, bins)}
+                positions = current.query(**filters)
+                summaries = geometry_summary(store, current.pairs[positions])
+                return {
+                    'totalFrames': store.total_frames,
+                    'interactions': [{'id1': current.entries[i]['id1'], 'id2': current.entries[i]['id2'],
+                                      'types': summary}
+                                     for i, summary in zip(positions.tolist(), summaries)]
+                }
             
-            # Parse CSV
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Skip if required fields are missing
-                    if not all(key in row for key in ['Res. Name 1', 'Res. Number 1', 'Chain 1', 
-                                                      'Res. Name 2', 'Res. Number 2', 'Chain 2']):
-                        continue
-                    
-                    # Create unique key for residue-residue interaction
-                    key = f"{row['Res. Name 1']}{row['Res. Number 1']}_{row['Res. Name 2']}{row['Res. Number 2']}"
-                    
-                    if key not in interaction_map:
-                        interaction_map[key] = {
-                            'resName1': row['Res. Name 1'],
-                            'resNum1': int(row['Res. Number 1']),
-                            'chain1': row['Chain 1'],
-                            'resName2': row['Res. Name 2'],
-                            'resNum2': int(row['Res. Number 2']),
-                            'chain2': row['Chain 2'],
-                            'frames': [],
-                            'types': set()
-                        }
-                    
-                    interaction_map[key]['frames'].append(frame_num)
-                    if row.get('Type of Interactions'):
-                        # Handle multiple types separated by semicolon
-                        types = [t.strip() for t in row['Type of Interactions'].split(';') if t.strip()]
-                        for t in types:
-                            interaction_map[key]['types'].add(t)
+            name = _request_name('geometry')
+            values = system_values(get_data_cache(current_app), system_path, {name: build},
+                                   current_app.config['PARSE_WORKERS'], state)
+            return {'system': system_id, **values[name]}
         
-        # Convert to array with consistency scores
-        interactions = []
-        for key, entry in interaction_map.items():
-            frame_set = set(entry['frames'])
-            interactions.append({
-                'resName1': entry['resName1'],
-                'resNum1': entry['resNum1'],
-                'chain1': entry['chain1'],
-                'resName2': entry['resName2'],
-                'resNum2': entry['resNum2'],
-                'chain2': entry['chain2'],
-                'frameCount': len(frame_set),
-                'consistency': len(frame_set) / total_frames,
-                'id1': f"{entry['chain1']}-{entry['resName1']}{entry['resNum1']}",
-                'id2': f"{entry['chain2']}-{entry['resName2']}{entry['resNum2']}",
-                'typesArray': list(entry['types'])
-            })
+        return _cached_response(system_path, _request_name('geometry'), payload,
+                                'interactions' if id1 is None else None)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/systems/<system_id>/heatmap', methods=['GET'])
+def get_heatmap(system_id):
+    """
+    Get the chain-1 by chain-2 residue consistency matrix
+    The interactions filters select the cells (minConsistency thresholds
+    on the server). typeMask gives each cell's types as bits in typeIds
+    order (base64 little-endian uint16); layers=h-bond,salt-bridge,... adds
+    a matrix per type with the consistency of that type alone. Matrices are
+    base64 little-endian float32, row-major, NaN where there is no interaction.
+    """
+    try:
+        try:
+            filters = _filter_args()
+            layers = tuple(layer_ids(request.args.get('layers', '')))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Sort by consistency
-        interactions.sort(key=lambda x: x['consistency'], reverse=True)
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
+        if not system_path.exists():
+            return jsonify({'error': 'System not found'}), 404
         
-        return jsonify({
-            'system': system_id,
-            'totalFrames': total_frames,
-            'interactions': interactions
-        })
-    
+        name = ('heatmap', tuple(sorted((k, str(v)) for k, v in filters.items() if v is not None)), layers)
+        
+        def payload(state):
+            index = _interaction_index(system_path, state)
+            
+            def build(store):
+                # The system may have been recompiled since the index was loaded
+                current = index if index.token == store.meta['generation'] else InteractionIndex(store)
+                return build_heatmap(store, current, current.query(**filters), layers)
+            
+            values = system_values(get_data_cache(current_app), system_path, {name: build},
+                                   current_app.config['PARSE_WORKERS'], state)
+            return {'system': system_id, **values[name]}
+        
+        return _cached_response(system_path, name, payload)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -107,79 +496,43 @@ def get_area_data(system_id):
     Returns Total, POLAR, and NON POLAR buried surface area
     """
     try:
-        data_folder = current_app.config['DATA_FOLDER']
-        system_path = Path(data_folder) / system_id
+        return _system_response(system_id, 'area', table='frames')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/systems/<system_id>/area/residues', methods=['GET'])
+def get_residue_area(system_id):
+    """
+    Get per-residue ASA time series from the ASA tables of every frame
+    layers=complex,free,buried (default buried) selects the series, chain
+    the residues, top the number of hotspots (residues ranked by mean
+    buried area). Series are base64 little-endian float32 residue x frame
+    matrices.
+    """
+    try:
+        try:
+            layers = tuple(layer_names(request.args.get('layers', 'buried')))
+            chains = _list_arg('chain')
+            top = _number_arg('top', int)
+            top = HOTSPOTS if top is None else top
+            if top < 0:
+                raise ValueError("top must not be negative")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
         if not system_path.exists():
             return jsonify({'error': 'System not found'}), 404
         
-        # Find all frame folders
-        frame_folders = sorted([f for f in system_path.iterdir() 
-                               if f.is_dir() and f.name.startswith('frame_')])
-        
-        if not frame_folders:
-            return jsonify({'error': 'No frames found for this system'}), 404
+        name = _request_name('residue-area')
         
-        frames_data = []
+        def payload(state):
+            values = system_values(get_data_cache(current_app), system_path,
+                                   {name: lambda store: residue_area(store, layers, chains, top)},
+                                   current_app.config['PARSE_WORKERS'], state)
+            return {'system': system_id, **values[name]}
         
-        # Process each frame
-        for frame_folder in frame_folders:
-            frame_num = int(frame_folder.name.split('_')[1])
-            csv_file = frame_folder / f"{frame_folder.name}.pd_h.pdb_A_B_complex.pdb_Rsa_stats.csv"
-            
-            if not csv_file.exists():
-                continue
-            
-            total_bsa = 0
-            polar_bsa = 0
-            non_polar_bsa = 0
-            
-            # Parse CSV
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Get row index from first column (empty header)
-                    row_index_str = row.get('', '').strip()
-                    if not row_index_str:
-                        continue
-                    
-                    try:
-                        row_index = int(row_index_str)
-                    except ValueError:
-                        continue
-                    
-                    value = row.get('Value', '')
-                    
-                    # Row 0: Total BSA
-                    if row_index == 0:
-                        match = __extract_first_number(value)
-                        if match:
-                            total_bsa = float(match)
-                    
-                    # Row 2: POLAR BSA
-                    elif row_index == 2:
-                        match = __extract_first_number(value)
-                        if match:
-                            polar_bsa = float(match)
-                    
-                    # Row 4: NON POLAR BSA
-                    elif row_index == 4:
-                        match = __extract_first_number(value)
-                        if match:
-                            non_polar_bsa = float(match)
-            
-            frames_data.append({
-                'frame': frame_num,
-                'totalBSA': total_bsa,
-                'polarBSA': polar_bsa,
-                'nonPolarBSA': non_polar_bsa
-            })
-        
-        return jsonify({
-            'system': system_id,
-            'frames': frames_data
-        })
-    
+        return _cached_response(system_path, name, payload, 'residues')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -190,90 +543,166 @@ def get_interaction_trends(system_id):
     Returns counts for each interaction type per frame
     """
     try:
-        data_folder = current_app.config['DATA_FOLDER']
-        system_path = Path(data_folder) / system_id
+        return _system_response(system_id, 'trends', table='trends')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/systems/<system_id>/dashboard', methods=['GET'])
+def get_dashboard(system_id):
+    """
+    Get interactions, area and trends data in one response
+    ?include=interactions,area,trends selects sections (all by default);
+    the response carries each section's fields as its own endpoint does.
+    """
+    try:
+        include = request.args.get('include')
+        sections = [s.strip() for s in include.split(',') if s.strip()] if include else list(SECTIONS)
+        unknown = [s for s in sections if s not in SECTIONS]
+        if unknown:
+            return jsonify({'error': f"Unknown section: {', '.join(unknown)}"}), 400
+        
+        system_path = Path(current_app.config['DATA_FOLDER']) / system_id
         
         if not system_path.exists():
             return jsonify({'error': 'System not found'}), 404
         
-        # Find all frame folders
-        frame_folders = sorted([f for f in system_path.iterdir() 
-                               if f.is_dir() and f.name.startswith('frame_')])
+        def payload(state):
+            data = system_data(get_data_cache(current_app), system_path, sections,
+                               current_app.config['PARSE_WORKERS'], state)
+            return {'system': system_id, 'include': sections, **data}
         
-        if not frame_folders:
+        return _cached_response(system_path, ('dashboard', tuple(sections)), payload)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/compare', methods=['GET'])
+def compare_systems():
+    """
+    Compare the interactions and trends of systems a and b (?a=..&b=..)
+    Interactions are joined on chain and residue numbers: gained (only in
+    b), lost (only in a) and changed (consistency moved by minDelta or
+    more). The interactions filters select the pairs compared on either
+    side; limit caps each list. Trends compare the mean count per frame of
+    each type.
+    """
+    try:
+        system_ids = request.args.get('a'), request.args.get('b')
+        if not all(system_ids):
+            return jsonify({'error': 'Both a and b systems are required'}), 400
+        try:
+            filters = _filter_args()
+            min_delta = _number_arg('minDelta', float)
+            min_delta = MIN_DELTA if min_delta is None else min_delta
+            limit = _number_arg('limit', int)
+            if limit is not None and limit < 1:
+                raise ValueError("limit must be positive")
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        paths = [Path(current_app.config['DATA_FOLDER']) / system_id for system_id in system_ids]
+        if not all(path.exists() for path in paths):
+            return jsonify({'error': 'System not found'}), 404
+        states = [system_state(path) for path in paths]
+        if None in states:
             return jsonify({'error': 'No frames found for this system'}), 404
         
-        interaction_types = {
-            'H-bonds': [],
-            'Salt-bridges': [],
-            'π-π interactions': [],
-            'Cation-π interactions': [],
-            'Anion-π interactions': [],
-            'CH-O/N bonds': [],
-            'CH-π interactions': [],
-            'Halogen bonds': [],
-            'Apolar vdW contacts': [],
-            'Polar vdW contacts': [],
-            'Proximal contacts': [],
-            'Clashes': []
-        }
+        def payload():
+            cache, workers = get_data_cache(current_app), current_app.config['PARSE_WORKERS']
+            sides = [system_values(cache, path, {'index': InteractionIndex, 'trend-means': trend_means},
+                                   workers, state)
+                     for path, state in zip(paths, states)]
+            index_a, index_b = sides[0]['index'], sides[1]['index']
+            gained, lost, changed, unchanged = compare_interactions(
+                index_a, index_a.query(**filters), index_b, index_b.query(**filters), min_delta)
+            return {
+                'a': system_ids[0],
+                'b': system_ids[1],
+                'totalFrames': {'a': index_a.total_frames, 'b': index_b.total_frames},
+                'minDelta': min_delta,
+                'counts': {'gained': len(gained), 'lost': len(lost),
+                           'changed': len(changed), 'unchanged': unchanged},
+                'gained': gained[:limit],
+                'lost': lost[:limit],
+                'changed': changed[:limit],
+                'trends': compare_trends(sides[0]['trend-means'], sides[1]['trend-means']),
+            }
         
-        # Process each frame
-        for frame_folder in frame_folders:
-            csv_file = frame_folder / f"{frame_folder.name}.pd_h.pdb_A_B_summary_table.csv"
-            
-            if not csv_file.exists():
-                continue
-            
-            # Initialize frame values
-            for key in interaction_types:
-                interaction_types[key].append(0)
-            
-            # Parse CSV
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    property_name = row.get('Property', '')
-                    value = int(row.get('Value', 0))
-                    
-                    if 'H-bonds' in property_name:
-                        interaction_types['H-bonds'][-1] = value
-                    elif 'Salt-bridges' in property_name:
-                        interaction_types['Salt-bridges'][-1] = value
-                    elif 'π-π interactions' in property_name and 'Cation' not in property_name and 'Anion' not in property_name:
-                        interaction_types['π-π interactions'][-1] = value
-                    elif 'Cation-π' in property_name:
-                        interaction_types['Cation-π interactions'][-1] = value
-                    elif 'Anion-π' in property_name:
-                        interaction_types['Anion-π interactions'][-1] = value
-                    elif 'CH-O/N bonds' in property_name:
-                        interaction_types['CH-O/N bonds'][-1] = value
-                    elif 'CH-π interactions' in property_name:
-                        interaction_types['CH-π interactions'][-1] = value
-                    elif 'Halogen bonds' in property_name:
-                        interaction_types['Halogen bonds'][-1] = value
-                    elif 'Apolar vdW' in property_name:
-                        interaction_types['Apolar vdW contacts'][-1] = value
-                    elif 'Polar vdW' in property_name:
-                        interaction_types['Polar vdW contacts'][-1] = value
-                    elif 'Proximal contacts' in property_name:
-                        interaction_types['Proximal contacts'][-1] = value
-                    elif 'Clashes' in property_name:
-                        interaction_types['Clashes'][-1] = value
+        root = tuple(os.fspath(path) for path in paths)
+        digest = ':'.join(state[2] for state in states)
+        return _negotiated_response(root, digest, _request_name('compare'), payload)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _search_key():
+    """Posting key of the request's residue, pair and type arguments; ValueError when invalid"""
+    residue = request.args.get('residue', '').strip()
+    pair = _list_arg('pair')
+    type_id = request.args.get('type', '').strip()
+    if type_id and type_id not in INTERACTION_TYPES:
+        raise ValueError(f"Unknown interaction type: {type_id}")
+    if residue and pair:
+        raise ValueError("Give either residue or pair, not both")
+    if pair is not None and len(pair) != 2:
+        raise ValueError("pair takes two residue ids, e.g. A-ARG15,B-ASP42")
+    if pair:
+        key = pair_key(*pair)
+    elif residue:
+        key = ('residue', residue)
+    elif type_id:
+        return ('type', type_id)
+    else:
+        raise ValueError("Give a residue, pair or type to search for")
+    return key + (type_id,) if type_id else key
+
+@bp.route('/search', methods=['GET'])
+def search_interactions():
+    """
+    Find the systems and frames that contain an interaction
+    ?residue=A-ARG15 or ?pair=A-ARG15,B-ASP42 (either order), optionally
+    with ?type=salt-bridge, or a type alone; systems=.. limits the systems
+    searched. Answers from the library-wide search index, which reindexes
+    systems as their jobs finish and rechecks every system's fingerprints
+    at most every SEARCH_REFRESH_SECONDS; systems that could not be indexed
+    are listed in failedSystems.
+    """
+    try:
+        try:
+            key = _search_key()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        systems = _list_arg('systems')
+        
+        index = get_search_index(current_app)
+        index.refresh_finished(get_job_store(current_app), current_app.config['DATA_FOLDER'],
+                               current_app.config['PARSE_WORKERS'])
+        index.refresh_if_stale(current_app.config['DATA_FOLDER'], current_app.config['SEARCH_REFRESH_SECONDS'],
+                               current_app.config['PARSE_WORKERS'])
+        
+        def payload():
+            results = index.search(key, set(systems) if systems is not None else None)
+            return {
+                'query': {name: request.args[name] for name in ('residue', 'pair', 'type') if name in request.args},
+                'indexedSystems': len(index.systems),
+                'failedSystems': sorted(index.failed),
+                'matchedSystems': len(results),
+                'systems': results,
+            }
         
+        return _negotiated_response('search', index.digest, _request_name('search'), payload, 'systems')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss statistics of the aggregated data cache and CoCoMaps result cache"""
+    try:
+        data_cache = get_data_cache(current_app)
+        result_cache = get_result_cache(current_app)
+        search_index = current_app.extensions.get('search_index')
         return jsonify({
-            'system': system_id,
-            'trends': interaction_types
+            'data': data_cache.stats() if data_cache else None,
+            'results': result_cache.stats() if result_cache else None,
+            'search': search_index.stats() if search_index else None
         })
-    
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
-def __extract_first_number(value_str):
-    """Extract first number from string like '2331.8 / 1165.9'"""
-    import re
-    if not value_str:
-        return None
-    match = re.match(r'([0-9.]+)\s*/\s*', value_str)
-    return match.group(1) if match else None
-
@@ -5,59 +5,37 @@ from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from pathlib import Path
 import os
-import subprocess
-import threading
 import json
+import threading
 
-# Processing functions (previously in upload_server.py, now integrated here)
-try:
-    import MDAnalysis as mda
-    from MDAnalysis.coordinates import PDB
-    HAS_MDA = True
-except ImportError:
-    HAS_MDA = False
+from backend.pdb_frames import split_pdb_file, load_frame_index, index_source
+from backend.cocomaps import get_frame_numbers, run_pending_frames
+from backend.jobs import get_job_store
+from backend.quicklook import discard_quicklook, run_quicklook
+from backend.system_store import load_system_store
+from backend.result_cache import get_result_cache
 
 bp = Blueprint('upload', __name__)
 
-# Store processing status
-processing_status = {}
-
 ALLOWED_EXTENSIONS = {'pdb'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def split_pdb(pdb_file, pdb_name):
+def split_pdb(pdb_file, pdb_name, store=None, job_id=None):
     """Split PDB file into frames"""
-    if not HAS_MDA:
-        raise Exception("MDAnalysis not available")
-    
     try:
-        u = mda.Universe(pdb_file)
         upload_folder = current_app.config['UPLOAD_FOLDER']
         main_folder = os.path.join(upload_folder, pdb_name)
         
-        # Create main folder
-        os.makedirs(main_folder, exist_ok=True)
-        
-        # Iterate through frames
-        frame_count = 0
-        for i, ts in enumerate(u.trajectory):
-            frame_folder = os.path.join(main_folder, f"frame_{i+1}")
-            os.makedirs(frame_folder, exist_ok=True)
-            
-            frame_file = os.path.join(frame_folder, f"frame_{i+1}.pdb")
-            with PDB.PDBWriter(frame_file) as W:
-                W.write(u.atoms)
-            
+        def on_frame(frame_num, frame_count):
             # Create example_input.json for each frame
-            create_example_input(frame_folder, f"frame_{i+1}.pdb")
-            
-            frame_count += 1
-            if pdb_name in processing_status:
-                processing_status[pdb_name]['progress'] = int((i + 1) / len(u.trajectory) * 30)
+            create_example_input(os.path.join(main_folder, f"frame_{frame_num}"), f"frame_{frame_num}.pdb")
+            if store is not None:
+                store.update(job_id, progress=int(frame_num / frame_count * 30))
         
-        return frame_count
+        return split_pdb_file(pdb_file, main_folder, on_frame=on_frame,
+                              materialize=current_app.config['MATERIALIZE_FRAMES'])
     except Exception as e:
         raise Exception(f"Error splitting PDB: {str(e)}")
 
@@ -100,65 +78,88 @@ def create_example_input(frame_folder, pdb_filename):
     with open(json_path, 'w') as f:
         json.dump(input_data, f, indent=4)
 
-def run_cocomaps_analysis(pdb_name, frame_count):
-    """Run CoCoMaps analysis on all frames"""
-    try:
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        host_root_dir = os.path.abspath(os.path.join(upload_folder, pdb_name))
-        docker_image = "andrpet/cocomaps-backend:0.0.19"
-        container_execution = "python /app/coco2/begin.py"
-        input_file_name = "example_input.json"
-        
-        for i in range(1, frame_count + 1):
-            frame_folder = f"frame_{i}"
-            container_input_path = f"/app/data/{input_file_name}"
-            
-            docker_command = (
-                f"docker run --rm "
-                f'-v "{host_root_dir}/{frame_folder}":/app/data '
-                f"{docker_image} "
-                f"{container_execution} "
-                f"{container_input_path}"
-            )
-            
-            subprocess.run(
-                docker_command, shell=True, check=True,
-                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True 
-            )
-            
-            # Update progress (30% for splitting, 70% for analysis)
-            progress = 30 + int((i / frame_count) * 70)
-            if pdb_name in processing_status:
-                processing_status[pdb_name]['progress'] = progress
-        
-        if pdb_name in processing_status:
-            processing_status[pdb_name]['status'] = 'completed'
-            processing_status[pdb_name]['progress'] = 100
-        
-    except Exception as e:
-        if pdb_name in processing_status:
-            processing_status[pdb_name]['status'] = 'failed'
-            processing_status[pdb_name]['error'] = str(e)
+def run_cocomaps_analysis(pdb_name, frame_numbers, store, job_id):
+    """
+    Run CoCoMaps analysis on frames that are missing, stale or failed
+    Returns the frame numbers whose analysis failed.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    host_root_dir = os.path.abspath(os.path.join(upload_folder, pdb_name))
+    
+    def on_frame(result, done_count, total):
+        store.set_frame(job_id, result['frame'], result['status'], result['error'])
+        # Update progress (30% for splitting, 70% for analysis)
+        store.update(job_id, progress=30 + int((done_count / total) * 70))
+    
+    config = current_app.config
+    cache = get_result_cache(current_app)
+    results, skipped = run_pending_frames(
+        host_root_dir, frame_numbers,
+        workers=config['COCOMAPS_WORKERS'], on_frame=on_frame, cache=cache,
+        warm=config['COCOMAPS_WARM_CONTAINERS'],
+        recycle_after=config['COCOMAPS_RECYCLE_AFTER'],
+        timeout=config['COCOMAPS_EXEC_TIMEOUT'],
+        docker=config['DOCKER_COMMAND'],
+        crop_margin=config['CROP_MARGIN'] if config['CROP_INTERFACE'] else None,
+        crop_validate=config['CROP_VALIDATE'])
+    failed = [r for r in results if r['status'] == 'failed']
+    if cache is not None:
+        hits = sum(1 for r in results if r.get('cached'))
+        store.update(job_id, cache_hits=hits, cache_misses=len(results) - hits)
+    
+    if failed and len(failed) == len(results) and not skipped:
+        store.update(job_id, status='failed', error=failed[0]['error'],
+                     skipped=len(skipped), progress=100)
+    else:
+        store.update(job_id, status='completed', skipped=len(skipped), progress=100)
+    return [r['frame'] for r in failed]
 
-def process_pdb_async(pdb_file, pdb_name):
-    """Process PDB file asynchronously"""
+def process_job(store, job):
+    """
+    Split and analyze a claimed job
+    Jobs without a source resume an existing system from its frame folders.
+    """
+    pdb_name = job['system']
+    job_id = job['id']
     try:
-        processing_status[pdb_name]['status'] = 'splitting'
-        processing_status[pdb_name]['progress'] = 0
+        store.update(job_id, status='splitting', progress=0, error=None, warning=None)
         
         # Split PDB into frames
-        frame_count = split_pdb(pdb_file, pdb_name)
+        if job['source']:
+            frame_numbers = list(range(1, split_pdb(job['source'], pdb_name, store, job_id) + 1))
+        else:
+            upload_folder = current_app.config['UPLOAD_FOLDER']
+            frame_numbers = get_frame_numbers(os.path.join(upload_folder, pdb_name))
+        
+        store.update(job_id, status='analyzing', frames=len(frame_numbers))
+        for frame_num in frame_numbers:
+            store.set_frame(job_id, frame_num, 'queued')
         
-        processing_status[pdb_name]['status'] = 'analyzing'
-        processing_status[pdb_name]['frames'] = frame_count
+        # Preliminary contacts while CoCoMaps runs
+        quicklook = None
+        system_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], pdb_name)
+        if current_app.config['QUICKLOOK']:
+            quicklook = threading.Thread(target=run_quicklook, args=(system_dir, frame_numbers), daemon=True)
+            quicklook.start()
         
         # Run CoCoMaps analysis
-        run_cocomaps_analysis(pdb_name, frame_count)
+        failed = run_cocomaps_analysis(pdb_name, frame_numbers, store, job_id)
+        if quicklook is not None:
+            quicklook.join()
+        # Preliminary contacts must not stand in for a failed analysis
+        for frame_num in failed:
+            discard_quicklook(system_dir, frame_num)
+        
+        # Pack the results into the system's columnar store for the data endpoints and search
+        try:
+            load_system_store(system_dir, workers=current_app.config['PARSE_WORKERS'])
+        except Exception as e:
+            # The results stand; the store is compiled again on first read
+            current_app.logger.exception(f"Compiling the store of {pdb_name} failed")
+            store.update(job_id, warning=f"Compiling the store failed: {str(e)}")
         
     except Exception as e:
-        if pdb_name in processing_status:
-            processing_status[pdb_name]['status'] = 'failed'
-            processing_status[pdb_name]['error'] = str(e)
+        store.update(job_id, status='failed', error=str(e))
 
 @bp.route('/upload', methods=['POST'])
 def upload_file():
@@ -177,28 +178,61 @@ def upload_file():
     try:
         filename = secure_filename(file.filename)
         pdb_name = Path(filename).stem
+        store = get_job_store(current_app)
+        if store.is_active(pdb_name):
+            return jsonify({'error': 'System is already being processed'}), 409
+        
         upload_folder = current_app.config['UPLOAD_FOLDER']
-        filepath = os.path.join(upload_folder, filename)
+        system_folder = os.path.join(upload_folder, pdb_name)
+        os.makedirs(system_folder, exist_ok=True)
+        filepath = os.path.join(system_folder, filename)
         
-        # Save file
+        # Save file inside the system folder; frames are indexed into it
         file.save(filepath)
         
-        # Initialize processing status
-        processing_status[pdb_name] = {
-            'status': 'queued',
-            'progress': 0,
-            'frames': 0
-        }
-        
-        # Start processing in background thread
-        thread = threading.Thread(target=process_pdb_async, args=(filepath, pdb_name))
-        thread.daemon = True
-        thread.start()
+        # Queue processing; higher priority jobs are picked up first
+        priority = request.form.get('priority', 0, type=int)
+        job_id = store.enqueue(pdb_name, filepath, priority)
         
         return jsonify({
             'success': True,
             'id': pdb_name,
-            'message': 'Upload successful. Processing started.'
+            'jobId': job_id,
+            'message': 'Upload successful. Processing queued.'
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/reprocess/<pdb_id>', methods=['POST'])
+def reprocess_system(pdb_id):
+    """Resume analysis of an existing system, rerunning only incomplete frames"""
+    # Only a plain folder name, never '.', '..' or a path, may name a system
+    if not pdb_id or secure_filename(pdb_id) != pdb_id:
+        return jsonify({'error': 'Invalid system id'}), 400
+    
+    try:
+        store = get_job_store(current_app)
+        if store.is_active(pdb_id):
+            return jsonify({'error': 'System is already being processed'}), 409
+        
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        system_folder = os.path.join(upload_folder, pdb_id)
+        if not os.path.isdir(system_folder):
+            return jsonify({'error': 'System not found'}), 404
+        
+        # Re-split from the indexed upload when it is still there
+        index = load_frame_index(system_folder)
+        pdb_file = index_source(system_folder, index) if index else None
+        
+        priority = request.form.get('priority', 0, type=int)
+        job_id = store.enqueue(pdb_id, pdb_file, priority)
+        
+        return jsonify({
+            'success': True,
+            'id': pdb_id,
+            'jobId': job_id,
+            'message': 'Reprocessing queued.'
         })
         
     except Exception as e:
@@ -207,8 +241,13 @@ def upload_file():
 @bp.route('/status/<pdb_id>', methods=['GET'])
 def get_status(pdb_id):
     """Get processing status"""
-    if pdb_id not in processing_status:
+    status = get_job_store(current_app).latest(pdb_id)
+    if status is None:
         return jsonify({'error': 'Not found'}), 404
     
-    return jsonify(processing_status[pdb_id])
+    cache = get_result_cache(current_app)
+    if cache is not None:
+        status['cache'] = cache.stats()
+    
+    return jsonify(status)
 
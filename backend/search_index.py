@@ -0,0 +1,224 @@
+"""
+Library-wide inverted index of interactions by residue, residue pair and type
+"""
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+from backend.data_cache import system_state
+from backend.interaction_index import INTERACTION_TYPES, matches_type
+from backend.system_store import frame_folders, load_system_store
+
+def pair_key(id1, id2):
+    """Posting key of a residue pair, the same whichever residue comes first"""
+    return ('pair',) + tuple(sorted((id1, id2)))
+
+def _or_rows(groups, rows, n_groups):
+    """Packed bitmaps OR-ed together per group id"""
+    merged = np.zeros((n_groups, rows.shape[1]), dtype=np.uint8)
+    np.bitwise_or.at(merged, groups, rows)
+    return merged
+
+def system_postings(store):
+    """
+    {key: packed frame bitmap} of one system's compiled store
+    Keys are ('residue', id), pair_key(id1, id2) and ('type', type id),
+    and a residue or pair key with the type id appended. Bits follow the
+    store's frame positions (np.packbits layout); only non-empty bitmaps
+    are kept.
+    """
+    n_pairs = len(store.pair_variant)
+    info = [store.pair_info(pair) for pair in range(n_pairs)]
+    ids = [(f"{e['chain1']}-{e['resName1']}{e['resNum1']}", f"{e['chain2']}-{e['resName2']}{e['resNum2']}")
+           for e in info]
+    pair_keys = [pair_key(id1, id2) for id1, id2 in ids]
+    residues = list(dict.fromkeys(residue for pair in ids for residue in pair))
+    residue_index = {residue: i for i, residue in enumerate(residues)}
+    sides = np.array([[residue_index[id1], residue_index[id2]] for id1, id2 in ids], dtype=np.int64).reshape(-1, 2)
+
+    def add(postings, keys, rows, suffix=()):
+        for key, row in zip(keys, rows):
+            if row.any():
+                postings[key + suffix] = row
+
+    occupancy = np.asarray(store.occupancy)
+    residue_keys = [('residue', residue) for residue in residues]
+    residue_of = np.concatenate([sides[:, 0], sides[:, 1]])  # residue of each pair, twice
+    postings = {}
+    add(postings, pair_keys, occupancy)
+    add(postings, residue_keys, _or_rows(residue_of, np.concatenate([occupancy, occupancy]), len(residues)))
+
+    # Type ids of each distinct type mask, then one bitmap per pair and type
+    masks, mask_index = np.unique(np.asarray(store.hit_types), return_inverse=True)
+    mask_index = mask_index.reshape(-1)
+    mask_types = [[t for t in INTERACTION_TYPES if matches_type('; '.join(store.type_names(mask)), t)]
+                  for mask in masks.tolist()]
+    hit_frame = np.asarray(store.hit_frame)
+    hit_pair = np.asarray(store.hit_pair)
+    for type_id in INTERACTION_TYPES:
+        wanted = [i for i, types in enumerate(mask_types) if type_id in types]
+        hits = np.isin(mask_index, wanted)
+        if not hits.any():
+            continue
+        rows = np.zeros_like(occupancy)
+        frames = hit_frame[hits]
+        np.bitwise_or.at(rows, (hit_pair[hits], frames >> 3), (0x80 >> (frames & 7)).astype(np.uint8))
+        add(postings, pair_keys, rows, (type_id,))
+        add(postings, residue_keys, _or_rows(residue_of, np.concatenate([rows, rows]), len(residues)), (type_id,))
+        postings[('type', type_id)] = np.bitwise_or.reduce(rows, axis=0)
+    return postings
+
+class SearchIndex:
+    """
+    Posting lists {key: {system id: packed frame bitmap}} over every system
+    in the data folder, built from the compiled stores
+    Each system is indexed with the fingerprint digest of its frame folders
+    and rebuilt only when that digest changes, so a refresh costs a stat
+    per result file plus the systems that changed. Jobs run in worker
+    processes, so refresh_finished() asks the job store which systems
+    finished since it last looked and reindexes those between refreshes.
+    A system that fails to index is left out, not served stale, and listed
+    in failed.
+    """
+
+    def __init__(self):
+        self.systems = {}  # system id -> {'digest', 'frames', 'keys'}
+        self.postings = {}
+        self.failed = {}  # system id -> error of its last indexing attempt
+        self.checked = None  # time of the last refresh
+        self.jobs_seen = None  # finish time of the last job picked up by refresh_finished
+        self.digest = None
+        self._lock = threading.Lock()
+
+    def _remove(self, system_id):
+        entry = self.systems.pop(system_id, None)
+        if entry is None:
+            return
+        for key in entry['keys']:
+            systems = self.postings[key]
+            del systems[system_id]
+            if not systems:
+                del self.postings[key]
+
+    def _update_digest(self):
+        canonical = ';'.join(f"{system_id}:{entry['digest']}" for system_id, entry in sorted(self.systems.items()))
+        canonical += '!' + ';'.join(sorted(self.failed))
+        self.digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+    def update_system(self, system_id, system_dir, workers=None):
+        """
+        Reindex one system if its frame folders changed since it was indexed;
+        drops it when it has no frames left. Returns True when it changed.
+        """
+        state = system_state(system_dir)
+        if state is None:
+            with self._lock:
+                if system_id not in self.systems:
+                    return False
+                self._remove(system_id)
+                self._update_digest()
+                return True
+        
+        entry = self.systems.get(system_id)
+        if entry is not None and entry['digest'] == state[2]:
+            return False
+        # Built outside the lock so searches keep answering meanwhile
+        store = load_system_store(os.fspath(system_dir), state[0], state[1], workers)
+        postings = system_postings(store)
+        with self._lock:
+            self._remove(system_id)
+            for key, bitmap in postings.items():
+                self.postings.setdefault(key, {})[system_id] = bitmap
+            self.systems[system_id] = {'digest': state[2], 'frames': np.array(store.frames), 'keys': list(postings)}
+            self.failed.pop(system_id, None)
+            self._update_digest()
+        return True
+
+    def _try_update(self, system_id, system_dir, workers):
+        try:
+            self.update_system(system_id, system_dir, workers)
+        except Exception as e:
+            # Its old postings no longer describe its frames
+            with self._lock:
+                self._remove(system_id)
+                self.failed[system_id] = str(e)
+                self._update_digest()
+
+    def refresh(self, data_folder, workers=None):
+        """Bring every system folder up to date and forget removed ones"""
+        found = set()
+        for name in sorted(os.listdir(data_folder)):
+            system_dir = os.path.join(data_folder, name)
+            if name.startswith('.') or name.startswith('__') or not os.path.isdir(system_dir):
+                continue
+            if not frame_folders(system_dir):
+                continue
+            found.add(name)
+            self._try_update(name, system_dir, workers)
+        with self._lock:
+            for system_id in set(self.systems) - found:
+                self._remove(system_id)
+            for system_id in set(self.failed) - found:
+                del self.failed[system_id]
+            self._update_digest()
+            self.checked = time.monotonic()
+
+    def refresh_finished(self, job_store, data_folder, workers=None):
+        """
+        Reindex the systems whose jobs finished since the last call
+        Before the first refresh only the position in the job store is
+        taken, as the refresh indexes everything.
+        """
+        finished, self.jobs_seen = job_store.finished_since(self.jobs_seen)
+        if self.checked is None:
+            return
+        for system_id in finished:
+            self._try_update(system_id, os.path.join(data_folder, system_id), workers)
+
+    def refresh_if_stale(self, data_folder, interval, workers=None):
+        """refresh() when the last one is more than interval seconds old"""
+        if self.checked is None or time.monotonic() - self.checked >= interval:
+            self.refresh(data_folder, workers)
+
+    def search(self, key, systems=None):
+        """
+        Systems whose frames contain key, most frames first
+        Returns [{'system', 'totalFrames', 'frameCount', 'frames'}] with
+        frame numbers in numeric order.
+        """
+        with self._lock:
+            postings = dict(self.postings.get(key, {}))
+            frames = {system_id: self.systems[system_id]['frames'] for system_id in postings}
+        results = []
+        for system_id, bitmap in postings.items():
+            if systems is not None and system_id not in systems:
+                continue
+            numbers = frames[system_id]
+            present = np.unpackbits(bitmap, count=len(numbers)).astype(bool)
+            results.append({
+                'system': system_id,
+                'totalFrames': len(numbers),
+                'frameCount': int(present.sum()),
+                'frames': np.sort(numbers[present]).tolist(),
+            })
+        results.sort(key=lambda result: (-result['frameCount'], result['system']))
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'systems': len(self.systems),
+                'keys': len(self.postings),
+                'bytes': sum(bitmap.nbytes for systems in self.postings.values() for bitmap in systems.values()),
+                'failed': dict(self.failed),
+            }
+
+def get_search_index(app):
+    """The app's SearchIndex, created empty on first use"""
+    index = app.extensions.get('search_index')
+    if index is None:
+        index = app.extensions.setdefault('search_index', SearchIndex())
+    return index
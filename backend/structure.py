@@ -0,0 +1,125 @@
+"""
+Vectorized PDB atom parsing and neighbor search
+"""
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+LINE_WIDTH = 80
+
+def _column(raw, start, end):
+    """Fixed-width PDB column [start, end) of every line as stripped strings"""
+    width = end - start
+    return np.char.strip(np.char.decode(
+        np.ascontiguousarray(raw[:, start:end]).view(f"S{width}").ravel(), 'ascii', 'replace'))
+
+def parse_atoms(data):
+    """
+    Parse ATOM/HETATM records of a PDB buffer into NumPy arrays
+    Returns a dict with 'lines' (the raw records), 'name', 'resname',
+    'chain' (chain ID, or segment ID when the chain column is blank),
+    'resseq', 'icode', 'element', 'coords' (n x 3 float64) and 'residue'
+    (a residue index per atom, increasing through the file).
+    """
+    lines = [line for line in bytes(data).splitlines()
+             if line[:6] in (b"ATOM  ", b"HETATM")]
+    n = len(lines)
+    if n == 0:
+        empty = np.array([], dtype=str)
+        return {'lines': [], 'name': empty, 'resname': empty, 'chain': empty,
+                'resseq': np.zeros(0, dtype=np.int64), 'icode': empty, 'element': empty,
+                'coords': np.zeros((0, 3)), 'residue': np.zeros(0, dtype=np.int64)}
+
+    padded = b"".join(line[:LINE_WIDTH].ljust(LINE_WIDTH) for line in lines)
+    raw = np.frombuffer(padded, dtype=np.uint8).reshape(n, LINE_WIDTH)
+
+    chain = _column(raw, 21, 22)
+    segid = _column(raw, 72, 76)
+    chain = np.where(chain == '', segid, chain)
+    coords = np.stack([
+        _column(raw, 30, 38).astype(np.float64),
+        _column(raw, 38, 46).astype(np.float64),
+        _column(raw, 46, 54).astype(np.float64),
+    ], axis=1)
+    resseq = _column(raw, 22, 26)
+    resseq = np.where(resseq == '', '0', resseq).astype(np.int64)
+    icode = _column(raw, 26, 27)
+
+    # A new residue starts wherever chain, number or insertion code changes
+    changed = np.ones(n, dtype=bool)
+    changed[1:] = (chain[1:] != chain[:-1]) | (resseq[1:] != resseq[:-1]) | (icode[1:] != icode[:-1])
+
+    return {
+        'lines': lines,
+        'name': _column(raw, 12, 16),
+        'resname': _column(raw, 17, 20),
+        'chain': chain,
+        'resseq': resseq,
+        'icode': icode,
+        'element': _column(raw, 76, 78),
+        'coords': coords,
+        'residue': np.cumsum(changed) - 1,
+    }
+
+def neighbor_pairs(coords_a, coords_b, cutoff):
+    """
+    All (i, j) with |coords_a[i] - coords_b[j]| <= cutoff
+    Uses scipy's cKDTree when installed, otherwise a NumPy cell list.
+    Returns (index_a, index_b, distance) arrays.
+    """
+    if len(coords_a) == 0 or len(coords_b) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    if HAS_SCIPY:
+        pairs = cKDTree(coords_a).sparse_distance_matrix(
+            cKDTree(coords_b), cutoff, output_type='ndarray')
+        order = np.lexsort((pairs['j'], pairs['i']))
+        pairs = pairs[order]
+        return pairs['i'].astype(np.int64), pairs['j'].astype(np.int64), pairs['v']
+
+    return _cell_list_pairs(coords_a, coords_b, cutoff)
+
+def _cell_keys(cells, origin, shape):
+    cells = cells - origin
+    return (cells[:, 0] * shape[1] + cells[:, 1]) * shape[2] + cells[:, 2]
+
+def _cell_list_pairs(coords_a, coords_b, cutoff):
+    """Neighbor search over a uniform grid with cells of size cutoff"""
+    cell_a = np.floor(coords_a / cutoff).astype(np.int64)
+    cell_b = np.floor(coords_b / cutoff).astype(np.int64)
+    origin = np.minimum(cell_a.min(axis=0), cell_b.min(axis=0)) - 1
+    shape = np.maximum(cell_a.max(axis=0), cell_b.max(axis=0)) - origin + 2
+
+    keys_a = _cell_keys(cell_a, origin, shape)
+    order_a = np.argsort(keys_a, kind='stable')
+    sorted_keys = keys_a[order_a]
+
+    found_a, found_b = [], []
+    for offset in np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1])).T.reshape(-1, 3):
+        keys = _cell_keys(cell_b + offset, origin, shape)
+        lo = np.searchsorted(sorted_keys, keys, side='left')
+        hi = np.searchsorted(sorted_keys, keys, side='right')
+        counts = hi - lo
+        if not counts.any():
+            continue
+        # Expand each b atom's [lo, hi) run of a atoms into explicit pairs
+        idx_b = np.repeat(np.arange(len(coords_b)), counts)
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        idx_a = order_a[starts + np.arange(counts.sum())]
+        found_a.append(idx_a)
+        found_b.append(idx_b)
+
+    if not found_a:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    idx_a = np.concatenate(found_a)
+    idx_b = np.concatenate(found_b)
+    dist = np.linalg.norm(coords_a[idx_a] - coords_b[idx_b], axis=1)
+    keep = dist <= cutoff
+    idx_a, idx_b, dist = idx_a[keep], idx_b[keep], dist[keep]
+    order = np.lexsort((idx_b, idx_a))
+    return idx_a[order], idx_b[order], dist[order]
@@ -0,0 +1,657 @@
+"""
+Compiled columnar store of every frame's CoCoMaps results for a system
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import base64
+import csv
+import json
+import os
+import re
+import uuid
+
+import numpy as np
+
+from backend.file_lock import lock, unlock
+from backend.quicklook import QUICKLOOK_SUFFIX
+
+STORE_DIR = ".compiled"
+META_FILE = "meta.json"
+LOCK_FILE = "compile.lock"
+STORE_VERSION = 5
+
+FINAL_SUFFIX = ".pd_h.pdb_A_B_final_file.csv"
+RSA_SUFFIX = ".pd_h.pdb_A_B_complex.pdb_Rsa_stats.csv"
+SUMMARY_SUFFIX = ".pd_h.pdb_A_B_summary_table.csv"
+ASA_SUFFIXES = (
+    ".pd_h.pdb_A_B_complex.pdb_ASA_table_chain1.csv",
+    ".pd_h.pdb_A_B_complex.pdb_ASA_table_chain2.csv",
+)
+
+# Per-type CSVs with atom-level geometry: (type id, file suffix, atom 1 column,
+# atom 2 column, angle column). Type ids follow INTERACTION_TYPES where one
+# exists; ring-centred types report 'ring' for the ring side.
+GEOMETRY_TYPES = (
+    ('h-bond', ".pd_h.pdb_A_B_H-bond.csv", 'Atom 1', 'Atom 2', 'DHA Angle'),
+    ('salt-bridge', ".pd_h.pdb_A_B_Salt_bridge.csv", 'Atom 1', 'Atom 2', None),
+    ('ss-bond', ".pd_h.pdb_A_B_SS_bond.csv", 'Atom 1', 'Atom 2', None),
+    ('ch-on', ".pd_h.pdb_A_B_C-H_ON.csv", 'Atom 1', 'Atom 2', 'Theta °'),
+    ('pi-pi', ".pd_h.pdb_A_B_pi-pi.csv", None, None, 'Theta °'),
+    ('cation-pi', ".pd_h.pdb_A_B_Cation_pi.csv", 'Cation Atom', None, None),
+    ('anion-pi', ".pd_h.pdb_A_B_Anion_pi.csv", 'Anion Atom', None, None),
+    ('amino-pi', ".pd_h.pdb_A_B_Amino_pi.csv", 'Polar Atom', None, None),
+    ('lone-pair-pi', ".pd_h.pdb_A_B_Lone_pair_pi.csv", 'Lone_pair Atom', None, None),
+    ('ch-pi', ".pd_h.pdb_A_B_C-H_pi.csv", 'C Atom', None, 'Alpha °'),
+    ('nsoh-pi', ".pd_h.pdb_A_B_N-S-O-H_pi.csv", 'C Atom', None, 'Alpha °'),
+    ('halogen', ".pd_h.pdb_A_B_Halogen_bond.csv", 'Atom 1', 'Atom 2', 'Theta 1'),
+    ('polar-vdw', ".pd_h.pdb_A_B_Polar_vdw.csv", 'Atom 1', 'Atom 2', None),
+    ('apolar-vdw', ".pd_h.pdb_A_B_Apolar_vdw.csv", 'Atom 1', 'Atom 2', None),
+    ('proximal', ".pd_h.pdb_A_B_Proximal.csv", 'Atom 1', 'Atom 2', None),
+    ('clash', ".pd_h.pdb_A_B_Clash.csv", 'Atom 1', 'Atom 2', None),
+)
+DISTANCE_FIELD = 'Distance (Å)'
+RING = 'ring'
+
+# The per-type CSVs come from the same CoCoMaps run as the final_file that
+# aggregates them, so its fingerprint stands in for theirs and requests only
+# stat a handful of files per frame
+SOURCE_SUFFIXES = (FINAL_SUFFIX, QUICKLOOK_SUFFIX, RSA_SUFFIX, SUMMARY_SUFFIX) + ASA_SUFFIXES
+
+RESIDUE_FIELDS = ('Res. Name 1', 'Res. Number 1', 'Chain 1',
+                  'Res. Name 2', 'Res. Number 2', 'Chain 2')
+ASA_FIELDS = ('Complex ASA', 'Free ASA', 'Buried ASA (Interface)', 'Buried ASA %')
+ASA_LAYERS = ('complex', 'free', 'buried')  # the first three ASA_FIELDS, as res_asa layers
+
+TREND_TYPES = (
+    'H-bonds', 'Salt-bridges', 'π-π interactions', 'Cation-π interactions',
+    'Anion-π interactions', 'CH-O/N bonds', 'CH-π interactions', 'Halogen bonds',
+    'Apolar vdW contacts', 'Polar vdW contacts', 'Proximal contacts', 'Clashes',
+)
+
+# Per-frame flags
+HAS_FINAL = 1
+PRELIMINARY = 2  # interactions come from quick-look contacts
+HAS_AREA = 4
+HAS_SUMMARY = 8
+HAS_ASA = 16
+
+MAX_TYPES = 64  # interaction types are kept as a uint64 bitmask per row
+
+PARSE_WORKERS = 4  # default parse pool size; helps most when file opens are slow
+
+ARRAYS = (
+    'frames', 'flags', 'bsa', 'trends',
+    'variants', 'variant_pair', 'pair_variant',
+    'hit_frame', 'hit_variant', 'hit_pair', 'hit_types', 'occupancy',
+    'asa_frame', 'asa_side', 'asa_residue', 'asa_values',
+    'geo_frame', 'geo_pair', 'geo_type', 'geo_atoms', 'geo_values', 'geo_pair_order', 'geo_pair_start',
+    'res_keys', 'res_asa',
+)
+
+if hasattr(np, 'bitwise_count'):
+    popcount = np.bitwise_count
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(a):
+        """Set bits of every uint8 element"""
+        return _POPCOUNT_TABLE[a]
+
+def extract_first_number(value_str):
+    """Extract first number from string like '2331.8 / 1165.9'"""
+    if not value_str:
+        return None
+    match = re.match(r'([0-9.]+)\s*/\s*', value_str)
+    return match.group(1) if match else None
+
+def trend_category(property_name):
+    """TREND_TYPES entry a summary_table property counts towards, or None"""
+    if 'H-bonds' in property_name:
+        return 'H-bonds'
+    elif 'Salt-bridges' in property_name:
+        return 'Salt-bridges'
+    elif 'π-π interactions' in property_name and 'Cation' not in property_name and 'Anion' not in property_name:
+        return 'π-π interactions'
+    elif 'Cation-π' in property_name:
+        return 'Cation-π interactions'
+    elif 'Anion-π' in property_name:
+        return 'Anion-π interactions'
+    elif 'CH-O/N bonds' in property_name:
+        return 'CH-O/N bonds'
+    elif 'CH-π interactions' in property_name:
+        return 'CH-π interactions'
+    elif 'Halogen bonds' in property_name:
+        return 'Halogen bonds'
+    elif 'Apolar vdW' in property_name:
+        return 'Apolar vdW contacts'
+    elif 'Polar vdW' in property_name:
+        return 'Polar vdW contacts'
+    elif 'Proximal contacts' in property_name:
+        return 'Proximal contacts'
+    elif 'Clashes' in property_name:
+        return 'Clashes'
+    return None
+
+def frame_folders(system_dir):
+    """frame_N folder names of a system in the order results are reported"""
+    try:
+        entries = os.scandir(system_dir)
+    except FileNotFoundError:
+        return []
+    with entries:
+        return sorted(e.name for e in entries if e.name.startswith('frame_') and e.is_dir())
+
+def frame_fingerprint(system_dir, folder):
+    """[suffix, size, mtime_ns] of each result CSV present in a frame folder"""
+    fingerprint = []
+    for suffix in SOURCE_SUFFIXES:
+        try:
+            st = os.stat(os.path.join(system_dir, folder, folder + suffix))
+        except FileNotFoundError:
+            continue
+        fingerprint.append([suffix, st.st_size, st.st_mtime_ns])
+    return fingerprint
+
+def system_fingerprints(system_dir, folders=None):
+    """Fingerprint of every frame folder, keyed by folder name"""
+    folders = frame_folders(system_dir) if folders is None else folders
+    return {folder: frame_fingerprint(system_dir, folder) for folder in folders}
+
+def _float_field(value):
+    """Float of a CSV number, ignoring a trailing ' *' marker; NaN when blank"""
+    value = (value or '').strip().rstrip('*').strip()
+    return float(value) if value else float('nan')
+
+def _read_rows(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def parse_frame(system_dir, folder):
+    """
+    Parse one frame folder's CSVs into a record
+    hits are (variant, types) where variant is the interaction key followed
+    by both residues as the final_file reports them. geometry rows are
+    (interaction key, GEOMETRY_TYPES index, atom 1, atom 2, distance, angle).
+    """
+    frame_dir = os.path.join(system_dir, folder)
+    record = {'frame': int(folder.split('_')[1]), 'flags': 0, 'hits': [],
+              'bsa': (0.0, 0.0, 0.0), 'trends': [0] * len(TREND_TYPES), 'asa': [], 'geometry': []}
+
+    csv_file = os.path.join(frame_dir, folder + FINAL_SUFFIX)
+    if os.path.exists(csv_file):
+        record['flags'] |= HAS_FINAL
+    else:
+        csv_file = os.path.join(frame_dir, folder + QUICKLOOK_SUFFIX)
+        if os.path.exists(csv_file):
+            record['flags'] |= HAS_FINAL | PRELIMINARY
+    if record['flags'] & HAS_FINAL:
+        for row in _read_rows(csv_file):
+            # Skip if required fields are missing
+            if not all(key in row for key in RESIDUE_FIELDS):
+                continue
+            variant = (
+                f"{row['Res. Name 1']}{row['Res. Number 1']}_{row['Res. Name 2']}{row['Res. Number 2']}",
+                row['Res. Name 1'], int(row['Res. Number 1']), row['Chain 1'],
+                row['Res. Name 2'], int(row['Res. Number 2']), row['Chain 2'],
+            )
+            # Handle multiple types separated by semicolon
+            types = tuple(t.strip() for t in (row.get('Type of Interactions') or '').split(';') if t.strip())
+            record['hits'].append((variant, types))
+
+    csv_file = os.path.join(frame_dir, folder + RSA_SUFFIX)
+    if os.path.exists(csv_file):
+        record['flags'] |= HAS_AREA
+        bsa = {0: 0.0, 2: 0.0, 4: 0.0}  # rows for Total, POLAR and NON POLAR BSA
+        for row in _read_rows(csv_file):
+            try:
+                row_index = int(row.get('', '').strip())
+            except ValueError:
+                continue
+            if row_index in bsa:
+                match = extract_first_number(row.get('Value', ''))
+                if match:
+                    bsa[row_index] = float(match)
+        record['bsa'] = (bsa[0], bsa[2], bsa[4])
+
+    csv_file = os.path.join(frame_dir, folder + SUMMARY_SUFFIX)
+    if os.path.exists(csv_file):
+        record['flags'] |= HAS_SUMMARY
+        for row in _read_rows(csv_file):
+            value = int(row.get('Value', 0))
+            category = trend_category(row.get('Property', ''))
+            if category is not None:
+                record['trends'][TREND_TYPES.index(category)] = value
+
+    for side, suffix in enumerate(ASA_SUFFIXES, start=1):
+        csv_file = os.path.join(frame_dir, folder + suffix)
+        if not os.path.exists(csv_file):
+            continue
+        record['flags'] |= HAS_ASA
+        for row in _read_rows(csv_file):
+            try:
+                values = tuple(float(row[field]) for field in ASA_FIELDS)
+                residue = (row['Res. Name 1'].strip(), int(row['Res. Number 1']), row['Chain 1'].strip())
+            except (KeyError, TypeError, ValueError):
+                continue
+            record['asa'].append((side, *residue, *values))
+
+    for type_index, (_, suffix, atom1, atom2, angle) in enumerate(GEOMETRY_TYPES):
+        csv_file = os.path.join(frame_dir, folder + suffix)
+        if not os.path.exists(csv_file):
+            continue
+        for row in _read_rows(csv_file):
+            try:
+                key = f"{row['Res. Name 1']}{row['Res. Number 1']}_{row['Res. Name 2']}{row['Res. Number 2']}"
+                distance = _float_field(row[DISTANCE_FIELD])
+                angle_value = _float_field(row[angle]) if angle else float('nan')
+            except (KeyError, ValueError):
+                continue
+            record['geometry'].append((key, type_index,
+                                       row.get(atom1, '').strip() if atom1 else RING,
+                                       row.get(atom2, '').strip() if atom2 else RING,
+                                       distance, angle_value))
+
+    return record
+
+def parse_frames(system_dir, folders, workers=None, processes=False):
+    """
+    parse_frame over many folders on a bounded pool
+    Records are returned in folder order whatever order they finish in.
+    workers=1 parses sequentially; processes=True uses a process pool
+    instead of threads for CPU-bound parsing on fast storage.
+    """
+    workers = PARSE_WORKERS if workers is None else workers
+    workers = min(workers, len(folders))
+    if workers <= 1:
+        return [parse_frame(system_dir, folder) for folder in folders]
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        chunksize = max(1, len(folders) // (workers * 4)) if processes else 1
+        return list(pool.map(parse_frame, [system_dir] * len(folders), folders, chunksize=chunksize))
+
+class SystemStore:
+    """
+    Column arrays for one system, memory-mapped when loaded from disk
+    Frames are ordered as frame_folders reports them and referenced by
+    position. Interaction rows ("hits") point at a variant, the exact
+    residue pair a final_file row reported, and a pair, the interaction
+    key that groups variants the way the interactions endpoint does.
+    Strings (residue names, chains, keys) are indices into meta['strings'].
+    """
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.strings = meta['strings']
+        self.types = meta['types']
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @property
+    def total_frames(self):
+        return len(self.frames)
+
+    def frame_record(self, pos):
+        """Rebuild the parse_frame record of the frame at a position"""
+        s = self.strings
+        lo, hi = np.searchsorted(self.hit_frame, [pos, pos + 1])
+        hits = []
+        for variant, mask in zip(self.variants[self.hit_variant[lo:hi]].tolist(), self.hit_types[lo:hi].tolist()):
+            key, rn1, num1, ch1, rn2, num2, ch2 = variant
+            types = tuple(t for bit, t in enumerate(self.types) if mask >> bit & 1)
+            hits.append(((s[key], s[rn1], num1, s[ch1], s[rn2], num2, s[ch2]), types))
+        lo, hi = np.searchsorted(self.asa_frame, [pos, pos + 1])
+        asa = [(side, s[name], num, s[chain], *values)
+               for side, (name, num, chain), values in zip(
+                   self.asa_side[lo:hi].tolist(), self.asa_residue[lo:hi].tolist(),
+                   self.asa_values[lo:hi].tolist())]
+        lo, hi = np.searchsorted(self.geo_frame, [pos, pos + 1])
+        keys = self.variants[self.pair_variant[self.geo_pair[lo:hi]], 0].tolist()
+        geometry = [(s[key], type_index, s[atom1], s[atom2], distance, angle)
+                    for key, type_index, (atom1, atom2), (distance, angle) in zip(
+                        keys, self.geo_type[lo:hi].tolist(), self.geo_atoms[lo:hi].tolist(),
+                        self.geo_values[lo:hi].tolist())]
+        return {
+            'frame': int(self.frames[pos]),
+            'flags': int(self.flags[pos]),
+            'hits': hits,
+            'bsa': tuple(self.bsa[pos].tolist()),
+            'trends': self.trends[pos].tolist(),
+            'asa': asa,
+            'geometry': geometry,
+        }
+
+    def pair_info(self, pair):
+        """Residue fields of a pair, taken from its first reported variant"""
+        s = self.strings
+        _, rn1, num1, ch1, rn2, num2, ch2 = self.variants[self.pair_variant[pair]].tolist()
+        return {
+            'resName1': s[rn1], 'resNum1': num1, 'chain1': s[ch1],
+            'resName2': s[rn2], 'resNum2': num2, 'chain2': s[ch2],
+        }
+
+    def pair_frame_counts(self):
+        """Number of distinct frames each pair appears in, by popcount of its occupancy row"""
+        return popcount(self.occupancy).sum(axis=1, dtype=np.int64)
+
+    def frame_bitmap(self, pair):
+        """Base64 of a pair's packed occupancy row; bit i (MSB first) is frame position i"""
+        return base64.b64encode(self.occupancy[pair].tobytes()).decode('ascii')
+
+    def pair_type_masks(self):
+        """Union of the interaction type bits reported for each pair"""
+        masks = np.zeros(len(self.pair_variant), dtype=np.uint64)
+        np.bitwise_or.at(masks, self.hit_pair, self.hit_types)
+        return masks
+
+    def type_names(self, mask):
+        return [t for bit, t in enumerate(self.types) if int(mask) >> bit & 1]
+
+    def numeric_frame_order(self):
+        """Frame positions sorted by frame number"""
+        return np.argsort(self.frames, kind='stable')
+
+    def presence(self, pairs=None, order=None):
+        """Dense bool frame presence (pairs x frames), columns in order if given"""
+        rows = self.occupancy if pairs is None else self.occupancy[pairs]
+        dense = np.unpackbits(rows, axis=1, count=self.total_frames).astype(bool)
+        return dense if order is None else dense[:, order]
+
+    def window_counts(self, size, step, chunk=4096):
+        """
+        Frames present in each sliding window of size frames, every step
+        frames, in frame number order
+        Counts come from differences of a running sum over each pair's
+        presence row, so the cost is one pass whatever the window count.
+        Rows are processed in chunks of pairs to bound memory.
+        Returns (window starts as indices into frame number order,
+        pairs x windows counts).
+        """
+        order = self.numeric_frame_order()
+        starts = np.arange(0, self.total_frames - size + 1, step)
+        counts = np.zeros((len(self.pair_variant), len(starts)), dtype=np.int32)
+        for lo in range(0, len(self.pair_variant), chunk):
+            dense = self.presence(np.arange(lo, min(lo + chunk, len(self.pair_variant))), order)
+            cumulative = np.zeros((len(dense), self.total_frames + 1), dtype=np.int32)
+            np.cumsum(dense, axis=1, out=cumulative[:, 1:])
+            counts[lo:lo + len(dense)] = cumulative[:, starts + size] - cumulative[:, starts]
+        return starts, counts
+
+    def interaction_order(self):
+        """Pairs in response order: first-seen order, stably sorted by consistency"""
+        return np.argsort(-self.pair_frame_counts(), kind='stable')
+
+    def interactions(self, bitmaps=False):
+        """
+        Interactions with consistency scores, as the interactions endpoint
+        reports them, optionally with each pair's frameBitmap
+        """
+        return list(self.iter_interactions(bitmaps))
+
+    def iter_interactions(self, bitmaps=False):
+        """interactions() one entry at a time, holding only per-pair counts"""
+        total_frames = self.total_frames
+        counts = self.pair_frame_counts()
+        masks = self.pair_type_masks()
+        for pair in self.interaction_order().tolist():
+            frame_count = int(counts[pair])
+            entry = self.pair_info(pair)
+            entry.update({
+                'frameCount': frame_count,
+                'consistency': frame_count / total_frames,
+                'id1': f"{entry['chain1']}-{entry['resName1']}{entry['resNum1']}",
+                'id2': f"{entry['chain2']}-{entry['resName2']}{entry['resNum2']}",
+                'typesArray': self.type_names(masks[pair]),
+            })
+            if bitmaps:
+                entry['frameBitmap'] = self.frame_bitmap(pair)
+            yield entry
+
+    def pair_geometry_rows(self, pair):
+        """Geometry row indices of a pair, in frame order"""
+        return self.geo_pair_order[self.geo_pair_start[pair]:self.geo_pair_start[pair + 1]]
+
+    def preliminary_frames(self):
+        return int(np.count_nonzero(self.flags & PRELIMINARY))
+
+    def area(self):
+        """BSA per frame, for frames with Rsa stats"""
+        return [{'frame': frame, 'totalBSA': total, 'polarBSA': polar, 'nonPolarBSA': non_polar}
+                for frame, (total, polar, non_polar) in zip(
+                    self.frames[self.flags & HAS_AREA > 0].tolist(),
+                    self.bsa[self.flags & HAS_AREA > 0].tolist())]
+
+    def trend_series(self):
+        """Summary counts per interaction type, for frames with a summary table"""
+        counts = self.trends[self.flags & HAS_SUMMARY > 0]
+        return {name: counts[:, i].tolist() for i, name in enumerate(TREND_TYPES)}
+
+def build_arrays(records):
+    """Assemble frame records into the store's column arrays and string/type tables"""
+    strings, string_ids = [], {}
+    types, type_bits = [], {}
+    variant_ids, pair_ids = {}, {}
+    variants, variant_pair, pair_variant = [], [], []
+    hit_frame, hit_variant, hit_types = [], [], []
+    asa_frame, asa_side, asa_residue, asa_values = [], [], [], []
+
+    def sid(value):
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    for pos, record in enumerate(records):
+        for variant, row_types in record['hits']:
+            v = variant_ids.get(variant)
+            if v is None:
+                v = variant_ids[variant] = len(variants)
+                key, rn1, num1, ch1, rn2, num2, ch2 = variant
+                variants.append((sid(key), sid(rn1), num1, sid(ch1), sid(rn2), num2, sid(ch2)))
+                if key not in pair_ids:
+                    pair_ids[key] = len(pair_variant)
+                    pair_variant.append(v)
+                variant_pair.append(pair_ids[key])
+            mask = 0
+            for t in row_types:
+                if t not in type_bits:
+                    if len(types) == MAX_TYPES:
+                        raise ValueError(f"More than {MAX_TYPES} interaction types")
+                    type_bits[t] = len(types)
+                    types.append(t)
+                mask |= 1 << type_bits[t]
+            hit_frame.append(pos)
+            hit_variant.append(v)
+            hit_types.append(mask)
+        for side, name, num, chain, *values in record['asa']:
+            asa_frame.append(pos)
+            asa_side.append(side)
+            asa_residue.append((sid(name), num, sid(chain)))
+            asa_values.append(values)
+
+    hit_variant = np.array(hit_variant, dtype=np.int32)
+    variant_pair = np.array(variant_pair, dtype=np.int32)
+    hit_pair = variant_pair[hit_variant] if len(hit_variant) else np.zeros(0, dtype=np.int32)
+    hit_frame = np.array(hit_frame, dtype=np.int32)
+
+    # Geometry rows of interactions the final_file reports, in frame order
+    geo_frame, geo_pair, geo_type, geo_atoms, geo_values = [], [], [], [], []
+    for pos, record in enumerate(records):
+        for key, type_index, atom1, atom2, distance, angle in record.get('geometry', ()):
+            pair = pair_ids.get(key)
+            if pair is None:
+                continue
+            geo_frame.append(pos)
+            geo_pair.append(pair)
+            geo_type.append(type_index)
+            geo_atoms.append((sid(atom1), sid(atom2)))
+            geo_values.append((distance, angle))
+    geo_pair = np.array(geo_pair, dtype=np.int32)
+    # Rows of pair p are geo_pair_order[geo_pair_start[p]:geo_pair_start[p + 1]]
+    geo_pair_order = np.argsort(geo_pair, kind='stable')
+    geo_pair_start = np.zeros(len(pair_variant) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(geo_pair, minlength=len(pair_variant)), out=geo_pair_start[1:])
+
+    # Residue x frame ASA layers; the tables list interface residues only, so
+    # a residue missing from a frame that has them buries nothing there
+    flags = np.array([r['flags'] for r in records], dtype=np.uint8)
+    asa_frame = np.array(asa_frame, dtype=np.int32)
+    asa_keys = np.column_stack([np.array(asa_side, dtype=np.int64),
+                                np.array(asa_residue, dtype=np.int64).reshape(-1, 3)])
+    res_keys, res_index = np.unique(asa_keys, axis=0, return_inverse=True)
+    # Ordered by side, chain name and residue number; chain string ids follow first appearance
+    chain_names = np.array([strings[i] for i in res_keys[:, 3].tolist()], dtype=str)
+    order = np.lexsort((res_keys[:, 1], res_keys[:, 2], chain_names, res_keys[:, 0]))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    res_keys = res_keys[order]
+    res_index = rank[res_index.reshape(-1)]
+    res_asa = np.full((len(ASA_LAYERS), len(res_keys), len(records)), np.nan, dtype=np.float32)
+    res_asa[ASA_LAYERS.index('buried')][:, flags & HAS_ASA > 0] = 0
+    values = np.array(asa_values, dtype=np.float64).reshape(-1, len(ASA_FIELDS))
+    for layer in range(len(ASA_LAYERS)):
+        res_asa[layer, res_index, asa_frame] = values[:, layer]
+
+    # Frame presence of every pair, packed 8 frames per byte (np.packbits layout)
+    occupancy = np.zeros((len(pair_variant), (len(records) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(occupancy, (hit_pair, hit_frame >> 3),
+                     (0x80 >> (hit_frame & 7)).astype(np.uint8))
+    arrays = {
+        'frames': np.array([r['frame'] for r in records], dtype=np.int64),
+        'flags': flags,
+        'bsa': np.array([r['bsa'] for r in records], dtype=np.float64).reshape(-1, 3),
+        'trends': np.array([r['trends'] for r in records], dtype=np.int64).reshape(-1, len(TREND_TYPES)),
+        'variants': np.array(variants, dtype=np.int64).reshape(-1, 7),
+        'variant_pair': variant_pair,
+        'pair_variant': np.array(pair_variant, dtype=np.int32),
+        'hit_frame': hit_frame,
+        'hit_variant': hit_variant,
+        'hit_pair': hit_pair,
+        'hit_types': np.array(hit_types, dtype=np.uint64),
+        'occupancy': occupancy,
+        'asa_frame': asa_frame,
+        'asa_side': np.array(asa_side, dtype=np.uint8),
+        'asa_residue': np.array(asa_residue, dtype=np.int64).reshape(-1, 3),
+        'asa_values': values,
+        'geo_frame': np.array(geo_frame, dtype=np.int32),
+        'geo_pair': geo_pair,
+        'geo_type': np.array(geo_type, dtype=np.uint8),
+        'geo_atoms': np.array(geo_atoms, dtype=np.int32).reshape(-1, 2),
+        'geo_values': np.array(geo_values, dtype=np.float64).reshape(-1, 2),
+        'geo_pair_order': geo_pair_order,
+        'geo_pair_start': geo_pair_start,
+        'res_keys': res_keys.reshape(-1, 4),
+        'res_asa': res_asa,
+    }
+    return arrays, strings, types
+
+def _store_dir(system_dir):
+    return os.path.join(system_dir, STORE_DIR)
+
+def _array_path(store_dir, name, generation):
+    return os.path.join(store_dir, f"{name}.{generation}.npy")
+
+def open_store(system_dir):
+    """The compiled store on disk, memory-mapped, or None if there is none"""
+    store_dir = _store_dir(system_dir)
+    try:
+        with open(os.path.join(store_dir, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get('version') != STORE_VERSION:
+        return None
+    arrays = {}
+    try:
+        for name in ARRAYS:
+            arrays[name] = np.load(_array_path(store_dir, name, meta['generation']), mmap_mode='r')
+    except FileNotFoundError:
+        return None  # replaced by a newer compile while opening
+    return SystemStore(arrays, meta)
+
+def _write_store(system_dir, arrays, meta):
+    store_dir = _store_dir(system_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(_array_path(store_dir, name, meta['generation']), array)
+    tmp_file = os.path.join(store_dir, f"{META_FILE}.{meta['generation']}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, os.path.join(store_dir, META_FILE))
+
+    # Readers holding older generations keep their open mappings
+    suffix = f".{meta['generation']}.npy"
+    for name in os.listdir(store_dir):
+        if name.endswith('.npy') and not name.endswith(suffix):
+            try:
+                os.remove(os.path.join(store_dir, name))
+            except FileNotFoundError:
+                pass
+
+def compile_system(system_dir, previous=None, folders=None, fingerprints=None, workers=None):
+    """
+    Compile a system's frame CSVs into its store
+    Frames whose fingerprint matches the previous store are copied from it;
+    only new or changed frames are parsed, on up to workers threads. The
+    store is written to <system>/.compiled when possible and returned
+    either way.
+    """
+    folders = frame_folders(system_dir) if folders is None else folders
+    fingerprints = system_fingerprints(system_dir, folders) if fingerprints is None else fingerprints
+
+    reuse = {}
+    if previous is not None:
+        old_fingerprints = previous.meta['fingerprints']
+        for pos, folder in enumerate(previous.meta['folders']):
+            if old_fingerprints.get(folder) == fingerprints.get(folder):
+                reuse[folder] = pos
+
+    parsed = iter(parse_frames(system_dir, [f for f in folders if f not in reuse], workers))
+    records = [previous.frame_record(reuse[folder]) if folder in reuse else next(parsed)
+               for folder in folders]
+    arrays, strings, types = build_arrays(records)
+    meta = {
+        'version': STORE_VERSION,
+        'generation': uuid.uuid4().hex[:12],
+        'folders': folders,
+        'fingerprints': fingerprints,
+        'strings': strings,
+        'types': types,
+        'reused': len(reuse),
+    }
+    try:
+        _write_store(system_dir, arrays, meta)
+    except OSError:
+        return SystemStore(arrays, meta)  # read-only data folder
+    return open_store(system_dir) or SystemStore(arrays, meta)
+
+def load_system_store(system_dir, folders=None, fingerprints=None, workers=None):
+    """
+    The up-to-date store of a system, compiling it first when frames were
+    added, removed or changed since the last compile
+    folders and fingerprints may be passed when the caller already has them;
+    workers bounds the parse pool.
+    Returns None when the system has no frame folders.
+    """
+    folders = frame_folders(system_dir) if folders is None else folders
+    if not folders:
+        return None
+    fingerprints = system_fingerprints(system_dir, folders) if fingerprints is None else fingerprints
+    store = open_store(system_dir)
+    if store is not None and store.meta['folders'] == folders and store.meta['fingerprints'] == fingerprints:
+        return store
+
+    store_dir = _store_dir(system_dir)
+    try:
+        os.makedirs(store_dir, exist_ok=True)
+        lock_file = open(os.path.join(store_dir, LOCK_FILE), 'w')
+    except OSError:
+        return compile_system(system_dir, store, folders, fingerprints, workers)
+    with lock_file:
+        lock(lock_file)
+        try:
+            # Another process may have compiled while we waited
+            current = open_store(system_dir)
+            if current is not None and current.meta['folders'] == folders and current.meta['fingerprints'] == fingerprints:
+                return current
+            return compile_system(system_dir, current or store, folders, fingerprints, workers)
+        finally:
+            unlock(lock_file)
@@ -0,0 +1,88 @@
+"""
+Frame runs through the docker stand-in, warm and one container per frame
+"""
+import filecmp
+import json
+import os
+import sys
+
+import pytest
+
+from backend.cocomaps import get_frame_numbers, run_pending_frames
+from backend.conftest import REPO_ROOT, copy_system
+from backend.manifest import output_name
+
+SAMPLE = os.path.join(REPO_ROOT, 'md_mohit_protein')
+STANDIN = f'"{sys.executable}" -m backend.docker_standin'
+
+@pytest.fixture
+def system(tmp_path, monkeypatch):
+    """md_mohit_protein without outputs; the stand-in restores them from the sample"""
+    system_dir = copy_system('md_mohit_protein', str(tmp_path / 'data'))
+    for frame_num in get_frame_numbers(system_dir):
+        frame_dir = os.path.join(system_dir, f"frame_{frame_num}")
+        for name in os.listdir(frame_dir):
+            if name.endswith('.csv'):
+                os.remove(os.path.join(frame_dir, name))
+    monkeypatch.setenv('DOCKER_STANDIN_DIR', str(tmp_path / 'standin'))
+    monkeypatch.setenv('DOCKER_STANDIN_OUTPUTS', SAMPLE)
+    monkeypatch.setenv('PYTHONPATH', REPO_ROOT)
+    return system_dir
+
+def _calls(tmp_path, action):
+    with open(tmp_path / 'standin' / 'calls.log') as f:
+        calls = [json.loads(line) for line in f]
+    return [call for call in calls if call[0] == action]
+
+def _containers(tmp_path):
+    return [name for name in os.listdir(tmp_path / 'standin') if name != 'calls.log']
+
+def _same_final_file(system_dir, frame_num):
+    name = output_name(frame_num, '_A_B_final_file.csv')
+    return filecmp.cmp(os.path.join(system_dir, f"frame_{frame_num}", name),
+                       os.path.join(SAMPLE, f"frame_{frame_num}", name), shallow=False)
+
+def test_warm_pool_runs_frames_and_recycles(system, tmp_path):
+    frames = get_frame_numbers(system)
+    results, skipped = run_pending_frames(system, frames, workers=2, warm=True, recycle_after=3, docker=STANDIN)
+
+    assert [r['status'] for r in results] == ['done'] * len(frames) and skipped == []
+    assert all(_same_final_file(system, frame_num) for frame_num in frames)
+    started = [call for call in _calls(tmp_path, 'run') if '-d' in call]
+    assert len(started) >= -(-len(frames) // 3)  # a container per recycle_after frames at least
+    assert len(_calls(tmp_path, 'exec')) == len(frames)
+    assert _containers(tmp_path) == []  # every container removed on close
+
+    results, skipped = run_pending_frames(system, frames, workers=2, warm=True, docker=STANDIN)
+    assert results == [] and skipped == frames
+
+def test_warm_pool_replaces_container_after_failure(system, tmp_path, monkeypatch):
+    monkeypatch.setenv('DOCKER_STANDIN_FAIL', '2')
+    frames = get_frame_numbers(system)
+    results, _ = run_pending_frames(system, frames, workers=1, warm=True, recycle_after=100, docker=STANDIN)
+
+    failed = [r for r in results if r['status'] == 'failed']
+    assert [r['frame'] for r in failed] == [2] and 'analysis of frame_2 failed' in failed[0]['error']
+    assert len([call for call in _calls(tmp_path, 'run') if '-d' in call]) == 2
+    assert _containers(tmp_path) == []
+
+    # The manifest reports only the failed frame as pending
+    monkeypatch.delenv('DOCKER_STANDIN_FAIL')
+    results, skipped = run_pending_frames(system, frames, workers=1, warm=True, docker=STANDIN)
+    assert [(r['frame'], r['status']) for r in results] == [(2, 'done')] and len(skipped) == len(frames) - 1
+
+def test_warm_pool_times_out_and_kills_the_container(system, tmp_path, monkeypatch):
+    monkeypatch.setenv('DOCKER_STANDIN_SLEEP', '5')
+    results, _ = run_pending_frames(system, [1, 2], workers=2, warm=True, docker=STANDIN, timeout=1)
+
+    assert [r['status'] for r in results] == ['failed', 'failed']
+    assert all('timed out' in r['error'] for r in results)
+    assert _containers(tmp_path) == []
+    assert not os.path.exists(os.path.join(system, 'frame_1', output_name(1, '_A_B_final_file.csv')))
+
+def test_cold_runs_through_the_standin(system, tmp_path):
+    results, _ = run_pending_frames(system, [3, 4], workers=2, docker=STANDIN)
+
+    assert [r['status'] for r in results] == ['done', 'done']
+    assert _same_final_file(system, 3) and _same_final_file(system, 4)
+    assert len(_calls(tmp_path, 'exec')) == 0 and _containers(tmp_path) == []
@@ -0,0 +1,108 @@
+"""
+Comparing two systems against their per-frame CSVs
+"""
+import csv
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from backend.compare import MIN_DELTA
+
+FINAL = '.pd_h.pdb_A_B_final_file.csv'
+
+def _edit_rows(system_dir, frames, edit):
+    """Rewrite the final_file rows of frames through edit(row), which returns the row or None to drop it"""
+    for frame in frames:
+        csv_file = os.path.join(system_dir, f"frame_{frame}", f"frame_{frame}{FINAL}")
+        with open(csv_file, encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fields, rows = reader.fieldnames, list(reader)
+        with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fields)
+            writer.writeheader()
+            writer.writerows(row for row in map(edit, rows) if row is not None)
+
+def _is(row, chain1, num1, chain2, num2):
+    return (row['Chain 1'], row['Res. Number 1'], row['Chain 2'], row['Res. Number 2']) == (chain1, num1, chain2, num2)
+
+def csv_consistency(system_dir):
+    """Consistency of each (chain1, resNum1, chain2, resNum2) pair from the final_file CSVs"""
+    frames, total = {}, 0
+    for folder in os.listdir(system_dir):
+        csv_file = os.path.join(system_dir, folder, folder + FINAL)
+        if not os.path.exists(csv_file):
+            continue
+        total += 1
+        with open(csv_file, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                key = (row['Chain 1'], int(row['Res. Number 1']), row['Chain 2'], int(row['Res. Number 2']))
+                frames.setdefault(key, set()).add(folder)
+    return {key: len(f) / total for key, f in frames.items()}
+
+def _key(row):
+    return (row['chain1'], row['resNum1'], row['chain2'], row['resNum2'])
+
+@pytest.fixture
+def variant(data_folder):
+    """md_mohit_protein with one pair weakened, one dropped, one new and one residue mutated"""
+    system_dir = os.path.join(data_folder, 'variant')
+    shutil.copytree(os.path.join(data_folder, 'md_mohit_protein'), system_dir)
+    _edit_rows(system_dir, range(1, 7), lambda row: None if _is(row, 'A', '9', 'B', '11') else row)
+    _edit_rows(system_dir, range(1, 12), lambda row: None if _is(row, 'A', '9', 'B', '12') else row)
+
+    def mutate(row):
+        if _is(row, 'A', '10', 'B', '13'):
+            return dict(row, **{'Res. Name 1': 'ALA'})
+        return row
+    _edit_rows(system_dir, range(1, 12), mutate)
+    _edit_rows(system_dir, range(1, 5), lambda row: None if _is(row, 'A', '10', 'B', '13') else row)
+
+    for frame in range(1, 4):
+        csv_file = os.path.join(system_dir, f"frame_{frame}", f"frame_{frame}{FINAL}")
+        with open(csv_file, 'a', encoding='utf-8') as f:
+            f.write('999,ALA,500,A,GLY,600,B,H-bond\n')
+    return system_dir
+
+def test_deltas_match_the_csvs(client, data_folder, variant):
+    data = client.get('/api/compare?a=md_mohit_protein&b=variant').get_json()
+    a = csv_consistency(os.path.join(data_folder, 'md_mohit_protein'))
+    b = csv_consistency(variant)
+
+    assert {_key(row) for row in data['gained']} == set(b) - set(a) == {('A', 500, 'B', 600)}
+    assert {_key(row) for row in data['lost']} == set(a) - set(b) == {('A', 9, 'B', 12)}
+    expected = {key: b[key] - a[key] for key in set(a) & set(b) if abs(b[key] - a[key]) >= MIN_DELTA}
+    assert {_key(row): row['delta'] for row in data['changed']} == pytest.approx(expected)
+    assert set(expected) == {('A', 9, 'B', 11), ('A', 10, 'B', 13)}
+    assert data['counts'] == {'gained': 1, 'lost': 1, 'changed': 2,
+                              'unchanged': len(set(a) & set(b)) - 2}
+
+    gained = data['gained'][0]
+    assert gained['a'] is None and gained['b']['consistency'] == pytest.approx(3 / 11)
+    assert gained['delta'] == pytest.approx(3 / 11)
+    weakened, mutated = data['changed']  # largest change first
+    assert _key(weakened) == ('A', 9, 'B', 11) and weakened['delta'] == pytest.approx(-6 / 11)
+    assert not weakened['mutated']
+    assert mutated['mutated'] and mutated['a']['id1'] == 'A-GLN10' and mutated['b']['id1'] == 'A-ALA10'
+
+def test_self_comparison_is_unchanged(client):
+    data = client.get('/api/compare?a=1ULL&b=1ULL').get_json()
+    interactions = client.get('/api/systems/1ULL/interactions').get_json()['interactions']
+    trends = client.get('/api/systems/1ULL/trends').get_json()['trends']
+
+    assert data['counts'] == {'gained': 0, 'lost': 0, 'changed': 0, 'unchanged': len(interactions)}
+    for name, series in trends.items():
+        entry = data['trends']['types'][name]
+        assert entry['a'] == entry['b'] == pytest.approx(np.mean(series)) and entry['delta'] == 0
+
+def test_filters_and_limit_select_the_rows(client, variant):
+    data = client.get('/api/compare?a=md_mohit_protein&b=variant&resMin=9&resMax=9&limit=1').get_json()
+    assert data['counts']['lost'] == 1 and data['counts']['gained'] == 0 and len(data['changed']) == 1
+    data = client.get('/api/compare?a=md_mohit_protein&b=variant&minDelta=0.6').get_json()
+    assert data['counts']['changed'] == 0
+
+@pytest.mark.parametrize('query, status', [('a=1ULL', 400), ('a=1ULL&b=missing', 404),
+                                           ('a=1ULL&b=1ULL&minDelta=x', 400), ('a=1ULL&b=1ULL&limit=0', 400)])
+def test_rejects_invalid_arguments(client, query, status):
+    assert client.get(f'/api/compare?{query}').status_code == status
@@ -0,0 +1,73 @@
+"""
+Interaction co-occurrence against the per-frame CSVs
+"""
+import base64
+import os
+
+import numpy as np
+import pytest
+
+from backend.conftest import csv_interactions, interaction_key
+from backend.cooccurrence import cooccurrence_matrix, top_pairs
+
+URL = '/api/systems/md_mohit_protein/interactions/cooccurrence'
+
+def _matrix(data):
+    return np.frombuffer(base64.b64decode(data['matrix']), dtype='<f4').reshape(data['shape'])
+
+@pytest.fixture
+def csv_frames(client, data_folder):
+    """CSV frame sets of the interactions endpoint entries, in its order"""
+    frames, _ = csv_interactions(os.path.join(data_folder, 'md_mohit_protein'))
+    entries = client.get('/api/systems/md_mohit_protein/interactions').get_json()['interactions']
+    return {(entry['id1'], entry['id2']): frames[interaction_key(entry)] for entry in entries}
+
+def test_counts_and_jaccard_match_the_csvs(client, csv_frames):
+    counts = client.get(f'{URL}?minConsistency=0.2').get_json()
+    jaccard = client.get(f'{URL}?minConsistency=0.2&metric=jaccard').get_json()
+    sets = [csv_frames[(i['id1'], i['id2'])] for i in counts['interactions']]
+
+    assert counts['shape'] == [len(sets), len(sets)] and len(sets) > 10
+    assert _matrix(counts).tolist() == [[len(a & b) for b in sets] for a in sets]
+    assert np.allclose(_matrix(jaccard), [[len(a & b) / len(a | b) for b in sets] for a in sets])
+
+def test_pearson_matches_numpy(client, csv_frames):
+    data = client.get(f'{URL}?minConsistency=0.2&metric=pearson').get_json()
+    presence = np.array([[frame in csv_frames[(i['id1'], i['id2'])] for frame in range(1, 12)]
+                         for i in data['interactions']], dtype=float)
+    constant = presence.std(axis=1) == 0  # correlate as 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = np.corrcoef(presence)
+    expected[constant, :] = expected[:, constant] = 0
+
+    assert constant.any() and np.allclose(_matrix(data), expected, atol=1e-5)
+
+@pytest.mark.parametrize('metric', ['count', 'jaccard', 'pearson'])
+def test_top_pairs_agree_with_the_dense_matrix(metric):
+    rng = np.random.default_rng(3)
+    presence = rng.random((300, 25)) < 0.3
+    dense = cooccurrence_matrix(presence, metric)
+    i, j, value, count = top_pairs(presence, 50, metric, block_rows=64)
+
+    upper = np.triu_indices(len(presence), k=1)
+    assert np.allclose(value, np.sort(dense[upper])[::-1][:50])
+    assert np.allclose(dense[i, j], value) and (i < j).all()
+    assert (count == (presence[i] & presence[j]).sum(axis=1)).all()
+
+def test_top_k_pairs_name_interactions(client, csv_frames):
+    data = client.get(f'{URL}?topK=5&metric=jaccard').get_json()
+    sets = [csv_frames[(i['id1'], i['id2'])] for i in data['interactions']]
+
+    assert len(data['pairs']) == 5 and 'matrix' not in data
+    for pair in data['pairs']:
+        a, b = sets[pair['a']], sets[pair['b']]
+        assert pair['count'] == len(a & b) and abs(pair['value'] - len(a & b) / len(a | b)) < 1e-6
+
+@pytest.mark.parametrize('query', ['metric=cosine', 'topK=0', 'topK=x'])
+def test_rejects_invalid_arguments(client, query):
+    assert client.get(f'{URL}?{query}').status_code == 400
+
+def test_dense_limit(client):
+    client.application.config['COOCCURRENCE_MAX_DENSE'] = 3
+    assert client.get(URL).status_code == 400
+    assert client.get(f'{URL}?topK=3').status_code == 200
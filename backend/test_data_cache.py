@@ -0,0 +1,76 @@
+"""
+Aggregated data cache and the data endpoints it serves
+"""
+import os
+
+import pytest
+
+from backend.conftest import SAMPLE_SYSTEMS, csv_interactions, interaction_key
+from backend.data_cache import DataCache
+
+def _stats(client):
+    return client.get('/api/cache/stats').get_json()['data']
+
+def test_entries_are_served_only_for_their_digest():
+    cache = DataCache(1000)
+    cache.put(('sys', 'interactions'), 'd1', {'a': 1})
+
+    assert cache.get(('sys', 'interactions'), 'd1') == {'a': 1}
+    assert cache.get(('sys', 'interactions'), 'd2') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_evicts_least_recently_used():
+    cache = DataCache(25)
+    cache.put('a', 'd', 'x' * 8)  # 10 bytes as JSON
+    cache.put('b', 'd', 'x' * 8)
+    cache.get('a', 'd')
+    cache.put('c', 'd', 'x' * 8)
+    cache.put('huge', 'd', 'x' * 100)  # larger than the cache: never stored
+
+    assert cache.get('b', 'd') is None and cache.get('a', 'd') and cache.get('c', 'd')
+    assert cache.stats()['evictions'] == 1 and cache.stats()['entries'] == 2 and cache.stats()['bytes'] == 20
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_interactions_match_the_csvs(client, data_folder, name):
+    data = client.get(f'/api/systems/{name}/interactions').get_json()
+    frames, types = csv_interactions(os.path.join(data_folder, name))
+
+    assert data['system'] == name and not data['preliminary']
+    assert data['totalFrames'] == len({f for fs in frames.values() for f in fs})
+    assert {interaction_key(i): i['frameCount'] for i in data['interactions']} == \
+        {key: len(f) for key, f in frames.items()}
+    assert all(i['consistency'] == i['frameCount'] / data['totalFrames'] for i in data['interactions'])
+    assert {interaction_key(i): set(i['typesArray']) for i in data['interactions']} == types
+
+def test_repeated_requests_are_served_from_the_cache(client):
+    first = client.get('/api/systems/1ULL/interactions')
+    hits = _stats(client)['hits']
+    second = client.get('/api/systems/1ULL/interactions')
+
+    assert second.get_data() == first.get_data()
+    assert _stats(client)['hits'] > hits
+
+def test_changed_frames_are_rebuilt(client, data_folder):
+    before = client.get('/api/systems/1ULL/interactions')
+    final_file = os.path.join(data_folder, '1ULL', 'frame_4', 'frame_4.pd_h.pdb_A_B_final_file.csv')
+    with open(final_file, encoding='utf-8') as f:
+        header = f.readline()
+    with open(final_file, 'w', encoding='utf-8') as f:
+        f.write(header)
+
+    after = client.get('/api/systems/1ULL/interactions')
+    assert after.headers['ETag'] != before.headers['ETag']
+    frames, _ = csv_interactions(os.path.join(data_folder, '1ULL'))
+    assert {interaction_key(i): i['frameCount'] for i in after.get_json()['interactions']} == \
+        {key: len(f) for key, f in frames.items()}
+
+def test_dashboard_carries_each_endpoint_section(client):
+    dashboard = client.get('/api/systems/md_mohit_protein/dashboard').get_json()
+    for section in ('interactions', 'area', 'trends'):
+        data = client.get(f'/api/systems/md_mohit_protein/{section}').get_json()
+        assert {k: v for k, v in dashboard.items() if k in data} == data | {'system': 'md_mohit_protein'}
+
+    partial = client.get('/api/systems/md_mohit_protein/dashboard?include=area').get_json()
+    assert partial['include'] == ['area'] and 'interactions' not in partial
+    assert client.get('/api/systems/md_mohit_protein/dashboard?include=nope').status_code == 400
+    assert client.get('/api/systems/missing/dashboard').status_code == 404
@@ -0,0 +1,99 @@
+"""
+Interaction geometry statistics against the per-type CSVs
+"""
+import csv
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from backend.conftest import SAMPLE_SYSTEMS, interaction_key
+from backend.geometry import PERCENTILES, group_stats
+from backend.system_store import DISTANCE_FIELD, GEOMETRY_TYPES
+
+def _number(value):
+    match = re.search(r'-?\d+(\.\d+)?', value or '')
+    return float(match.group()) if match else None
+
+def csv_geometry(system_dir):
+    """{interaction key: {type id: [(frame, distance, angle), ...]}} from the per-type CSVs"""
+    rows = defaultdict(lambda: defaultdict(list))
+    for folder in os.listdir(system_dir):
+        if not folder.startswith('frame_'):
+            continue
+        for type_id, suffix, _, _, angle in GEOMETRY_TYPES:
+            csv_file = os.path.join(system_dir, folder, folder + suffix)
+            if not os.path.exists(csv_file):
+                continue
+            with open(csv_file, encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    key = f"{row['Res. Name 1']}{row['Res. Number 1']}_{row['Res. Name 2']}{row['Res. Number 2']}"
+                    rows[key][type_id].append((int(folder.split('_')[1]), _number(row[DISTANCE_FIELD]),
+                                               _number(row[angle]) if angle else None))
+    return rows
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_summary_matches_the_csvs(client, data_folder, name):
+    data = client.get(f'/api/systems/{name}/interactions/geometry').get_json()
+    expected = csv_geometry(os.path.join(data_folder, name))
+    entries = {(i['id1'], i['id2']): i for i in client.get(f'/api/systems/{name}/interactions').get_json()['interactions']}
+
+    assert len(data['interactions']) == len(entries)
+    for interaction in data['interactions']:
+        rows = expected[interaction_key(entries[(interaction['id1'], interaction['id2'])])]
+        assert [t['type'] for t in interaction['types']] == [t[0] for t in GEOMETRY_TYPES if t[0] in rows]
+        for summary in interaction['types']:
+            type_rows = rows[summary['type']]
+            distances = [distance for _, distance, _ in type_rows]
+            assert summary['rows'] == len(type_rows)
+            assert summary['frames'] == len({frame for frame, _, _ in type_rows})
+            assert summary['meanDistance'] == pytest.approx(np.mean(distances))
+            assert summary['minDistance'] == pytest.approx(min(distances))
+
+def test_pair_statistics_match_the_csvs(client, data_folder):
+    interactions = client.get('/api/systems/md_mohit_protein/interactions?types=h-bond').get_json()['interactions']
+    entry = interactions[0]
+    data = client.get(f"/api/systems/md_mohit_protein/interactions/geometry"
+                      f"?id1={entry['id1']}&id2={entry['id2']}&bins=5").get_json()
+    rows = csv_geometry(os.path.join(data_folder, 'md_mohit_protein'))[interaction_key(entry)]
+
+    assert [t['type'] for t in data['types']] == [t[0] for t in GEOMETRY_TYPES if t[0] in rows]
+    for type_entry in data['types']:
+        distances = np.array([distance for _, distance, _ in rows[type_entry['type']]])
+        stats = type_entry['distance']
+        assert stats['count'] == len(distances)
+        assert stats['mean'] == pytest.approx(distances.mean()) and stats['std'] == pytest.approx(distances.std())
+        assert stats['min'] == distances.min() and stats['max'] == distances.max()
+        assert [stats['percentiles'][str(q)] for q in PERCENTILES] == pytest.approx(
+            np.percentile(distances, PERCENTILES).tolist())
+        assert sum(type_entry['histograms']['distance']['counts']) == len(distances)
+        assert sum(len(p['series']['frames']) for p in type_entry['atomPairs']) == len(distances)
+
+def test_summary_and_pair_modes_share_the_types_shape(client):
+    summary = client.get('/api/systems/md_mohit_protein/interactions/geometry?types=h-bond').get_json()
+    interaction = summary['interactions'][0]
+    pair = client.get(f"/api/systems/md_mohit_protein/interactions/geometry"
+                      f"?id1={interaction['id1']}&id2={interaction['id2']}").get_json()
+
+    assert isinstance(interaction['types'], list) and isinstance(pair['types'], list)
+    assert [t['type'] for t in interaction['types']] == [t['type'] for t in pair['types']]
+    assert [t['frames'] for t in interaction['types']] == [t['frames'] for t in pair['types']]
+
+def test_group_stats_match_numpy():
+    rng = np.random.default_rng(5)
+    groups = rng.integers(0, 6, 500)
+    values = rng.normal(3, 1, 500)
+    values[::17] = np.nan
+    stats = group_stats(groups, values, 7)
+
+    for g in range(6):
+        own = values[(groups == g) & np.isfinite(values)]
+        assert stats['count'][g] == len(own) and stats['std'][g] == pytest.approx(own.std())
+        assert [stats[f'p{q}'][g] for q in PERCENTILES] == pytest.approx(np.percentile(own, PERCENTILES).tolist())
+    assert stats['count'][6] == 0 and np.isnan(stats['mean'][6]) and np.isnan(stats['p50'][6])
+
+@pytest.mark.parametrize('query, status', [('id1=A-X1', 400), ('bins=0', 400), ('id1=A-X1&id2=B-Y2', 404)])
+def test_rejects_invalid_arguments(client, query, status):
+    assert client.get(f'/api/systems/md_mohit_protein/interactions/geometry?{query}').status_code == status
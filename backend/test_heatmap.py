@@ -0,0 +1,73 @@
+"""
+Residue heatmap matrices against the per-frame CSVs
+"""
+import base64
+import csv
+import os
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from backend.conftest import SAMPLE_SYSTEMS
+from backend.interaction_index import matches_type
+
+def _decode(value, shape):
+    return np.frombuffer(base64.b64decode(value), dtype='<f4').reshape(shape)
+
+def csv_cells(system_dir, type_id=None):
+    """Consistency of each (id1, id2) cell, counting frames whose rows match type_id if given"""
+    frames, total = defaultdict(set), 0
+    for folder in os.listdir(system_dir):
+        csv_file = os.path.join(system_dir, folder, f"{folder}.pd_h.pdb_A_B_final_file.csv")
+        if not os.path.exists(csv_file):
+            continue
+        total += 1
+        with open(csv_file, encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if type_id is None or matches_type(row['Type of Interactions'], type_id):
+                    cell = (f"{row['Chain 1']}-{row['Res. Name 1']}{row['Res. Number 1']}",
+                            f"{row['Chain 2']}-{row['Res. Name 2']}{row['Res. Number 2']}")
+                    frames[cell].add(folder)
+    return {cell: len(f) / total for cell, f in frames.items()}
+
+def _cells(data, matrix):
+    return {(data['rows'][r], data['cols'][c]): float(matrix[r, c])
+            for r, c in zip(*np.nonzero(~np.isnan(matrix)))}
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_cells_and_layers_match_the_csvs(client, data_folder, name):
+    data = client.get(f'/api/systems/{name}/heatmap?layers=h-bond,proximal').get_json()
+    system_dir = os.path.join(data_folder, name)
+
+    matrix = _decode(data['matrix'], data['shape'])
+    assert _cells(data, matrix) == pytest.approx(csv_cells(system_dir))
+    for type_id in ('h-bond', 'proximal'):
+        layer = _cells(data, _decode(data['layers'][type_id], data['shape']))
+        assert layer == pytest.approx(csv_cells(system_dir, type_id))
+
+def test_axes_are_ordered_by_residue_number(client):
+    data = client.get('/api/systems/md_mohit_protein/heatmap').get_json()
+    numbers = [int(''.join(ch for ch in label.split('-', 1)[1] if ch.isdigit())) for label in data['rows']]
+    assert numbers == sorted(numbers) and len(set(data['rows'])) == len(data['rows'])
+
+def test_min_consistency_drops_cells(client, data_folder):
+    data = client.get('/api/systems/md_mohit_protein/heatmap?minConsistency=0.5').get_json()
+    expected = {cell: value for cell, value in csv_cells(os.path.join(data_folder, 'md_mohit_protein')).items()
+                if value >= 0.5}
+    assert _cells(data, _decode(data['matrix'], data['shape'])) == pytest.approx(expected)
+
+def test_rejects_unknown_layers(client):
+    assert client.get('/api/systems/md_mohit_protein/heatmap?layers=nope').status_code == 400
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_type_mask_matches_the_csvs(client, data_folder, name):
+    data = client.get(f'/api/systems/{name}/heatmap').get_json()
+    system_dir = os.path.join(data_folder, name)
+    mask = np.frombuffer(base64.b64decode(data['typeMask']), dtype='<u2').reshape(data['shape'])
+    matrix = _decode(data['matrix'], data['shape'])
+
+    assert data['layers'] == {} and not mask[np.isnan(matrix)].any()
+    for bit, type_id in enumerate(data['typeIds']):
+        cells = {(data['rows'][r], data['cols'][c]) for r, c in zip(*np.nonzero(mask & (1 << bit)))}
+        assert cells == set(csv_cells(system_dir, type_id)), type_id
@@ -0,0 +1,51 @@
+"""
+ETags, conditional requests and compressed bodies of the data endpoints
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+from backend.http_cache import COMPRESS_MIN_BYTES
+
+ENDPOINTS = ['interactions', 'area', 'trends', 'dashboard', 'interactions?minConsistency=0.5',
+             'interactions/windows?size=3', 'heatmap', 'area/residues']
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_matching_etag_gets_not_modified(client, endpoint):
+    url = f'/api/systems/md_mohit_protein/{endpoint}'
+    first = client.get(url)
+    etag = first.headers['ETag'].strip('"')
+
+    again = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+    assert again.status_code == 304 and again.get_data() == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert 'Accept-Encoding' in first.headers['Vary'] and first.headers['Cache-Control'] == 'no-cache'
+
+def test_etag_names_the_request_and_the_frames(client, data_folder):
+    url = '/api/systems/1ULL/interactions'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url + '?minConsistency=0.5').headers['ETag'] != etag
+    assert client.get('/api/systems/md_mohit_protein/interactions').headers['ETag'] != etag
+
+    with open(os.path.join(data_folder, '1ULL', 'frame_2', 'frame_2.pd_h.pdb_A_B_final_file.csv'), 'a') as f:
+        f.write('999,ALA,1,A,GLY,2,B,H-bond\n')
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+
+def test_gzip_bodies_decode_to_the_json(client):
+    url = '/api/systems/md_mohit_protein/interactions'
+    plain = client.get(url)
+    packed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers and packed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(packed.get_data())) == plain.get_json()
+    assert packed.headers['ETag'] != plain.headers['ETag']
+    assert len(packed.get_data()) < len(plain.get_data())
+
+def test_small_bodies_are_sent_as_they_are(client):
+    response = client.get('/api/systems/md_mohit_protein/interactions?minConsistency=2',
+                          headers={'Accept-Encoding': 'gzip'})
+    assert len(response.get_data()) < COMPRESS_MIN_BYTES and 'Content-Encoding' not in response.headers
+    assert response.get_json()['interactions'] == []
@@ -0,0 +1,69 @@
+"""
+Filtered and paged interactions
+"""
+import os
+
+import pytest
+
+from backend.interaction_index import INTERACTION_TYPES, matches_type
+
+URL = '/api/systems/md_mohit_protein/interactions'
+
+def _all(client):
+    return client.get(URL).get_json()['interactions']
+
+def _pages(client, query, limit):
+    pages, cursor = [], None
+    while True:
+        url = f"{URL}?{query}&limit={limit}" + (f"&cursor={cursor}" if cursor else '')
+        data = client.get(url).get_json()
+        pages.append(data['interactions'])
+        cursor = data['nextCursor']
+        if cursor is None:
+            return pages, data['matched']
+
+@pytest.mark.parametrize('query, keep', [
+    ('minConsistency=0.5', lambda i: i['consistency'] >= 0.5),
+    ('types=h-bond,salt-bridge',
+     lambda i: matches_type('; '.join(i['typesArray']), 'h-bond')
+     or matches_type('; '.join(i['typesArray']), 'salt-bridge')),
+    ('chain=B&resMin=10&resMax=20',
+     lambda i: any(chain == 'B' and 10 <= num <= 20
+                   for chain, num in ((i['chain1'], i['resNum1']), (i['chain2'], i['resNum2'])))),
+])
+def test_filters_match_filtering_the_full_list(client, query, keep):
+    expected = [i for i in _all(client) if keep(i)]
+    data = client.get(f"{URL}?{query}").get_json()
+
+    assert expected and data['interactions'] == expected
+    assert data['matched'] == len(expected) and data['nextCursor'] is None
+
+def test_pages_cover_the_result_once(client):
+    expected = [i for i in _all(client) if i['consistency'] >= 0.3]
+    pages, matched = _pages(client, 'minConsistency=0.3', 7)
+
+    assert matched == len(expected)
+    assert all(len(page) == 7 for page in pages[:-1]) and 0 < len(pages[-1]) <= 7
+    assert [i for page in pages for i in page] == expected
+
+def test_every_type_id_pages_to_its_postings(client):
+    everything = _all(client)
+    for type_id in INTERACTION_TYPES:
+        expected = [i for i in everything if matches_type('; '.join(i['typesArray']), type_id)]
+        pages, matched = _pages(client, f"types={type_id}", 50)
+        assert [i for page in pages for i in page] == expected and matched == len(expected)
+
+@pytest.mark.parametrize('query', ['limit=0', 'minConsistency=high', 'types=nope', 'limit=5&cursor=stale:4',
+                                   'limit=5&cursor=x'])
+def test_rejects_invalid_arguments(client, query):
+    response = client.get(f"{URL}?{query}")
+    assert response.status_code == 400 and 'error' in response.get_json()
+
+def test_cursor_is_stale_after_a_recompile(client, data_folder):
+    cursor = client.get(f"{URL}?limit=5").get_json()['nextCursor']
+    assert client.get(f"{URL}?limit=5&cursor={cursor}").status_code == 200
+
+    final_file = os.path.join(data_folder, 'md_mohit_protein', 'frame_2', 'frame_2.pd_h.pdb_A_B_final_file.csv')
+    with open(final_file, 'a', encoding='utf-8') as f:
+        f.write('999,ALA,1,A,GLY,2,B,H-bond\n')
+    assert client.get(f"{URL}?limit=5&cursor={cursor}").status_code == 400
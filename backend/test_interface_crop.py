@@ -0,0 +1,92 @@
+"""
+Interface cropping: what a crop keeps and recovery from interrupted cropped runs
+"""
+import hashlib
+import os
+
+import pytest
+
+from backend.cocomaps import finish_frame, prepare_frame, read_cropped_frame, run_pending_frames
+from backend.conftest import REPO_ROOT, copy_system
+from backend.interface_crop import compare_final_files, final_file_contacts
+from backend.manifest import output_name
+from backend.pdb_frames import FRAME_END, frame_path, load_frame_index, split_pdb_file
+
+FINAL = '_A_B_final_file.csv'
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _residues(pdb):
+    return {f"{line[21:22]}-{line[17:20].strip()}{line[22:26].strip()}"
+            for line in pdb.decode().splitlines() if line.startswith(('ATOM', 'HETATM'))}
+
+@pytest.fixture
+def indexed(tmp_path):
+    """1ULL split from its multi-model source without writing frame files"""
+    system_dir = copy_system('1ULL', str(tmp_path))
+    for name in os.listdir(system_dir):
+        if name.startswith('frame_'):
+            os.remove(frame_path(system_dir, int(name[len('frame_'):])))
+    split_pdb_file(os.path.join(system_dir, '1ULL.pdb'), system_dir, materialize=False)
+    return system_dir
+
+@pytest.mark.parametrize('name', ['md_mohit_protein', '1ULL'])
+def test_crop_keeps_every_interface_residue(name, tmp_path):
+    system_dir = copy_system(name, str(tmp_path))
+    for frame_num in (1, 2):
+        full = _read(frame_path(system_dir, frame_num))
+        cropped = read_cropped_frame(system_dir, frame_num, 5.0, frame_path(system_dir, frame_num))
+
+        assert len(cropped) < len(full)
+        final_file = os.path.join(system_dir, f"frame_{frame_num}", output_name(frame_num, FINAL))
+        contacts = final_file_contacts(final_file)
+        assert contacts and {res for c in contacts for res in c[:2]} <= _residues(cropped)
+
+def test_compare_final_files_reports_missing_and_extra(tmp_path):
+    full = os.path.join(REPO_ROOT, 'md_mohit_protein', 'frame_1', output_name(1, FINAL))
+    with open(full) as f:
+        lines = f.readlines()
+    cropped = str(tmp_path / 'cropped.csv')
+    with open(cropped, 'w') as f:
+        f.writelines(lines[:-1] + [',ALA,1,A,GLY,2,B,H-bond\n'])
+
+    assert compare_final_files(full, full)['match']
+    report = compare_final_files(full, cropped)
+    assert not report['match'] and report['contacts'] == len(lines) - 1
+    assert len(report['missing']) == 1 and report['extra'] == [['A-ALA1', 'B-GLY2', 'H-bond']]
+
+def test_interrupted_crop_of_a_frame_file_is_restored(tmp_path):
+    system_dir = copy_system('md_mohit_protein', str(tmp_path))
+    original = _read(frame_path(system_dir, 1))
+    assert prepare_frame(system_dir, 1, crop_margin=5.0) == 'set_aside'
+    assert _read(frame_path(system_dir, 1)) != original
+    # ... and the run dies before finish_frame
+
+    results, skipped = run_pending_frames(system_dir, [1, 2])
+    assert results == [] and skipped == [1, 2]  # inputs hash as the full frame again
+    assert _read(frame_path(system_dir, 1)) == original
+    assert not os.path.exists(os.path.join(system_dir, 'frame_1', 'frame_1.full.pdb'))
+
+    # A crash in between two runs with the same crop also recovers
+    state = prepare_frame(system_dir, 1, crop_margin=5.0)
+    assert prepare_frame(system_dir, 1, crop_margin=5.0) == state
+    finish_frame(system_dir, 1, state)
+    assert _read(frame_path(system_dir, 1)) == original
+
+def test_interrupted_crop_from_the_index_is_dropped(indexed):
+    entry = next(e for e in load_frame_index(indexed)['frames'] if e['frame'] == 3)
+    assert prepare_frame(indexed, 3, crop_margin=5.0) == 'written'
+    # ... and the run dies before finish_frame
+
+    assert prepare_frame(indexed, 3) == 'written'
+    full = _read(frame_path(indexed, 3))
+    assert hashlib.sha256(full[:-len(FRAME_END)]).hexdigest() == entry['sha256']
+    finish_frame(indexed, 3, 'written')
+    assert not os.path.exists(frame_path(indexed, 3))
+
+    state = prepare_frame(indexed, 3, crop_margin=5.0)
+    finish_frame(indexed, 3, state)
+    assert not [name for name in os.listdir(os.path.join(indexed, 'frame_3'))
+                if name in ('frame_3.pdb', 'frame_3.full.pdb', 'frame_3.cropped')]
@@ -0,0 +1,125 @@
+"""
+SQLite job store: claiming, heartbeats and orphaned jobs
+"""
+import sqlite3
+import time
+
+import pytest
+
+from backend import jobs
+from backend.file_lock import lock, unlock
+from backend.jobs import Heartbeat, JobStore, start_workers
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'))
+
+def _job(store, job_id):
+    with store._connect() as conn:
+        return dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+def test_claims_highest_priority_then_oldest(store):
+    low = store.enqueue('a')
+    high = store.enqueue('b', priority=5)
+    later = store.enqueue('c')
+
+    assert [store.claim(1)['id'] for _ in range(3)] == [high, low, later]
+    assert store.claim(1) is None
+    assert store.is_active('a') and _job(store, low)['heartbeat'] is not None
+
+def test_requeues_running_jobs_without_a_heartbeat(store):
+    stale, fresh = store.enqueue('stale'), store.enqueue('fresh')
+    store.claim(1)
+    store.claim(2)
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - 120, stale))
+
+    assert store.requeue_orphans(timeout=60) == 1
+    assert _job(store, stale)['status'] == 'queued' and _job(store, stale)['worker_pid'] is None
+    assert _job(store, fresh)['status'] == 'splitting'
+    assert store.claim(3)['id'] == stale  # picked up again by a live worker
+
+def test_finished_jobs_are_never_requeued(store):
+    job_id = store.enqueue('a')
+    store.claim(1)
+    store.update(job_id, status='completed')
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat = 0, updated = 0 WHERE id = ?", (job_id,))
+
+    assert store.requeue_orphans(timeout=0) == 0
+    assert not store.is_active('a')
+
+def test_heartbeat_keeps_a_long_job_alive(store):
+    job_id = store.enqueue('a')
+    store.claim(1)
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET heartbeat = 0 WHERE id = ?", (job_id,))
+
+    with Heartbeat(store, job_id, interval=0.05):
+        time.sleep(0.3)
+        assert store.requeue_orphans(timeout=5) == 0
+    assert _job(store, job_id)['status'] == 'splitting'
+
+def test_migrates_databases_without_heartbeats(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, system TEXT NOT NULL, "
+                 "source TEXT, status TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, "
+                 "progress INTEGER NOT NULL DEFAULT 0, frames INTEGER NOT NULL DEFAULT 0, "
+                 "skipped INTEGER NOT NULL DEFAULT 0, error TEXT, worker_pid INTEGER, "
+                 "created REAL NOT NULL, updated REAL NOT NULL)")
+    conn.execute("INSERT INTO jobs (system, status, worker_pid, created, updated) "
+                 "VALUES ('a', 'analyzing', 99999, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    assert store.requeue_orphans() == 1  # judged by its last update
+    assert store.latest('a')['status'] == 'queued'
+
+def test_pool_lock_admits_one_holder(tmp_path):
+    path = str(tmp_path / 'workers.lock')
+    with open(path, 'w') as first, open(path, 'w') as second:
+        assert lock(first, blocking=False)
+        assert not lock(second, blocking=False)
+        unlock(first)
+        assert lock(second, blocking=False)
+
+def test_finished_since_lists_each_finish_once(store):
+    a, b = store.enqueue('a'), store.enqueue('b')
+    store.enqueue('c')
+    assert store.finished_since() == ([], None)
+
+    store.update(a, status='completed')
+    store.update(b, status='failed')
+    systems, seen = store.finished_since()
+    assert systems == ['a', 'b'] and store.finished_since(seen) == ([], seen)
+
+    store.update(store.enqueue('a'), status='completed')
+    assert store.finished_since(seen)[0] == ['a']
+
+def test_worker_config_carries_the_app_settings(tmp_path, monkeypatch):
+    from backend.app import create_app
+
+    started = []
+
+    class Context:
+        def Process(self, target, args, daemon):
+            started.append(args[0])
+            return type('Process', (), {'start': lambda self: None})()
+    monkeypatch.setattr(jobs.multiprocessing, 'get_context', lambda method: Context())
+    monkeypatch.setattr(jobs, '_pool', None)
+    monkeypatch.setattr(jobs, '_next_attempt', 0.0)
+    monkeypatch.setattr(jobs, '_pool_lock_file', None)
+    app = create_app()
+    app.config.update(JOB_WORKERS=2, JOB_DB=str(tmp_path / 'jobs.sqlite3'), COCOMAPS_EXEC_TIMEOUT=45,
+                      DOCKER_COMMAND='standin', CROP_INTERFACE=True)
+
+    try:
+        assert start_workers(app)
+    finally:
+        jobs._pool_lock_file.close()
+    assert len(started) == 2
+    for config in started:
+        assert config['COCOMAPS_EXEC_TIMEOUT'] == 45 and config['DOCKER_COMMAND'] == 'standin'
+        assert config['CROP_INTERFACE'] is True
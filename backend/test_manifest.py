@@ -0,0 +1,76 @@
+"""
+Frame completion manifest: adoption, staleness and compaction
+"""
+import json
+import os
+
+import pytest
+
+from backend.cocomaps import get_frame_numbers
+from backend.conftest import copy_system
+from backend.manifest import MANIFEST_FILE, Manifest, output_name
+
+@pytest.fixture
+def system(tmp_path):
+    return copy_system('md_mohit_protein', str(tmp_path))
+
+def _lines(system_dir):
+    with open(os.path.join(system_dir, MANIFEST_FILE)) as f:
+        return [json.loads(line) for line in f]
+
+def test_adopts_frames_analyzed_before_the_manifest(system):
+    frames = get_frame_numbers(system)
+    pending, skipped = Manifest(system).pending(frames)
+
+    assert pending == [] and skipped == frames
+    assert {entry['frame'] for entry in _lines(system)} == set(frames)
+    assert all(entry['status'] == 'done' and len(entry['outputs']) == 3 for entry in _lines(system))
+    assert Manifest(system).pending(frames) == ([], frames)  # reloaded from disk
+
+def test_changed_parameters_inputs_or_outputs_make_frames_stale(system):
+    frames = get_frame_numbers(system)
+    Manifest(system).pending(frames)
+
+    params_file = os.path.join(system, 'frame_3', 'example_input.json')
+    with open(params_file) as f:
+        params = json.load(f)
+    params['HBOND_DIST'] = 3.5
+    with open(params_file, 'w') as f:
+        json.dump(params, f)
+    with open(os.path.join(system, 'frame_4', 'frame_4.pdb'), 'ab') as f:
+        f.write(b'REMARK changed\n')
+    with open(os.path.join(system, 'frame_5', output_name(5, '_A_B_summary_table.csv')), 'a') as f:
+        f.write('\n')
+    os.remove(os.path.join(system, 'frame_6', output_name(6, '_A_B_final_file.csv')))
+
+    pending, skipped = Manifest(system).pending(frames)
+    assert pending == [3, 4, 5, 6] and len(skipped) == len(frames) - 4
+
+def test_extra_params_count_as_parameters(system):
+    frames = get_frame_numbers(system)
+    Manifest(system).pending(frames)
+
+    pending, _ = Manifest(system, {'crop_margin': 5.0}).pending(frames)
+    assert pending == frames
+
+def test_done_without_outputs_is_recorded_failed(system):
+    os.remove(os.path.join(system, 'frame_2', output_name(2, '_A_B_complex.pdb_Rsa_stats.csv')))
+    manifest = Manifest(system)
+
+    assert manifest.record(2, 'done') == 'failed'
+    assert 'Rsa_stats' in manifest.frames[2]['error']
+    assert manifest.pending([2]) == ([2], [])
+
+def test_compacts_superseded_lines_and_skips_torn_writes(system):
+    manifest = Manifest(system)
+    for _ in range(5):
+        manifest.record(1, 'failed', 'boom')
+    manifest.record(1, 'done')
+    manifest.record(2, 'done')
+    with open(manifest.path, 'a') as f:
+        f.write('{"frame": 3, "sta')  # interrupted write
+
+    reloaded = Manifest(system)
+    assert sorted(reloaded.frames) == [1, 2]
+    assert reloaded.frames[1]['status'] == 'done'
+    assert [entry['frame'] for entry in _lines(system)] == [1, 2]
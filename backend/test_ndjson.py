@@ -0,0 +1,57 @@
+"""
+Interactions streamed as newline-delimited JSON
+"""
+import json
+import zlib
+
+import pytest
+
+from backend.http_cache import encode_stream
+from backend.wire_formats import NDJSON_MIMETYPE, ndjson_chunks
+
+URL = '/api/systems/md_mohit_protein/interactions'
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data().decode('utf-8').splitlines()]
+
+@pytest.mark.parametrize('query', ['', '?bitmap=true', '?minConsistency=0.3&limit=10', '?types=h-bond&bitmap=1'])
+def test_stream_carries_the_json_response(client, query):
+    response = client.get(URL + query, headers={'Accept': NDJSON_MIMETYPE})
+    expected = client.get(URL + query).get_json()
+
+    header, *records = _lines(response)
+    assert response.mimetype == NDJSON_MIMETYPE
+    assert records == expected['interactions']
+    assert header == {key: value for key, value in expected.items() if key != 'interactions'}
+
+def test_stream_pages_follow_the_cursor(client):
+    headers = {'Accept': NDJSON_MIMETYPE}
+    first, *page = _lines(client.get(f'{URL}?limit=20', headers=headers))
+    _, *rest = _lines(client.get(f"{URL}?limit=20&cursor={first['nextCursor']}", headers=headers))
+
+    assert page + rest == client.get(f'{URL}?limit=40').get_json()['interactions']
+    assert client.get(f'{URL}?limit=0', headers=headers).status_code == 400
+
+def test_stream_revalidates_and_compresses(client):
+    headers = {'Accept': NDJSON_MIMETYPE}
+    plain = client.get(URL, headers=headers)
+    assert client.get(URL, headers={**headers, 'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+    packed = client.get(URL, headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip' and packed.headers['ETag'] != plain.headers['ETag']
+    assert zlib.decompress(packed.get_data(), 16 + zlib.MAX_WBITS) == plain.get_data()
+
+def test_chunks_batch_records():
+    chunks = list(ndjson_chunks({'h': 1}, ({'n': i} for i in range(5)), batch=2))
+    assert len(chunks) == 4 and b''.join(chunks).decode().splitlines()[1:] == [f'{{"n":{i}}}' for i in range(5)]
+
+def test_compressed_stream_decodes_chunk_by_chunk():
+    chunks = [json.dumps({'n': i}).encode() * 50 for i in range(5)]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    pieces = list(encode_stream(iter(chunks), 'gzip'))
+
+    decoded = b''
+    for sent, piece in enumerate(pieces[:-1], 1):
+        decoded += decoder.decompress(piece)
+        assert decoded == b''.join(chunks[:sent])  # each chunk is readable on arrival
+    assert decoded + decoder.decompress(pieces[-1]) + decoder.flush() == b''.join(chunks)
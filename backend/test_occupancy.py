@@ -0,0 +1,28 @@
+"""
+Packed frame presence bitmaps against the per-frame CSVs
+"""
+import base64
+import os
+
+import pytest
+
+from backend.conftest import SAMPLE_SYSTEMS, csv_interactions, interaction_key
+
+def _frames(entry, bitmap_frames):
+    bits = ''.join(f"{byte:08b}" for byte in base64.b64decode(entry['frameBitmap']))
+    assert set(bits[len(bitmap_frames):]) <= {'0'}  # padding
+    return {frame for frame, bit in zip(bitmap_frames, bits) if bit == '1'}
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+@pytest.mark.parametrize('query', ['bitmap=true', 'bitmap=true&limit=1000'])
+def test_bitmaps_name_the_frames_of_each_interaction(client, data_folder, name, query):
+    data = client.get(f'/api/systems/{name}/interactions?{query}').get_json()
+    frames, _ = csv_interactions(os.path.join(data_folder, name))
+
+    assert sorted(data['bitmapFrames']) == sorted({f for fs in frames.values() for f in fs})
+    assert {interaction_key(i): _frames(i, data['bitmapFrames']) for i in data['interactions']} == frames
+    assert all(len(_frames(i, data['bitmapFrames'])) == i['frameCount'] for i in data['interactions'])
+
+def test_bitmaps_are_opt_in(client):
+    data = client.get('/api/systems/1ULL/interactions').get_json()
+    assert 'bitmapFrames' not in data and 'frameBitmap' not in data['interactions'][0]
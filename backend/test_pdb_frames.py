@@ -0,0 +1,163 @@
+"""
+Multi-model PDB splitting and the byte-offset frame index
+"""
+import os
+
+import pytest
+
+from backend import pdb_frames
+from backend.conftest import REPO_ROOT
+from backend.pdb_frames import (FRAME_END, FrameSource, find_model_ranges, frame_path, load_frame_index,
+                                materialize_frame, release_frame, split_pdb_file)
+
+HEADER = (b"HEADER    TEST\n"
+          b"REMARK   2 RESOLUTION. 2.00 ANGSTROMS.\n"
+          b"CRYST1   50.000   60.000   70.000  90.00  90.00  90.00 P 1           1\n"
+          b"SCALE1      0.020000  0.000000  0.000000        0.00000\n")
+
+def _atom(serial, chain, x):
+    return (f"ATOM  {serial:5d}  CA  ALA {chain}{serial:4d}    {x:8.3f}   0.000   0.000  1.00  0.00           C\n"
+            .encode('ascii'))
+
+def _models(count, header=HEADER):
+    """A PDB with count models of two atoms each, the first one moving"""
+    body = b"".join(b"MODEL     %4d\n" % (n + 1) + _atom(1, 'A', float(n)) + _atom(2, 'B', 5.0) + b"ENDMDL\n"
+                    for n in range(count))
+    return header + body + b"END\n"
+
+def _write(tmp_path, data, name='input.pdb'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_model_ranges_exclude_the_model_records():
+    data = _models(3)
+    ranges = find_model_ranges(data)
+    assert len(ranges) == 3
+    for n, (offset, length) in enumerate(ranges):
+        assert data[offset:offset + length] == _atom(1, 'A', float(n)) + _atom(2, 'B', 5.0)
+
+@pytest.mark.parametrize('data, message', [
+    (b"MODEL        1\n" + _atom(1, 'A', 0.0) + b"MODEL        2\n" + _atom(2, 'B', 0.0) + b"ENDMDL\n", 'Nested'),
+    (_models(2) + b"MODEL        3\n" + _atom(1, 'A', 0.0), 'no matching ENDMDL'),
+])
+def test_nested_or_unterminated_models_are_rejected(tmp_path, data, message):
+    with pytest.raises(ValueError, match=message):
+        find_model_ranges(data)
+    with pytest.raises(ValueError, match=message):
+        split_pdb_file(_write(tmp_path, data), str(tmp_path / 'system'))
+
+def test_frames_hold_the_header_records_and_one_model(tmp_path):
+    seen = []
+    count = split_pdb_file(_write(tmp_path, _models(3)), str(tmp_path / 'system'),
+                           on_frame=lambda n, total: seen.append((n, total)))
+
+    assert count == 3 and seen == [(1, 3), (2, 3), (3, 3)]
+    for n in range(3):
+        frame = _read(frame_path(str(tmp_path / 'system'), n + 1))
+        assert frame == HEADER.split(b"\n", 2)[2] + _atom(1, 'A', float(n)) + _atom(2, 'B', 5.0) + FRAME_END
+
+def test_crlf_input_is_split(tmp_path):
+    data = _models(2).replace(b"\n", b"\r\n")
+    assert split_pdb_file(_write(tmp_path, data), str(tmp_path / 'system')) == 2
+
+    frame = _read(frame_path(str(tmp_path / 'system'), 2))
+    assert frame.startswith(b"CRYST1") and b"REMARK" not in frame
+    assert frame[:-len(FRAME_END)] == (HEADER.split(b"\n", 2)[2] + _atom(1, 'A', 1.0)
+                                       + _atom(2, 'B', 5.0)).replace(b"\n", b"\r\n")
+
+def test_sample_models_match_the_source(tmp_path):
+    source = os.path.join(REPO_ROOT, '1ULL', '1ULL.pdb')
+    data = _read(source)
+    assert split_pdb_file(source, str(tmp_path)) == 7
+
+    for n, (offset, length) in enumerate(find_model_ranges(data), start=1):
+        frame = _read(frame_path(str(tmp_path), n))
+        assert frame.startswith(b"CRYST1") and frame.endswith(data[offset:offset + length] + FRAME_END)
+
+def test_file_without_models_needs_mdanalysis(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdb_frames, 'HAS_MDA', False)
+    path = _write(tmp_path, HEADER + _atom(1, 'A', 0.0) + _atom(2, 'B', 5.0) + b"END\n")
+    with pytest.raises(Exception, match='MDAnalysis not available'):
+        split_pdb_file(path, str(tmp_path / 'system'))
+    with pytest.raises(ValueError, match='empty'):
+        split_pdb_file(_write(tmp_path, b"", 'empty.pdb'), str(tmp_path / 'system'))
+
+def test_file_without_models_falls_back_to_mdanalysis(tmp_path):
+    pytest.importorskip('MDAnalysis')
+    path = _write(tmp_path, HEADER + _atom(1, 'A', 0.0) + _atom(2, 'B', 5.0) + b"END\n")
+    assert split_pdb_file(path, str(tmp_path / 'system')) == 1
+
+    frame = _read(frame_path(str(tmp_path / 'system'), 1))
+    assert frame.count(b"ATOM  ") == 2 and b"CRYST1" in frame
+    assert not os.path.exists(os.path.join(str(tmp_path / 'system'), pdb_frames.INDEX_FILE))
+
+@pytest.fixture
+def indexed(tmp_path):
+    """1ULL's source inside a system folder, indexed without writing frames"""
+    system_dir = tmp_path / 'system'
+    system_dir.mkdir()
+    source = _write(system_dir, _read(os.path.join(REPO_ROOT, '1ULL', '1ULL.pdb')), '1ULL.pdb')
+    split_pdb_file(source, str(system_dir), materialize=False)
+    return str(system_dir)
+
+def test_index_records_every_model_without_writing_frames(indexed):
+    index = load_frame_index(indexed)
+    assert [entry['frame'] for entry in index['frames']] == list(range(1, 8))
+    assert index['source'] == '1ULL.pdb' and index['header'].startswith('CRYST1')
+    assert not any(os.path.exists(frame_path(indexed, n)) for n in range(1, 8))
+
+@pytest.mark.parametrize('change', ['append', 'touch', 'remove', 'version'])
+def test_stale_index_is_ignored(indexed, change):
+    source = os.path.join(indexed, '1ULL.pdb')
+    index = load_frame_index(indexed)
+    if change == 'append':
+        with open(source, 'ab') as f:
+            f.write(b"REMARK\n")
+        os.utime(source, ns=(index['mtime_ns'], index['mtime_ns']))  # only the size differs
+    elif change == 'touch':
+        os.utime(source, ns=(index['mtime_ns'] + 10 ** 9, index['mtime_ns'] + 10 ** 9))
+    elif change == 'remove':
+        os.remove(source)
+    else:
+        pdb_frames.write_frame_index(indexed, dict(index, version=pdb_frames.INDEX_VERSION + 1))
+
+    assert load_frame_index(indexed) is None
+    with pytest.raises(FileNotFoundError):
+        FrameSource(indexed)
+    with pytest.raises(FileNotFoundError):
+        materialize_frame(indexed, 1)
+
+def test_slices_match_the_materialized_frames(indexed):
+    with FrameSource(indexed) as source:
+        for n in range(1, 8):
+            assert materialize_frame(indexed, n)
+            with source.frame(n) as frame_view:
+                assert _read(frame_path(indexed, n)) == source.header + bytes(frame_view) + FRAME_END
+
+def test_materialize_and_release_round_trip(indexed):
+    assert materialize_frame(indexed, 2)
+    written = _read(frame_path(indexed, 2))
+    assert not materialize_frame(indexed, 2)  # already there
+
+    release_frame(indexed, 2)
+    assert not os.path.exists(frame_path(indexed, 2))
+    release_frame(indexed, 2)  # nothing left to remove
+    assert materialize_frame(indexed, 2) and _read(frame_path(indexed, 2)) == written
+
+def test_release_keeps_frames_the_index_cannot_recreate(indexed):
+    materialize_frame(indexed, 3)
+    release_frame(indexed, 8)
+    os.makedirs(os.path.dirname(frame_path(indexed, 8)))
+    with open(frame_path(indexed, 8), 'wb') as f:
+        f.write(b"END\n")
+    release_frame(indexed, 8)
+    assert os.path.exists(frame_path(indexed, 8))
+
+    os.remove(os.path.join(indexed, '1ULL.pdb'))  # the index goes stale
+    release_frame(indexed, 3)
+    assert os.path.exists(frame_path(indexed, 3))
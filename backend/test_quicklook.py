@@ -0,0 +1,96 @@
+"""
+Quick-look contacts: agreement with CoCoMaps, staleness and failed analyses
+"""
+import json
+import os
+import sys
+
+import pytest
+
+from backend.conftest import REPO_ROOT, copy_system
+from backend.interface_crop import final_file_contacts
+from backend.manifest import output_name
+from backend.pdb_frames import split_pdb_file
+from backend.quicklook import is_current, quicklook_path, run_quicklook
+
+FINAL = '_A_B_final_file.csv'
+
+def _final_file(system_dir, frame_num):
+    return os.path.join(system_dir, f"frame_{frame_num}", output_name(frame_num, FINAL))
+
+def _pairs(csv_file):
+    return {contact[:2] for contact in final_file_contacts(csv_file)}
+
+@pytest.fixture
+def pending(tmp_path):
+    """1ULL indexed from its source file, with no CoCoMaps outputs yet"""
+    system_dir = copy_system('1ULL', str(tmp_path / 'data'))
+    split_pdb_file(os.path.join(system_dir, '1ULL.pdb'), system_dir)
+    for frame_num in range(1, 8):
+        os.remove(_final_file(system_dir, frame_num))
+    return system_dir
+
+@pytest.mark.parametrize('name', ['md_mohit_protein', '1ULL'])
+def test_residue_pairs_match_cocomaps(name, tmp_path):
+    system_dir = copy_system(name, str(tmp_path))
+    for frame_num in (1, 2):
+        os.rename(_final_file(system_dir, frame_num), str(tmp_path / 'final.csv'))
+        assert run_quicklook(system_dir, [frame_num]) == 1
+        assert _pairs(quicklook_path(system_dir, frame_num)) == _pairs(str(tmp_path / 'final.csv'))
+
+def test_skips_frames_with_a_final_file(tmp_path):
+    system_dir = copy_system('md_mohit_protein', str(tmp_path))
+    assert run_quicklook(system_dir, [1, 2, 3]) == 0
+    assert not os.path.exists(quicklook_path(system_dir, 1))
+
+def test_regenerates_when_the_frame_or_parameters_change(pending):
+    assert run_quicklook(pending, [1, 2, 3], workers=2) == 3
+    assert run_quicklook(pending, [1, 2, 3], workers=2) == 0
+
+    # Re-split from different coordinates: the index sha256 no longer matches
+    index_file = os.path.join(pending, 'frame_index.json')
+    with open(index_file) as f:
+        index = json.load(f)
+    index['frames'][0]['sha256'] = '0' * 64
+    with open(index_file, 'w') as f:
+        json.dump(index, f)
+    params_file = os.path.join(pending, 'frame_2', 'example_input.json')
+    with open(params_file) as f:
+        params = json.load(f)
+    params['CUT_OFF'] = 3
+    with open(params_file, 'w') as f:
+        json.dump(params, f)
+
+    assert not is_current(pending, 1) and not is_current(pending, 2) and is_current(pending, 3)
+    assert run_quicklook(pending, [1, 2, 3]) == 2
+    assert is_current(pending, 1) and is_current(pending, 2)
+    assert len(_pairs(quicklook_path(pending, 2))) < len(_pairs(quicklook_path(pending, 3)))
+
+def test_csv_without_a_key_is_regenerated(pending):
+    with open(quicklook_path(pending, 4), 'w') as f:
+        f.write(',Res. Name 1\n')  # from before keys, or a crash before the key was written
+    assert run_quicklook(pending, [4]) == 1
+    assert _pairs(quicklook_path(pending, 4))
+
+def test_failed_analysis_discards_the_quick_look(pending, tmp_path, monkeypatch):
+    from backend.app import create_app
+    from backend.jobs import JobStore
+    from backend.routes.upload import process_job
+
+    monkeypatch.setenv('DOCKER_STANDIN_DIR', str(tmp_path / 'standin'))
+    monkeypatch.setenv('DOCKER_STANDIN_OUTPUTS', os.path.join(REPO_ROOT, '1ULL'))
+    monkeypatch.setenv('DOCKER_STANDIN_FAIL', '2')
+    monkeypatch.setenv('PYTHONPATH', REPO_ROOT)
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER=os.path.dirname(pending), DATA_FOLDER=os.path.dirname(pending),
+                      JOB_WORKERS=0, RESULT_CACHE_DIR=None, COCOMAPS_WORKERS=2,
+                      DOCKER_COMMAND=f'"{sys.executable}" -m backend.docker_standin')
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    store.enqueue('1ULL')
+
+    with app.app_context():
+        process_job(store, store.claim(1))
+
+    assert store.latest('1ULL')['status'] == 'completed'
+    assert not os.path.exists(quicklook_path(pending, 2)) and not is_current(pending, 2)
+    assert os.path.exists(_final_file(pending, 1)) and os.path.exists(quicklook_path(pending, 1))
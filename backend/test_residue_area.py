@@ -0,0 +1,61 @@
+"""
+Per-residue ASA series against the per-frame ASA tables
+"""
+import base64
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from backend.conftest import SAMPLE_SYSTEMS
+from backend.system_store import ASA_FIELDS, ASA_SUFFIXES
+
+def csv_asa(system_dir):
+    """{(side, residue id): {frame: (complex, free, buried)}} from the ASA tables"""
+    values = {}
+    for folder in os.listdir(system_dir):
+        for side, suffix in enumerate(ASA_SUFFIXES, start=1):
+            csv_file = os.path.join(system_dir, folder, folder + suffix)
+            if not os.path.exists(csv_file):
+                continue
+            with open(csv_file, encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    residue = f"{row['Chain 1'].strip()}-{row['Res. Name 1'].strip()}{int(row['Res. Number 1'])}"
+                    values.setdefault((side, residue), {})[int(folder.split('_')[1])] = \
+                        tuple(float(row[field]) for field in ASA_FIELDS[:3])
+    return values
+
+def _series(data, layer):
+    return np.frombuffer(base64.b64decode(data['series'][layer]), dtype='<f4').reshape(data['shape'])
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_series_match_the_asa_tables(client, data_folder, name):
+    data = client.get(f'/api/systems/{name}/area/residues?layers=complex,free,buried&top=3').get_json()
+    expected = csv_asa(os.path.join(data_folder, name))
+
+    assert data['frames'] == sorted({frame for frames in expected.values() for frame in frames})
+    assert {(r['side'], r['id']) for r in data['residues']} == set(expected)
+    for layer_index, layer in enumerate(('complex', 'free', 'buried')):
+        series = _series(data, layer)
+        for row, residue in zip(series, data['residues']):
+            frames = expected[(residue['side'], residue['id'])]
+            missing = 0.0 if layer == 'buried' else None
+            want = [frames[f][layer_index] if f in frames else missing for f in data['frames']]
+            got = [None if np.isnan(v) else v for v in row.tolist()]
+            assert got == pytest.approx(want, abs=1e-4)
+
+    buried = _series(data, 'buried')
+    means = buried.mean(axis=1)
+    assert [r['meanBuried'] for r in data['residues']] == pytest.approx(means.tolist(), abs=1e-4)
+    assert [means[i] for i in data['hotspots']] == pytest.approx(sorted(means, reverse=True)[:3], abs=1e-4)
+    assert data['frameMeans']['buried'] == pytest.approx(buried.mean(axis=0).tolist(), abs=1e-4)
+
+def test_chain_selects_residues(client):
+    data = client.get('/api/systems/md_mohit_protein/area/residues?chain=B').get_json()
+    assert data['residues'] and {r['chain'] for r in data['residues']} == {'B'}
+    assert data['shape'][0] == len(data['residues']) and data['layers'] == ['buried']
+
+@pytest.mark.parametrize('query', ['layers=nope', 'top=-1', 'top=x'])
+def test_rejects_invalid_arguments(client, query):
+    assert client.get(f'/api/systems/md_mohit_protein/area/residues?{query}').status_code == 400
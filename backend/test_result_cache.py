@@ -0,0 +1,113 @@
+"""
+CoCoMaps output cache: keys, restore, eviction and isolation from reruns
+"""
+import filecmp
+import json
+import os
+import sys
+
+import pytest
+
+from backend.cocomaps import run_pending_frames
+from backend.conftest import REPO_ROOT, copy_system
+from backend.manifest import output_name
+from backend.result_cache import ResultCache, detach_outputs, frame_cache_key
+
+FINAL = '_A_B_final_file.csv'
+
+@pytest.fixture
+def system(tmp_path):
+    return copy_system('md_mohit_protein', str(tmp_path / 'data'))
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / 'cache'), 1 << 30)
+
+def _path(system_dir, frame_num, suffix=FINAL):
+    return os.path.join(system_dir, f"frame_{frame_num}", output_name(frame_num, suffix))
+
+def _set_param(system_dir, frame_num, name, value):
+    path = os.path.join(system_dir, f"frame_{frame_num}", 'example_input.json')
+    with open(path) as f:
+        params = json.load(f)
+    params[name] = value
+    with open(path, 'w') as f:
+        json.dump(params, f)
+
+def test_key_follows_coordinates_and_parameters(system):
+    key = frame_cache_key(system, 1)
+    assert key == frame_cache_key(system, 1) and key != frame_cache_key(system, 2)
+    assert frame_cache_key(system, 1, {'crop_margin': 5.0}) != key
+
+    _set_param(system, 1, 'CUT_OFF', 6)
+    changed_params = frame_cache_key(system, 1)
+    assert changed_params != key
+    with open(os.path.join(system, 'frame_1', 'frame_1.pdb'), 'ab') as f:
+        f.write(b'REMARK moved\n')
+    assert frame_cache_key(system, 1) not in (key, changed_params)
+
+    os.remove(os.path.join(system, 'frame_2', 'frame_2.pdb'))
+    assert frame_cache_key(system, 2) is None
+
+def test_restores_outputs_into_another_frame(system, cache):
+    cache.store('k' * 64, os.path.join(system, 'frame_1'), 1)
+    for name in os.listdir(os.path.join(system, 'frame_5')):
+        if name.endswith('.csv'):
+            os.remove(os.path.join(system, 'frame_5', name))
+
+    assert cache.restore('k' * 64, os.path.join(system, 'frame_5'), 5)
+    assert not cache.restore('m' * 64, os.path.join(system, 'frame_5'), 5)
+    assert filecmp.cmp(_path(system, 5), os.path.join(REPO_ROOT, 'md_mohit_protein', 'frame_1',
+                                                      output_name(1, FINAL)), shallow=False)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_rewriting_outputs_in_place_never_reaches_the_cache(system, cache, tmp_path):
+    key = 'k' * 64
+    original = open(_path(system, 1)).read()
+    cache.store(key, os.path.join(system, 'frame_1'), 1)
+
+    # A stale frame rerun rewrites its files in place
+    with open(_path(system, 1), 'w') as f:
+        f.write('rewritten\n')
+    restored = copy_system('md_mohit_protein', str(tmp_path / 'other'))
+    assert cache.restore(key, os.path.join(restored, 'frame_1'), 1)
+    assert open(_path(restored, 1)).read() == original
+
+    # Restored files are links; a rerun detaches them before writing
+    detach_outputs(os.path.join(restored, 'frame_1'), 1)
+    assert os.stat(_path(restored, 1)).st_nlink == 1
+    with open(_path(restored, 1), 'w') as f:
+        f.write('rewritten again\n')
+    assert cache.restore(key, os.path.join(system, 'frame_1'), 1)
+    assert open(_path(system, 1)).read() == original
+
+def test_evicts_least_recently_used_entries(system, tmp_path):
+    frame_dir = os.path.join(system, 'frame_1')
+    size = sum(os.path.getsize(os.path.join(frame_dir, name))
+               for name in os.listdir(frame_dir) if name.endswith('.csv'))
+    cache = ResultCache(str(tmp_path / 'small'), int(size * 2.5))
+    cache.store('a' * 64, frame_dir, 1)
+    cache.store('b' * 64, frame_dir, 1)
+    cache.restore('a' * 64, os.path.join(system, 'frame_2'), 2)  # a is now the most recent
+    cache.store('c' * 64, frame_dir, 1)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.restore('a' * 64, frame_dir, 1) and cache.restore('c' * 64, frame_dir, 1)
+    assert not cache.restore('b' * 64, frame_dir, 1)
+
+def test_pipeline_reuses_outputs_across_systems(system, cache, tmp_path, monkeypatch):
+    monkeypatch.setenv('DOCKER_STANDIN_DIR', str(tmp_path / 'standin'))
+    monkeypatch.setenv('DOCKER_STANDIN_OUTPUTS', os.path.join(REPO_ROOT, 'md_mohit_protein'))
+    monkeypatch.setenv('PYTHONPATH', REPO_ROOT)
+    docker = f'"{sys.executable}" -m backend.docker_standin'
+    for frame_num in (1, 2):
+        os.remove(_path(system, frame_num))
+    results, _ = run_pending_frames(system, [1, 2], cache=cache, workers=2, docker=docker)
+    assert [r.get('cached', False) for r in results] == [False, False]
+
+    again = copy_system('md_mohit_protein', str(tmp_path / 'again'))
+    for frame_num in (1, 2):
+        os.remove(_path(again, frame_num))
+    results, _ = run_pending_frames(again, [1, 2], cache=cache, workers=2, docker=docker)
+    assert [(r['status'], r.get('cached')) for r in results] == [('done', True), ('done', True)]
+    assert filecmp.cmp(_path(again, 2), _path(system, 2), shallow=False)
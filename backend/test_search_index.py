@@ -0,0 +1,165 @@
+"""
+Library-wide search postings against the per-frame CSVs
+"""
+import csv
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+
+import pytest
+
+from backend import jobs
+from backend.conftest import REPO_ROOT, SAMPLE_SYSTEMS
+from backend.interaction_index import matches_type
+from backend.search_index import SearchIndex, pair_key
+
+FINAL = '.pd_h.pdb_A_B_final_file.csv'
+
+def csv_postings(data_folder):
+    """{key: {system: frame numbers}} for residue, pair and type keys, from the final_file CSVs"""
+    postings = defaultdict(lambda: defaultdict(set))
+    for system in SAMPLE_SYSTEMS:
+        system_dir = os.path.join(data_folder, system)
+        for folder in os.listdir(system_dir):
+            csv_file = os.path.join(system_dir, folder, folder + FINAL)
+            if not os.path.exists(csv_file):
+                continue
+            frame = int(folder.split('_')[1])
+            with open(csv_file, encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    id1 = f"{row['Chain 1']}-{row['Res. Name 1']}{row['Res. Number 1']}"
+                    id2 = f"{row['Chain 2']}-{row['Res. Name 2']}{row['Res. Number 2']}"
+                    for key in (('residue', id1), ('residue', id2), pair_key(id1, id2)):
+                        postings[key][system].add(frame)
+                    if matches_type(row['Type of Interactions'], 'h-bond'):
+                        for key in (('residue', id1, 'h-bond'), pair_key(id1, id2) + ('h-bond',), ('type', 'h-bond')):
+                            postings[key][system].add(frame)
+    return postings
+
+def _found(data):
+    return {result['system']: set(result['frames']) for result in data['systems']}
+
+@pytest.fixture
+def expected(data_folder):
+    return csv_postings(data_folder)
+
+def test_residues_pairs_and_types_match_the_csvs(client, expected):
+    checked = 0
+    for key, systems in expected.items():
+        if key[0] == 'type':
+            query = f'type={key[1]}'
+        elif key[0] == 'residue':
+            query = f'residue={key[1]}' + (f'&type={key[2]}' if len(key) > 2 else '')
+        else:
+            query = f'pair={key[1]},{key[2]}' + (f'&type={key[3]}' if len(key) > 3 else '')
+        data = client.get(f'/api/search?{query}').get_json()
+        assert _found(data) == dict(systems), query
+        checked += 1
+    assert checked > 500
+
+def test_results_order_and_system_limit(client, expected):
+    data = client.get('/api/search?type=h-bond').get_json()
+    counts = [result['frameCount'] for result in data['systems']]
+    assert counts == sorted(counts, reverse=True) and data['indexedSystems'] == 2
+    assert all(result['frameCount'] == len(result['frames']) for result in data['systems'])
+
+    limited = client.get('/api/search?type=h-bond&systems=1ULL').get_json()
+    assert [result['system'] for result in limited['systems']] == ['1ULL']
+
+def test_pairs_match_in_either_order(client):
+    residue = client.get('/api/systems/1ULL/interactions').get_json()['interactions'][0]
+    forward = client.get(f"/api/search?pair={residue['id1']},{residue['id2']}").get_json()
+    backward = client.get(f"/api/search?pair={residue['id2']},{residue['id1']}").get_json()
+    assert forward['systems'] == backward['systems'] and forward['matchedSystems'] == 1
+
+def test_refresh_follows_added_changed_and_removed_systems(data_folder):
+    index = SearchIndex()
+    index.refresh(data_folder)
+    key = ('residue', 'A-PRO9')
+    assert [result['system'] for result in index.search(key)] == ['md_mohit_protein']
+
+    shutil.copytree(os.path.join(data_folder, 'md_mohit_protein'), os.path.join(data_folder, 'copy'))
+    shutil.rmtree(os.path.join(data_folder, 'copy', 'frame_11'))
+    index.refresh(data_folder)
+    assert {r['system']: r['frameCount'] for r in index.search(key)} == {'md_mohit_protein': 11, 'copy': 10}
+
+    shutil.rmtree(os.path.join(data_folder, 'copy'))
+    digest = index.digest
+    index.refresh(data_folder)
+    assert [result['system'] for result in index.search(key)] == ['md_mohit_protein'] and index.digest != digest
+
+def test_failed_reindex_drops_stale_postings(data_folder, monkeypatch):
+    index = SearchIndex()
+    index.refresh(data_folder)
+    key = ('residue', 'A-PRO9')
+    assert index.search(key)
+
+    # The system changes and then cannot be indexed again
+    with open(os.path.join(data_folder, 'md_mohit_protein', 'frame_1', 'frame_1' + FINAL), 'a') as f:
+        f.write('999,ALA,1,A,GLY,2,B,H-bond\n')
+    update_system = SearchIndex.update_system
+
+    def failing(self, system_id, *args, **kwargs):
+        if system_id == 'md_mohit_protein':
+            raise ValueError('unreadable store')
+        return update_system(self, system_id, *args, **kwargs)
+    monkeypatch.setattr(SearchIndex, 'update_system', failing)
+    index.refresh(data_folder)
+
+    assert index.search(key) == [] and 'md_mohit_protein' not in index.systems
+    assert index.stats()['failed'] == {'md_mohit_protein': 'unreadable store'}
+    assert set(index.systems) == {'1ULL'}
+
+    monkeypatch.undo()
+    index.refresh(data_folder)
+    assert index.search(key) and index.stats()['failed'] == {}
+
+def test_failed_systems_are_reported(client, monkeypatch):
+    def failing(self, system_id, *args, **kwargs):
+        raise ValueError('unreadable store')
+    monkeypatch.setattr(SearchIndex, 'update_system', failing)
+
+    data = client.get('/api/search?type=h-bond').get_json()
+    assert data['failedSystems'] == sorted(SAMPLE_SYSTEMS) and data['systems'] == []
+
+@pytest.fixture
+def worker_pool(client, monkeypatch, tmp_path):
+    """The client's app with one real job worker process analyzing through the docker stand-in"""
+    monkeypatch.setenv('DOCKER_STANDIN_DIR', str(tmp_path / 'standin'))
+    monkeypatch.setenv('DOCKER_STANDIN_OUTPUTS', os.path.join(REPO_ROOT, '1ULL'))
+    monkeypatch.setenv('PYTHONPATH', REPO_ROOT)
+    client.application.config.update(JOB_WORKERS=1, SEARCH_REFRESH_SECONDS=3600, QUICKLOOK=False,
+                                     DOCKER_COMMAND=f'"{sys.executable}" -m backend.docker_standin')
+    yield client
+    for process in jobs._pool or []:
+        process.terminate()
+        process.join()
+    if jobs._pool_lock_file is not None:
+        jobs._pool_lock_file.close()
+    monkeypatch.setattr(jobs, '_pool', None)
+    monkeypatch.setattr(jobs, '_pool_lock_file', None)
+    monkeypatch.setattr(jobs, '_next_attempt', 0.0)
+
+def test_finished_jobs_are_searchable_before_the_refresh_interval(worker_pool):
+    key = 'residue=' + worker_pool.get('/api/systems/1ULL/interactions').get_json()['interactions'][0]['id1']
+    assert _found(worker_pool.get(f'/api/search?{key}').get_json()).keys() == {'1ULL'}
+
+    with open(os.path.join(REPO_ROOT, '1ULL', '1ULL.pdb'), 'rb') as f:
+        response = worker_pool.post('/api/upload', data={'file': (f, 'fresh.pdb')})
+    assert response.status_code == 200
+    deadline = time.time() + 120
+    while worker_pool.get('/api/status/fresh').get_json()['status'] not in ('completed', 'failed'):
+        assert time.time() < deadline
+        time.sleep(0.2)
+
+    data = worker_pool.get(f'/api/search?{key}').get_json()
+    assert worker_pool.get('/api/status/fresh').get_json()['status'] == 'completed'
+    found = _found(data)
+    assert set(found) == {'1ULL', 'fresh'} and found['fresh'] == found['1ULL']
+    assert data['indexedSystems'] == 3
+
+@pytest.mark.parametrize('query', ['', 'type=nope', 'residue=A-PRO9&pair=A-PRO9,B-TRP11', 'pair=A-PRO9'])
+def test_rejects_invalid_queries(client, query):
+    assert client.get(f'/api/search?{query}').status_code == 400
@@ -0,0 +1,73 @@
+"""
+Compiled system store: agreement with the per-frame CSVs, recompiles and locking
+"""
+import os
+
+import pytest
+
+from backend import file_lock
+from backend.conftest import SAMPLE_SYSTEMS, copy_system, csv_interactions, interaction_key
+from backend.system_store import (FINAL_SUFFIX, HAS_ASA, LOCK_FILE, STORE_DIR, TREND_TYPES, build_arrays,
+                                  frame_folders, load_system_store, open_store, parse_frame)
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_interactions_match_the_csvs(name, tmp_path):
+    system_dir = copy_system(name, str(tmp_path))
+    store = load_system_store(system_dir)
+    frames, types = csv_interactions(system_dir)
+
+    interactions = store.interactions()
+    keyed = {interaction_key(i): i for i in interactions}
+    assert {key: i['frameCount'] for key, i in keyed.items()} == {key: len(f) for key, f in frames.items()}
+    assert {key: set(i['typesArray']) for key, i in keyed.items()} == types
+    assert store.total_frames == len(frame_folders(system_dir))
+    assert [i['frameCount'] for i in interactions] == sorted(map(len, frames.values()), reverse=True)
+
+def _comparable(record):
+    # Types are stored as a bit mask and missing angles as NaN
+    record['hits'] = [(variant, set(types)) for variant, types in record['hits']]
+    record['geometry'] = [tuple(None if v != v else v for v in row) for row in record['geometry']]
+    return record
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+def test_frame_records_round_trip(name, tmp_path):
+    system_dir = copy_system(name, str(tmp_path))
+    store = load_system_store(system_dir)
+    for pos, folder in enumerate(frame_folders(system_dir)):
+        assert _comparable(store.frame_record(pos)) == _comparable(parse_frame(system_dir, folder))
+
+def test_reopens_until_a_frame_changes(tmp_path):
+    system_dir = copy_system('md_mohit_protein', str(tmp_path))
+    first = load_system_store(system_dir)
+    assert load_system_store(system_dir).meta == first.meta
+    assert open_store(system_dir) is not None
+
+    final_file = os.path.join(system_dir, 'frame_3', 'frame_3' + FINAL_SUFFIX)
+    with open(final_file, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(final_file, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:1])
+    store = load_system_store(system_dir)
+    assert store.meta['fingerprints'] != first.meta['fingerprints']
+    assert {i['frameCount'] for i in store.interactions()} == set(map(len, csv_interactions(system_dir)[0].values()))
+
+def test_asa_residues_sort_by_side_chain_name_and_number():
+    asa = [(1, 'GLY', 12, 'B'), (2, 'SER', 3, 'A'), (1, 'ALA', 10, 'A'), (1, 'GLY', 2, 'B'), (1, 'LYS', 11, 'A')]
+    record = {'frame': 1, 'flags': HAS_ASA, 'hits': [], 'bsa': (0, 0, 0), 'trends': [0] * len(TREND_TYPES),
+              'asa': [row + (1.0, 2.0, 1.0, 50.0) for row in asa]}
+    arrays, strings, _ = build_arrays([record])
+
+    keys = [(side, strings[chain], number) for side, _, number, chain in arrays['res_keys'].tolist()]
+    assert keys == [(1, 'A', 10), (1, 'A', 11), (1, 'B', 2), (1, 'B', 12), (2, 'A', 3)]
+
+def test_compiles_without_fcntl_and_releases_the_lock(tmp_path, monkeypatch):
+    system_dir = copy_system('1ULL', str(tmp_path))
+    monkeypatch.setattr(file_lock, 'HAS_FCNTL', False)
+    monkeypatch.setattr(file_lock, 'HAS_MSVCRT', False)
+    assert load_system_store(system_dir).total_frames == 7
+
+    monkeypatch.undo()
+    os.remove(os.path.join(system_dir, STORE_DIR, 'meta.json'))
+    assert load_system_store(system_dir).total_frames == 7
+    with open(os.path.join(system_dir, STORE_DIR, LOCK_FILE), 'w') as f:
+        assert file_lock.lock(f, blocking=False)
@@ -0,0 +1,35 @@
+"""
+Upload and reprocess routes
+"""
+import pytest
+
+from backend.jobs import get_job_store
+
+@pytest.mark.parametrize('pdb_id', ['..', '.', '..%2F..', 'a%2Fb', '1ULL%2F..', '%2E%2E', 'a/b'])
+def test_reprocess_rejects_paths(client, pdb_id):
+    response = client.post(f'/api/reprocess/{pdb_id}')
+    assert response.status_code in (400, 404)
+    with get_job_store(client.application)._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+def test_reprocess_queues_an_existing_system(client):
+    response = client.post('/api/reprocess/1ULL')
+    assert response.status_code == 200 and response.get_json()['id'] == '1ULL'
+    assert get_job_store(client.application).latest('1ULL')['status'] == 'queued'
+    assert client.post('/api/reprocess/missing').status_code == 404
+
+def test_store_compile_failure_is_recorded(client, monkeypatch):
+    from backend.routes import upload
+    from backend.routes.upload import process_job
+
+    def failing(*args, **kwargs):
+        raise ValueError('unreadable table')
+    monkeypatch.setattr(upload, 'load_system_store', failing)
+    store = get_job_store(client.application)
+    store.enqueue('md_mohit_protein')
+
+    with client.application.app_context():
+        process_job(store, store.claim(1))  # every frame is complete, so nothing reruns
+
+    status = store.latest('md_mohit_protein')
+    assert status['status'] == 'completed' and 'unreadable table' in status['warning']
@@ -0,0 +1,30 @@
+"""
+Sliding-window consistency against the per-frame CSVs
+"""
+import os
+
+import pytest
+
+from backend.conftest import SAMPLE_SYSTEMS, csv_interactions, interaction_key
+
+@pytest.mark.parametrize('name', SAMPLE_SYSTEMS)
+@pytest.mark.parametrize('size, step', [(1, 1), (3, 1), (4, 2), (5, None)])
+def test_window_counts_match_the_csvs(client, data_folder, name, size, step):
+    url = f'/api/systems/{name}/interactions/windows?size={size}' + (f'&step={step}' if step else '')
+    data = client.get(url).get_json()
+    interactions = client.get(f'/api/systems/{name}/interactions').get_json()['interactions']
+    frames, _ = csv_interactions(os.path.join(data_folder, name))
+    numbers = sorted({f for fs in frames.values() for f in fs})
+
+    starts = range(0, len(numbers) - size + 1, step or size)
+    assert data['step'] == (step or size) and data['totalFrames'] == len(numbers)
+    assert data['windows'] == [{'startFrame': numbers[s], 'endFrame': numbers[s + size - 1]} for s in starts]
+    assert [(i['id1'], i['id2']) for i in data['interactions']] == [(i['id1'], i['id2']) for i in interactions]
+    for window_entry, entry in zip(data['interactions'], interactions):
+        present = frames[interaction_key(entry)]
+        assert window_entry['consistency'] == [len(present & set(numbers[s:s + size])) / size for s in starts]
+
+@pytest.mark.parametrize('query, status', [('', 400), ('size=0', 400), ('size=2&step=0', 400),
+                                           ('size=x', 400), ('size=12', 400)])
+def test_rejects_invalid_windows(client, query, status):
+    assert client.get(f'/api/systems/md_mohit_protein/interactions/windows?{query}').status_code == status
@@ -0,0 +1,65 @@
+"""
+MessagePack and Arrow IPC bodies decode to the JSON responses
+"""
+import json
+
+import numpy as np
+import pytest
+
+from backend.wire_formats import ARROW_MIMETYPE, MSGPACK_MIMETYPE
+
+DTYPES = {'bool': 'u1', 'int32': '<i4', 'float64': '<f8'}
+
+def decode_column(column):
+    if column['type'] == 'dictionary':
+        dtype = {'uint8': '<u1', 'uint16': '<u2', 'uint32': '<u4'}[column['indexType']]
+        return [column['dictionary'][i] for i in np.frombuffer(column['indices'], dtype=dtype).tolist()]
+    values = np.frombuffer(column['data'], dtype=DTYPES[column['type']]).tolist()
+    return [bool(v) for v in values] if column['type'] == 'bool' else values
+
+def decode_columnar(value):
+    """Undo wire_formats._columnar"""
+    if isinstance(value, dict) and set(value) == {'length', 'columns'}:
+        columns = {name: decode_column(column) for name, column in value['columns'].items()}
+        return [{name: values[i] for name, values in columns.items()} for i in range(value['length'])]
+    if isinstance(value, dict):
+        return {key: decode_columnar(item) for key, item in value.items()}
+    return value
+
+@pytest.mark.parametrize('endpoint', ['interactions', 'area', 'trends', 'dashboard', 'interactions?bitmap=true',
+                                      'interactions?limit=10', 'area/residues'])
+def test_msgpack_decodes_to_the_json(client, endpoint):
+    msgpack = pytest.importorskip('msgpack')
+    url = f'/api/systems/md_mohit_protein/{endpoint}'
+    response = client.get(url, headers={'Accept': MSGPACK_MIMETYPE})
+
+    assert response.mimetype == MSGPACK_MIMETYPE
+    decoded = decode_columnar(msgpack.unpackb(response.get_data(), raw=False))
+    assert decoded == client.get(url).get_json()
+
+@pytest.mark.parametrize('endpoint, table', [('interactions', 'interactions'), ('area', 'frames'),
+                                             ('interactions?minConsistency=0.5', 'interactions')])
+def test_arrow_table_holds_the_records(client, endpoint, table):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+    url = f'/api/systems/1ULL/{endpoint}'
+    response = client.get(url, headers={'Accept': ARROW_MIMETYPE})
+    expected = client.get(url).get_json()
+
+    arrow_table = pa.ipc.open_stream(response.get_data()).read_all()
+    assert response.mimetype == ARROW_MIMETYPE
+    assert arrow_table.to_pylist() == expected[table]
+    fields = json.loads(arrow_table.schema.metadata[b'fields'])
+    assert fields == {key: value for key, value in expected.items() if key != table}
+
+def test_formats_get_their_own_etags(client):
+    pytest.importorskip('msgpack')
+    pytest.importorskip('pyarrow')
+    url = '/api/systems/1ULL/interactions'
+    etags = {client.get(url, headers={'Accept': mimetype}).headers['ETag']
+             for mimetype in ('application/json', MSGPACK_MIMETYPE, ARROW_MIMETYPE)}
+    assert len(etags) == 3
+
+def test_arrow_is_not_offered_without_a_table(client):
+    response = client.get('/api/systems/1ULL/heatmap', headers={'Accept': ARROW_MIMETYPE})
+    assert response.mimetype == 'application/json'
@@ -0,0 +1,149 @@
+"""
+Binary encodings of data responses: MessagePack and Arrow IPC
+"""
+import json
+
+import numpy as np
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+NDJSON_BATCH = 256  # records per streamed chunk
+FORMATS = {
+    JSON_MIMETYPE: 'json',
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    ARROW_MIMETYPE: 'arrow',
+}
+
+def offered_mimetypes(table=None, stream=False):
+    """
+    Mimetypes a response can be sent as, JSON first; Arrow needs a table
+    field and NDJSON an endpoint that streams
+    """
+    offered = [JSON_MIMETYPE]
+    if HAS_MSGPACK:
+        offered += [MSGPACK_MIMETYPE, 'application/x-msgpack']
+    if HAS_ARROW and table is not None:
+        offered.append(ARROW_MIMETYPE)
+    if stream:
+        offered.append(NDJSON_MIMETYPE)
+    return offered
+
+def _index_type(size):
+    for dtype in ('<u1', '<u2'):
+        if size <= np.iinfo(dtype).max + 1:
+            return dtype
+    return '<u4'
+
+def _column(values):
+    """
+    One msgpack column: numbers as little-endian typed array bytes,
+    anything else dictionary-encoded as distinct values plus indices
+    """
+    if all(type(v) is bool for v in values):
+        return {'type': 'bool', 'data': np.array(values, dtype='u1').tobytes()}
+    if all(type(v) is int for v in values):
+        data = np.array(values, dtype=np.int64)
+        if len(data) == 0 or (data.min() >= -2 ** 31 and data.max() < 2 ** 31):
+            return {'type': 'int32', 'data': data.astype('<i4').tobytes()}
+        return {'type': 'float64', 'data': data.astype('<f8').tobytes()}
+    if all(type(v) in (int, float) for v in values):
+        return {'type': 'float64', 'data': np.array(values, dtype='<f8').tobytes()}
+
+    distinct = {}
+    indices = [distinct.setdefault(json.dumps(v, sort_keys=True), len(distinct)) for v in values]
+    index_type = _index_type(len(distinct))
+    dictionary = [json.loads(key) for key in distinct]
+    return {
+        'type': 'dictionary',
+        'indexType': {'<u1': 'uint8', '<u2': 'uint16', '<u4': 'uint32'}[index_type],
+        'dictionary': dictionary,
+        'indices': np.array(indices, dtype=index_type).tobytes()
+    }
+
+def columns(records):
+    """Column-wise form of a list of dicts: {'length', 'columns': {name: column}}"""
+    names = list(dict.fromkeys(name for record in records for name in record))
+    return {
+        'length': len(records),
+        'columns': {name: _column([record.get(name) for record in records]) for name in names}
+    }
+
+def _columnar(value):
+    if isinstance(value, dict):
+        return {key: _columnar(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return columns(value)
+    return value
+
+def encode_msgpack(payload):
+    """MessagePack of a response with every list of records made columnar"""
+    return msgpack.packb(_columnar(payload), use_bin_type=True)
+
+def _arrow_array(values):
+    array = pa.array(values)
+    if pa.types.is_string(array.type):
+        return array.dictionary_encode()
+    if pa.types.is_int64(array.type):
+        try:
+            return array.cast(pa.int32())
+        except pa.ArrowInvalid:
+            return array  # out of int32 range
+    return array
+
+def encode_arrow(payload, table):
+    """
+    Arrow IPC stream of payload[table] (a list of records, or a dict of
+    equal-length lists); the other fields go to the schema metadata as JSON
+    String columns are dictionary-encoded.
+    """
+    rows = payload[table]
+    if isinstance(rows, dict):
+        data = {name: _arrow_array(values) for name, values in rows.items()}
+    else:
+        names = list(dict.fromkeys(name for record in rows for name in record))
+        data = {name: _arrow_array([record.get(name) for record in rows]) for name in names}
+    fields = {key: value for key, value in payload.items() if key != table}
+    metadata = {'table': table, 'fields': json.dumps(fields)}
+    arrow_table = pa.table(data, metadata=metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+def encode_binary(payload, wire_format, table=None):
+    """Body bytes of a response payload as 'msgpack' or 'arrow'"""
+    if wire_format == 'arrow':
+        return encode_arrow(payload, table)
+    return encode_msgpack(payload)
+
+def ndjson_chunks(header, records, batch=NDJSON_BATCH):
+    """
+    Newline-delimited JSON: the header record, then one line per record,
+    yielded as byte chunks of up to batch lines
+    """
+    yield (json.dumps(header, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        if len(lines) == batch:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
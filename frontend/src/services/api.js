@@ -44,8 +44,85 @@ export default {
   },
 
   // Data
-  async getInteractions(systemId) {
-    const response = await api.get(`/systems/${systemId}/interactions`)
+  // filters: { minConsistency, types, chain, resMin, resMax, limit, cursor }
+  async getInteractions(systemId, filters = {}) {
+    const params = { ...filters }
+    if (Array.isArray(params.types)) params.types = params.types.join(',')
+    const response = await api.get(`/systems/${systemId}/interactions`, { params })
+    return response.data
+  },
+
+  // Streams NDJSON: onHeader(header) once, then onInteraction(interaction) per line
+  async streamInteractions(systemId, { onHeader, onInteraction }, filters = {}) {
+    const params = new URLSearchParams()
+    for (const [key, value] of Object.entries(filters)) {
+      if (value !== undefined && value !== null) {
+        params.set(key, Array.isArray(value) ? value.join(',') : value)
+      }
+    }
+    const response = await fetch(`${API_BASE_URL}/systems/${systemId}/interactions?${params}`, {
+      headers: { Accept: 'application/x-ndjson' }
+    })
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}))
+      throw new Error(data.error || `Server error (${response.status})`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let header = null
+    const handleLine = line => {
+      if (!line) return
+      const record = JSON.parse(line)
+      if (header === null) {
+        header = record
+        onHeader?.(record)
+      } else {
+        onInteraction?.(record)
+      }
+    }
+    for (;;) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop()
+      lines.forEach(handleLine)
+    }
+    handleLine(buffer + decoder.decode())
+    return header
+  },
+
+  async getInteractionWindows(systemId, size, step = size) {
+    const response = await api.get(`/systems/${systemId}/interactions/windows`, {
+      params: { size, step }
+    })
+    return response.data
+  },
+
+  // options: { metric: 'count' | 'jaccard' | 'pearson', topK, ...interaction filters }
+  async getInteractionCooccurrence(systemId, options = {}) {
+    const params = { ...options }
+    if (Array.isArray(params.types)) params.types = params.types.join(',')
+    const response = await api.get(`/systems/${systemId}/interactions/cooccurrence`, { params })
+    return response.data
+  },
+
+  // With id1 and id2, one residue pair's distance/angle statistics; otherwise a summary per interaction.
+  // types is a list of { type, ... } entries in both modes
+  async getInteractionGeometry(systemId, options = {}) {
+    const params = { ...options }
+    if (Array.isArray(params.types)) params.types = params.types.join(',')
+    const response = await api.get(`/systems/${systemId}/interactions/geometry`, { params })
+    return response.data
+  },
+
+  async getHeatmap(systemId, options = {}) {
+    const params = { ...options }
+    if (Array.isArray(params.types)) params.types = params.types.join(',')
+    if (Array.isArray(params.layers)) params.layers = params.layers.join(',')
+    const response = await api.get(`/systems/${systemId}/heatmap`, { params })
     return response.data
   },
 
@@ -54,11 +131,44 @@ export default {
     return response.data
   },
 
+  // options: { layers: ['complex', 'free', 'buried'], chain, top }
+  async getResidueArea(systemId, options = {}) {
+    const params = { ...options }
+    if (Array.isArray(params.layers)) params.layers = params.layers.join(',')
+    if (Array.isArray(params.chain)) params.chain = params.chain.join(',')
+    const response = await api.get(`/systems/${systemId}/area/residues`, { params })
+    return response.data
+  },
+
   async getTrends(systemId) {
     const response = await api.get(`/systems/${systemId}/trends`)
     return response.data
   },
 
+  async getDashboard(systemId, include = ['interactions', 'area', 'trends']) {
+    const response = await api.get(`/systems/${systemId}/dashboard`, {
+      params: { include: include.join(',') }
+    })
+    return response.data
+  },
+
+  // options: { minDelta, limit, ...interaction filters }
+  async compareSystems(a, b, options = {}) {
+    const params = { a, b, ...options }
+    if (Array.isArray(params.types)) params.types = params.types.join(',')
+    const response = await api.get('/compare', { params })
+    return response.data
+  },
+
+  // query: { residue } or { pair: [id1, id2] }, optionally with type; or { type } alone; systems limits the search
+  async search(query) {
+    const params = { ...query }
+    if (Array.isArray(params.pair)) params.pair = params.pair.join(',')
+    if (Array.isArray(params.systems)) params.systems = params.systems.join(',')
+    const response = await api.get('/search', { params })
+    return response.data
+  },
+
   // Upload
   async uploadFile(file, onProgress) {
     const formData = new FormData()
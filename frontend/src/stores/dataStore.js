@@ -77,16 +77,36 @@ export const useDataStore = defineStore('data', {
       const system = this.systems.find(s => s.id === systemId)
       if (system) {
         this.currentSystem = system
-        // Load all data for the new system
-        await Promise.all([
-          this.loadInteractions(systemId),
-          this.loadAreaData(systemId),
-          this.loadTrends(systemId)
-        ])
+        // Load all data for the new system in one request
+        await this.loadDashboard(systemId)
       }
     },
 
     // Data loading
+    async loadDashboard(systemId) {
+      this.loading.interactions = true
+      this.loading.area = true
+      this.loading.trends = true
+      this.errors.interactions = null
+      this.errors.area = null
+      this.errors.trends = null
+      try {
+        const data = await api.getDashboard(systemId)
+        this.interactions = data.interactions || []
+        this.areaData = data.frames || []
+        this.trends = data.trends || {}
+      } catch (error) {
+        this.errors.interactions = error.message
+        this.errors.area = error.message
+        this.errors.trends = error.message
+        console.error('Error loading dashboard:', error)
+      } finally {
+        this.loading.interactions = false
+        this.loading.area = false
+        this.loading.trends = false
+      }
+    },
+
     async loadInteractions(systemId) {
       this.loading.interactions = true
       this.errors.interactions = null
@@ -129,6 +149,15 @@ export const useDataStore = defineStore('data', {
       }
     },
 
+    // Heatmap matrices are fetched per view rather than kept in state;
+    // tooltips name each cell's types from typeMask, so no per-type layers are requested
+    async fetchHeatmap(minConsistency = null) {
+      const types = Array.from(this.selectedInteractionTypes)
+      const options = { types }
+      if (minConsistency !== null) options.minConsistency = minConsistency
+      return api.getHeatmap(this.currentSystem.id, options)
+    },
+
     // UI State
     setChartType(type) {
       this.currentChartType = type
@@ -58,6 +58,77 @@ export function matchesSelectedTypes(interactionTypes, selectedTypes, interactio
   return false
 }
 
+/**
+ * Decode a base64 little-endian float32 matrix from the heatmap endpoint
+ */
+export function decodeFloat32Matrix(base64) {
+  const binary = atob(base64)
+  const bytes = new Uint8Array(binary.length)
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i)
+  }
+  return new Float32Array(bytes.buffer)
+}
+
+/**
+ * Decode a base64 little-endian uint16 matrix, such as the heatmap typeMask
+ */
+export function decodeUint16Matrix(base64) {
+  const binary = atob(base64)
+  const bytes = new Uint8Array(binary.length)
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i)
+  }
+  return new Uint16Array(bytes.buffer)
+}
+
+/**
+ * Highcharts heatmap points from a heatmap endpoint response
+ * x is the row (chain A residue), y the column (chain B residue). Cell
+ * types come from typeMask, or with their consistency from the layers
+ * when any were requested.
+ */
+export function heatmapPoints(heatmap, interactionTypeList) {
+  const [rowCount, colCount] = heatmap.shape
+  const matrix = decodeFloat32Matrix(heatmap.matrix)
+  const labelOf = typeId => interactionTypeList.find(t => t.id === typeId)?.label || typeId
+  const layers = Object.entries(heatmap.layers || {}).map(([typeId, data]) => ({
+    label: labelOf(typeId),
+    values: decodeFloat32Matrix(data)
+  }))
+  const typeMask = heatmap.typeMask ? decodeUint16Matrix(heatmap.typeMask) : null
+  const maskLabels = (heatmap.typeIds || []).map(labelOf)
+
+  // Per-type consistency when layers were requested, otherwise the type names from the mask
+  const cellTypes = cell => {
+    if (layers.length > 0 || !typeMask) {
+      return layers
+        .filter(layer => !Number.isNaN(layer.values[cell]))
+        .map(layer => `${layer.label} ${Math.round(layer.values[cell] * 100)}%`)
+        .join('; ')
+    }
+    return maskLabels.filter((label, bit) => typeMask[cell] & (1 << bit)).join('; ')
+  }
+
+  const points = []
+  for (let x = 0; x < rowCount; x++) {
+    for (let y = 0; y < colCount; y++) {
+      const cell = x * colCount + y
+      const value = matrix[cell]
+      if (Number.isNaN(value)) continue
+      points.push({
+        x,
+        y,
+        value,
+        name: `${heatmap.rows[x]} ↔ ${heatmap.cols[y]}`,
+        types: cellTypes(cell),
+        frameCount: Math.round(value * heatmap.totalFrames)
+      })
+    }
+  }
+  return points
+}
+
 /**
  * Export INTERACTION_TYPES for use in components
  */
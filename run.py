@@ -1,61 +1,41 @@
-import subprocess
 import os
-import re
-from pathlib import Path
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.cocomaps import get_frame_numbers, run_pending_frames
 
 HOST_ROOT_DIR = "C:/Users/Ahmed/Desktop/PDB-examples/md_mohit_system"
-DOCKER_IMAGE = "andrpet/cocomaps-backend:0.0.19"
-CONTAINER_EXECUTION = "python /app/coco2/begin.py"
-INPUT_FILE_NAME = "example_input.json"
-
-def get_frame_numbers(root_dir):
-    frame_numbers = []
-    root_path = Path(root_dir)
-    
-    if not root_path.exists():
-        print(f"Warning: Directory {root_dir} does not exist.")
-        return frame_numbers
-    
-    #looking for folders matching frame_* pattern
-    for item in root_path.iterdir():
-        if item.is_dir():
-            match = re.match(r'frame_(\d+)', item.name)
-            if match:
-                frame_numbers.append(int(match.group(1)))
-    
-    return sorted(frame_numbers)
+WORKERS = None  # frames analyzed concurrently; None uses one per core
+WARM_CONTAINERS = False  # reuse long-lived containers instead of one docker run per frame
+CROP_MARGIN = None  # Å beyond CUT_OFF to crop frames to the interface; None sends whole frames
+CROP_VALIDATE = False  # analyze whole frames and compare a cropped run in frame_N/crop_check.json
 
 def run_frame_processing():
+    if not os.path.exists(HOST_ROOT_DIR):
+        print(f"Warning: Directory {HOST_ROOT_DIR} does not exist.")
     frame_numbers = get_frame_numbers(HOST_ROOT_DIR)
-    
+
     print(f"Found {len(frame_numbers)} frame(s) to process: {frame_numbers}\n")
-    
-    for i in frame_numbers:
-        frame_folder = f"frame_{i}"
-        
-        container_input_path = f"/app/data/{INPUT_FILE_NAME}"
-        docker_command = (
-            f"docker run "
-            f"-v {HOST_ROOT_DIR}/{frame_folder}:/app/data " #mount
-            f"-it {DOCKER_IMAGE} "
-            f"{CONTAINER_EXECUTION} "
-            f"{container_input_path}"
-        )
-        print(f"processing: {docker_command}")
-
-        try:
-            subprocess.run(
-                docker_command, shell=True, check=True,
-                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True 
-            )
-            print(f"done: {frame_folder}.\n")
-
-        except subprocess.CalledProcessError as e:
-            print(f"docker command failed for {frame_folder}.")
-            print(f"Output:\n{e.output}")
+
+    def on_frame(result, done_count, total):
+        frame_folder = f"frame_{result['frame']}"
+        if result['status'] == 'done':
+            print(f"[{done_count}/{total}] done: {frame_folder}.")
+        else:
+            print(f"[{done_count}/{total}] docker command failed for {frame_folder}.")
+            print(f"Output:\n{result['error']}")
+
+    results, skipped = run_pending_frames(HOST_ROOT_DIR, frame_numbers, workers=WORKERS,
+                                          on_frame=on_frame, warm=WARM_CONTAINERS,
+                                          crop_margin=CROP_MARGIN, crop_validate=CROP_VALIDATE)
+    if skipped:
+        print(f"skipped {len(skipped)} frame(s) already analyzed: {skipped}")
+    failed = [r['frame'] for r in results if r['status'] == 'failed']
+    print(f"\n{len(results) - len(failed)} frame(s) done, {len(failed)} failed: {failed}")
 
 if __name__ == "__main__":
     try:
         run_frame_processing()
     except Exception as e:
-        print(f"{e}")
\ No newline at end of file
+        print(f"{e}")
@@ -19,8 +19,17 @@ if __name__ == '__main__':
     print("Endpoints:")
     print("  GET  /api/systems")
     print("  GET  /api/systems/<id>/interactions")
+    print("  GET  /api/systems/<id>/interactions/windows")
+    print("  GET  /api/systems/<id>/interactions/cooccurrence")
+    print("  GET  /api/systems/<id>/interactions/geometry")
+    print("  GET  /api/systems/<id>/heatmap")
     print("  GET  /api/systems/<id>/area")
+    print("  GET  /api/systems/<id>/area/residues")
     print("  GET  /api/systems/<id>/trends")
+    print("  GET  /api/systems/<id>/dashboard")
+    print("  GET  /api/compare?a=<id>&b=<id>")
+    print("  GET  /api/search")
+    print("  GET  /api/cache/stats")
     print("  POST /api/upload")
     print("  GET  /api/status/<id>")
     print("=" * 60)